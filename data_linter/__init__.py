@@ -1 +1 @@
-__version__ = "6.3.3"
+__version__ = "6.4.0"
@@ -6,6 +6,7 @@ import tempfile
 import boto3
 import shutil
 import io
+import traceback
 
 from mojap_metadata.metadata.metadata import Metadata
 
@@ -15,9 +16,13 @@ from datetime import datetime
 
 from jsonschema import validate as json_validate
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from copy import deepcopy
+from functools import partial
 
 from dataengineeringutils3.s3 import (
+    check_for_s3_file,
     get_filepaths_from_s3_folder,
     delete_s3_object,
     write_json_to_s3,
@@ -47,17 +52,24 @@ from data_linter.utils import (
 )
 
 from data_linter.validators import (
+    ArrowValidator,
+    DuckDBValidator,
     PandasValidator,
     ParquetValidator,
+    PolarsValidator,
 )
 
 from data_linter.validators.base import ValidatorResult
+from data_linter.validators.s3_files import prefetch_parquet_footers
 
 log, log_stringio = logging_setup()
 
 get_validator = {
     "pandas": PandasValidator,
     "parquet": ParquetValidator,
+    "arrow": ArrowValidator,
+    "polars": PolarsValidator,
+    "duckdb": DuckDBValidator,
 }
 
 
@@ -99,13 +111,21 @@ def _read_and_replace_config_underscores(config: dict):
         "validator_engine_params",
         "iam_role_name",
         "run_parallel",
+        "fail_fast",
+        "validation_threads",
     ]
     table_params = [
         "expect_header",
         "headers_ignore_case",
         "pandas_kwargs",
         "row_limit",
+        "row_limit_seed",
         "only_test_cols_in_metadata",
+        "unique_values_threshold",
+        "fail_fast",
+        "only_read_tested_cols",
+        "pyarrow_strings",
+        "parquet_mode",
     ]
     for param in base_params:
         if param in config:
@@ -390,13 +410,16 @@ def validate_from_chunked_configs(config: dict, config_num: int) -> bool:
 def validate_data(config: dict) -> ValidatorResult:
 
     validator_engine = config.get("validator-engine", "pandas")
-    validator_params = config.get("validator-engine-params", {})
+    fail_fast = config.get("fail-fast", False)
+    n_threads = config.get("validation-threads", 1)
 
     all_table_responses = []
+    validator = None
 
     for table_name, table_params in config["tables"].items():
 
         table_params["lint-response"] = []
+        table_params.setdefault("fail-fast", fail_fast)
 
         if table_params["matched_files"]:
             log.info(f"Linting {table_name}")
@@ -409,32 +432,43 @@ def validate_data(config: dict) -> ValidatorResult:
             meta_obj.set_col_type_category_from_types()
             metadata = meta_obj.to_dict()
 
-            for i, matched_file in enumerate(table_params["matched_files"]):
-
-                log.info(
-                    f"{matched_file} ...file {i + 1} "
-                    f"of {len(table_params['matched_files'])}"
+            validator_class = get_validator[validator_engine]
+            try:
+                plan = validator_class.compile_plan(table_params, metadata)
+            except Exception:
+                # e.g. an invalid regex in the metadata. Every file of the
+                # table fails (without being read) and the run carries on
+                traceback_message = traceback.format_exc()
+                log.error(traceback_message)
+                validate_file = partial(
+                    _fail_file, config, table_name, table_params, traceback_message
                 )
-                validator = get_validator[validator_engine](
-                    matched_file, table_params, metadata, **validator_params
+            else:
+                validate_file = partial(
+                    _validate_file, config, table_name, table_params, metadata, plan
                 )
-
-                validator.read_data_and_validate()
-                validator.write_validation_errors_to_log()
-
-                table_response = {
-                    "valid": validator.valid,
-                    "response": validator.get_response_dict(),
-                    "original-path": matched_file,
-                    "table-name": table_name,
-                }
-
-                if table_response["valid"]:
-                    log.info("...file passed.")
+            matched_files = table_params["matched_files"]
+            if validator_class.reads_parquet_footers:
+                # read the footers of every parquet file at once
+                prefetch = prefetch_parquet_footers(matched_files)
+            else:
+                prefetch = nullcontext()
+
+            with prefetch:
+                if n_threads > 1:
+                    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                        file_numbers = range(len(matched_files))
+                        results = list(
+                            executor.map(validate_file, matched_files, file_numbers)
+                        )
                 else:
-                    log.info("...file failed.")
+                    results = [
+                        validate_file(f, i) for i, f in enumerate(matched_files)
+                    ]
 
+            for table_response, file_validator in results:
                 all_table_responses.append(table_response)
+                validator = file_validator if file_validator else validator
 
         else:
             msg4 = f"SKIPPING {table_name}. No files found."
@@ -444,7 +478,131 @@ def validate_data(config: dict) -> ValidatorResult:
     if all_table_responses:
         save_completion_status(config, all_table_responses)
 
-    return validator.response
+    return validator.response if validator else None
+
+
+def _validate_file(
+    config: dict,
+    table_name: str,
+    table_params: dict,
+    metadata: dict,
+    plan,
+    matched_file: str,
+    file_number: int,
+):
+    """
+    Validates a single file of a table. Returns its table response and the
+    validator used (None if the file was skipped because of fail-fast).
+    Validators keep all of their state to themselves, so files can be
+    validated in several threads at once (see the validation-threads config
+    param).
+    """
+    validator_class = get_validator[config.get("validator-engine", "pandas")]
+    validator_params = config.get("validator-engine-params", {})
+    # the run can only stop early if every file will fail when one does
+    cancel_on_fail = config.get("fail-fast", False) and config.get(
+        "all-must-pass", False
+    )
+
+    log.info(
+        f"{matched_file} ...file {file_number + 1} "
+        f"of {len(table_params['matched_files'])}"
+    )
+
+    if cancel_on_fail and _run_has_failed(config):
+        log.info("...file skipped (fail-fast and a file has failed).")
+        table_response = {
+            "valid": False,
+            "skipped": True,
+            "response": {"valid": False},
+            "original-path": matched_file,
+            "table-name": table_name,
+        }
+        return table_response, None
+
+    validator = validator_class(
+        matched_file, table_params, metadata, plan=plan, **validator_params
+    )
+
+    validator.read_data_and_validate()
+    validator.write_validation_errors_to_log()
+
+    table_response = {
+        "valid": validator.valid,
+        "response": validator.get_response_dict(),
+        "original-path": matched_file,
+        "table-name": table_name,
+    }
+
+    if table_response["valid"]:
+        log.info(f"...{matched_file} passed.")
+    else:
+        log.info(f"...{matched_file} failed.")
+        if cancel_on_fail:
+            _record_run_failure(config, matched_file)
+
+    return table_response, validator
+
+
+def _fail_file(
+    config: dict,
+    table_name: str,
+    table_params: dict,
+    traceback_message: str,
+    matched_file: str,
+    file_number: int,
+):
+    """
+    Fails a file of a table whose validation plan could not be compiled
+    from its metadata (see validate_data). Returns the same as _validate_file.
+    """
+    log.info(
+        f"{matched_file} ...file {file_number + 1} "
+        f"of {len(table_params['matched_files'])}"
+    )
+    response = ValidatorResult()
+    response.add_table_test(
+        "compile_validation_plan", {"valid": False, "traceback": traceback_message}
+    )
+    table_response = {
+        "valid": False,
+        "response": response.get_result(),
+        "original-path": matched_file,
+        "table-name": table_name,
+    }
+
+    log.info(f"...{matched_file} failed.")
+    if config.get("fail-fast", False) and config.get("all-must-pass", False):
+        _record_run_failure(config, matched_file)
+
+    return table_response, None
+
+
+def _get_run_failure_path(config: dict) -> str:
+    return os.path.join(get_temp_log_basepath(config), "fail-fast", "failed.json")
+
+
+def _record_run_failure(config: dict, failed_file: str):
+    """
+    Records that a file failed so every worker of the run (see
+    _run_has_failed) can skip their remaining files
+    """
+    failure_path = _get_run_failure_path(config)
+    failure = {"original-path": failed_file}
+    if failure_path.startswith("s3://"):
+        write_json_to_s3(failure, failure_path)
+    else:
+        os.makedirs(os.path.dirname(failure_path), exist_ok=True)
+        with open(failure_path, "w") as json_out:
+            json.dump(failure, json_out)
+
+
+def _run_has_failed(config: dict) -> bool:
+    failure_path = _get_run_failure_path(config)
+    if failure_path.startswith("s3://"):
+        return check_for_s3_file(failure_path)
+    else:
+        return os.path.exists(failure_path)
 
 
 def save_completion_status(config: dict, all_table_responses: List[dict]):
@@ -635,7 +793,10 @@ def collect_all_status(config: dict):
     if there_was_a_fail and all_must_pass:
         log.info("The following tables have failed: ")
         for failed_table in [i for i in all_table_response if not i["valid"]]:
-            log.info(f"{failed_table['table-name']} failed")
+            if failed_table.get("skipped"):
+                log.info(f"{failed_table['table-name']} skipped (fail-fast)")
+            else:
+                log.info(f"{failed_table['table-name']} failed")
             log.info(f"...original path: {failed_table['original-path']}")
             log.info(f"...out path: {failed_table['archived-path']}")
         _del_path(get_temp_log_basepath(config))
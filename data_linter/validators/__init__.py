@@ -1,2 +1,5 @@
 from .pandas_validator import PandasValidator  # noqa
 from .parquet_validator import ParquetValidator # noqa
+from .arrow_validator import ArrowValidator  # noqa
+from .polars_validator import PolarsValidator  # noqa
+from .duckdb_validator import DuckDBValidator  # noqa
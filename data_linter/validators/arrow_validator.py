@@ -0,0 +1,557 @@
+import logging
+import os
+import traceback
+
+from copy import deepcopy
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pyarrow import csv as pa_csv
+from pyarrow import json as pa_json
+
+from arrow_pd_parser.pa_pd import arrow_to_pandas
+from arrow_pd_parser.utils import FileFormat, infer_file_format
+from dataengineeringutils3.s3 import s3_path_to_bucket_key
+from mojap_metadata import Metadata
+from mojap_metadata.converters.arrow_converter import ArrowConverter
+
+from data_linter.validators.pandas_validator import (
+    CompiledRegex,
+    PlanValidator,
+    default_date_format,
+    default_datetime_format,
+    _check_columns,
+    _clean_column_names,
+    _fill_unexpected_sample,
+    _get_invalid_date_or_datetime_col,
+    _get_invalid_typed_datetime_array,
+    _get_meta_col_names,
+    _get_min_max_series_out_of_bounds_col,
+    _get_re2_recheck,
+    _pattern_kernel,
+    _result_dict,
+)
+from data_linter.validators.s3_files import get_s3_filesystem
+
+log = logging.getLogger("root")
+
+# same as the strings pandas.read_csv reads as NA by default
+default_na_values = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# same as the arrow_pd_parser default str to bool mapping
+bool_true_values = ["yes", "true", "t", "1", "1.0"]
+bool_false_values = ["no", "false", "f", "0", "0.0"]
+
+compression_extensions = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd"}
+arrow_comparisons = {"less": pc.less, "greater": pc.greater, "or_": pc.or_}
+
+
+class ArrowValidator(PlanValidator):
+    """
+    Validator using pyarrow. The data is read straight into an arrow Table
+    and the same tests as the PandasValidator are run against it with
+    pyarrow.compute, so the response is the same as the PandasValidator's
+    without converting the data to pandas.
+    """
+
+    def read_data_and_validate(self):
+        """Reads data from filepath into an arrow Table and validates it.
+
+        CSV and JSONL files are cast to the metadata (the same way as
+        arrow_pd_parser casts them for the PandasValidator). Parquet files
+        are validated as they are.
+        """
+        fail_response_dict = {self.response.vvkn: False}
+
+        try:
+            table, index = _read_data_to_arrow(
+                self.filepath, self.table_params, self.metadata
+            )
+        except Exception:
+            traceback_message = traceback.format_exc()
+            fail_response_dict["traceback"] = traceback_message
+            self.response.add_table_test("parse_data_to_arrow", fail_response_dict)
+            log.error(traceback_message)
+            return
+
+        try:
+            self.validate_table(table, index)
+        except Exception:
+            self.response.add_table_test("overall_validation", fail_response_dict)
+            log.error(traceback.format_exc())
+
+    def validate_table(self, table: pa.Table, index: np.ndarray = None):
+        """
+        Runs the plan against the table. index is the row number in the
+        file of each row of the table (if it has been sampled). With the
+        fail-fast table param the tests after the first failed test are
+        skipped.
+        """
+        columns = [c for c in self.plan.columns if c in table.column_names]
+        for i, column in enumerate(columns):
+            self.validate_col(table[column], column, index)
+            if self.fail_fast and not self.valid:
+                for skipped_column in columns[i + 1 :]:
+                    for step in self.plan.get_column_steps(skipped_column):
+                        self.response.add_skipped_test(skipped_column, step.test_name)
+                break
+
+    def validate_col(
+        self, col: pa.ChunkedArray, column: str, index: np.ndarray = None
+    ):
+        col_is_str = _check_arrow_array_is_str(col)
+        steps = self.plan.get_column_steps(column)
+        col_is_datetime = _check_arrow_array_is_datetime(col)
+        for i, step in enumerate(steps):
+            kernel = _arrow_kernels[step.test_name]
+            if step.str_only and not col_is_str:
+                if step.typed_step is None or not col_is_datetime:
+                    log.info(
+                        f"Column {step.column} not tested. "
+                        "Its values are neither str nor timestamps / dates."
+                    )
+                    continue
+                step, kernel = step.typed_step, _arrow_typed_datetime_kernel
+
+            col_oob = kernel(col, **step.args)
+            res_dict = _result_dict(step.test_name, deepcopy(step.test_inputs))
+            res_dict = _fill_res_dict_from_arrow(
+                col, col_oob, res_dict, self.log_verbosity, index
+            )
+            self.response.add_test_to_col(column, step.test_name, res_dict)
+            if self.fail_fast and not res_dict["valid"]:
+                for skipped_step in steps[i + 1 :]:
+                    self.response.add_skipped_test(column, skipped_step.test_name)
+                break
+
+
+def _arrow_min_max_kernel(
+    col: pa.ChunkedArray, colname: str, minimum=None, maximum=None
+) -> pa.ChunkedArray:
+    return _get_min_max_series_out_of_bounds_col(
+        col, colname, minimum, maximum, **arrow_comparisons
+    )
+
+
+def _arrow_min_max_length_kernel(
+    col: pa.ChunkedArray, colname: str, minimum=None, maximum=None
+) -> pa.ChunkedArray:
+    return _get_min_max_series_out_of_bounds_col(
+        pc.utf8_length(col), colname, minimum, maximum, **arrow_comparisons
+    )
+
+
+def _arrow_pattern_kernel(
+    col: pa.ChunkedArray, regex: CompiledRegex
+) -> pa.ChunkedArray:
+    if regex.engine != "re2":
+        return _map_pandas_kernel_over_uniques(col, _pattern_kernel, regex=regex)
+
+    col_oob = pc.invert(pc.match_substring_regex(col, regex.anchored_pattern))
+
+    recheck = pc.fill_null(_get_re2_recheck(col, regex), False)
+    if pc.any(recheck).as_py():
+        col_oob = pc.fill_null(col_oob, False).to_numpy()
+        recheck = recheck.to_numpy()
+        col_oob[recheck] = [
+            regex.regex.match(v) is None for v in col.filter(recheck).to_pylist()
+        ]
+        col_oob = pa.chunked_array([col_oob])
+    return col_oob
+
+
+def _arrow_enum_kernel(
+    col: pa.ChunkedArray, enum: frozenset, nullable: bool
+) -> pa.ChunkedArray:
+    value_set = _get_arrow_enum_value_set(enum, col.type)
+    if value_set is not None:
+        in_enum = pc.is_in(col, value_set=value_set, skip_nulls=True)
+    else:
+        in_enum = pa.chunked_array(
+            [_arrow_to_pandas(col).isin(enum).fillna(False).to_numpy(dtype=bool)]
+        )
+
+    if nullable:
+        in_enum = pc.or_(in_enum, pc.is_null(col))
+    return pc.invert(in_enum)
+
+
+def _get_arrow_enum_value_set(
+    enum: frozenset, arrow_type: pa.DataType
+) -> Union[pa.Array, None]:
+    """
+    Returns the enum values as an array of arrow_type for pc.is_in, or None
+    if pc.is_in could give a different result to pandas isin. isin compares
+    numbers (and bools) by value but never matches a number to a str (e.g.
+    1 is not in ["1"]), so the values are only cast between numeric types
+    or between string types. Otherwise (e.g. enum values of mixed types)
+    the column is tested with pandas isin.
+    """
+    try:
+        values = pa.array(list(enum))
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+    if pa.types.is_boolean(arrow_type):
+        # casting numbers to bool would make e.g. 2 equal to True
+        same_kind = pa.types.is_boolean(values.type)
+    elif _is_arrow_numeric(arrow_type):
+        same_kind = _is_arrow_numeric(values.type)
+    else:
+        same_kind = _is_arrow_string(values.type) and _is_arrow_string(arrow_type)
+    if not same_kind:
+        return None
+
+    try:
+        return values.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # e.g. 2.5 for an int column, which no value can be equal to
+        return None
+
+
+def _is_arrow_numeric(arrow_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_boolean(arrow_type)
+    )
+
+
+def _is_arrow_string(arrow_type: pa.DataType) -> bool:
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+def _arrow_nullable_kernel(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    return pc.is_null(col, nan_is_null=True)
+
+
+def _arrow_date_or_datetime_kernel(
+    col: pa.ChunkedArray, dt_format: str, check_for_no_time_component=False
+) -> pa.ChunkedArray:
+    return _map_pandas_kernel_over_uniques(
+        col,
+        _get_invalid_date_or_datetime_col,
+        dt_format=dt_format,
+        check_for_no_time_component=check_for_no_time_component,
+    )
+
+
+def _arrow_typed_datetime_kernel(
+    col: pa.ChunkedArray, meta_type: str
+) -> pa.ChunkedArray:
+    col_oob = _get_invalid_typed_datetime_array(col.combine_chunks(), meta_type)
+    return pa.chunked_array([col_oob])
+
+
+_arrow_kernels: Dict[str, Callable[..., pa.ChunkedArray]] = {
+    "min_max_test": _arrow_min_max_kernel,
+    "min_max_length_test": _arrow_min_max_length_kernel,
+    "pattern_test": _arrow_pattern_kernel,
+    "enum_test": _arrow_enum_kernel,
+    "nullable_test": _arrow_nullable_kernel,
+    "datetime_format_test": _arrow_date_or_datetime_kernel,
+    "date_format_test": _arrow_date_or_datetime_kernel,
+}
+
+
+def _map_pandas_kernel_over_uniques(
+    col: pa.ChunkedArray, kernel: Callable[..., pd.Series], **kwargs
+) -> pa.ChunkedArray:
+    """
+    Runs a pandas kernel against the (non null) unique values of the column
+    and maps the result back onto every row with pyarrow.compute. Used for
+    tests that need python (re or strptime) to give the same result as the
+    PandasValidator.
+    """
+    uniques = pc.drop_null(pc.unique(col))
+    uniques_oob = kernel(_arrow_to_pandas(uniques), **kwargs)
+    uniques_oob = uniques_oob.fillna(False).to_numpy(dtype=bool)
+    return pc.is_in(col, value_set=uniques.filter(uniques_oob))
+
+
+def _fill_res_dict_from_arrow(
+    col: pa.ChunkedArray,
+    col_oob: pa.ChunkedArray,
+    res_dict: dict,
+    n: Union[int, None],
+    index: np.ndarray = None,
+    n_rows: int = None,
+) -> dict:
+    """
+    Arrow equivalent of pandas_validator._fill_res_dict. Only the unexpected
+    values that are sampled are converted to python. n_rows is the number
+    of rows in the column the percentage of errors is of (if only part of
+    it was tested), and defaults to the length of col.
+    """
+    col_oob = pc.fill_null(col_oob, False)
+    n_errors = pc.sum(col_oob).as_py() or 0
+    valid = n_errors == 0
+    res_dict["valid"] = valid
+
+    if not valid:
+        n_rows = len(col) if n_rows is None else n_rows
+        res_dict["percentage_of_column_is_error"] = n_errors / n_rows * 100
+
+        if n is not None:
+            positions = pc.indices_nonzero(col_oob).to_numpy()
+            if n != 0 and n < len(positions):
+                positions = np.sort(np.random.choice(positions, n, replace=False))
+
+            unexpected_values = _arrow_to_pandas(col.take(positions)).astype(str)
+            unexpected_values.index = positions if index is None else index[positions]
+            _fill_unexpected_sample(res_dict, unexpected_values, n)
+
+    return res_dict
+
+
+def _arrow_to_pandas(arr: Union[pa.Array, pa.ChunkedArray]) -> pd.Series:
+    """
+    Converts an arrow array to a series with the same dtypes arrow_pd_parser
+    gives the PandasValidator (e.g. Int64, string and datetime objects).
+    """
+    return arrow_to_pandas(pa.table({"col": arr}))["col"]
+
+
+def _check_arrow_array_is_str(col: pa.ChunkedArray) -> bool:
+    """
+    Arrow equivalent of pandas_validator._check_pandas_series_is_str
+    (with nulls treated as str).
+    """
+    is_str = pa.types.is_string(col.type) or pa.types.is_large_string(col.type)
+    return is_str or col.null_count == len(col)
+
+
+def _check_arrow_array_is_datetime(col: pa.ChunkedArray) -> bool:
+    """
+    Arrow equivalent of pandas_validator._check_pandas_series_is_datetime
+    """
+    return pa.types.is_timestamp(col.type) or pa.types.is_date(col.type)
+
+
+def _read_data_to_arrow(
+    filepath: str, table_params: dict, metadata: Metadata
+) -> Tuple[pa.Table, Union[np.ndarray, None]]:
+    """
+    Reads in the data from the given filepath and returns it as an arrow
+    Table. Also returns the row number of each row in the file if the data
+    is sampled (with row-limit) or None if it is not. Column checks are the
+    same as the PandasValidator's and the metadata is updated in place to
+    match the data.
+    """
+    meta_col_names = _get_meta_col_names(metadata)
+    file_format = infer_file_format(filepath, metadata)
+
+    if file_format == FileFormat.CSV:
+        table = _read_csv_to_arrow(filepath, table_params, meta_col_names)
+    elif file_format == FileFormat.JSON:
+        with _open_input_stream(filepath) as f:
+            table = pa_json.read_json(f)
+    else:
+        table = _read_parquet_to_arrow(filepath)
+
+    table = table.rename_columns(_clean_column_names(table.column_names, table_params))
+
+    cols_to_keep = _check_columns(
+        table.column_names, table_params, metadata, meta_col_names
+    )
+    if cols_to_keep is not None:
+        table = table.select(cols_to_keep)
+
+    # sample the data, if required
+    index = None
+    row_limit = table_params.get("row-limit", None)
+    if row_limit:
+        row_limit = min(row_limit, table.num_rows)
+        rng = np.random.default_rng(table_params.get("row-limit-seed"))
+        index = rng.choice(table.num_rows, row_limit, replace=False)
+        table = table.take(index)
+
+    if metadata.file_format not in ["parquet", "snappy.parquet"]:
+        table = _cast_arrow_table_to_schema(table, metadata)
+
+    return table, index
+
+
+def _read_csv_to_arrow(
+    filepath: str, table_params: dict, meta_col_names: List[str]
+) -> pa.Table:
+    """
+    Reads every column of the CSV as a string (like pandas with dtype=str)
+    with the same NA values as pandas.read_csv. The pandas-kwargs
+    na_values and keep_default_na are also used if set.
+    """
+    pandas_kwargs = table_params.get("pandas-kwargs", {})
+    na_values = list(pandas_kwargs.get("na_values", []))
+    if pandas_kwargs.get("keep_default_na", True):
+        na_values += default_na_values
+
+    if table_params.get("expect-header", True):
+        read_options = pa_csv.ReadOptions()
+        with _open_input_stream(filepath) as f:
+            column_names = pa_csv.open_csv(f, read_options=read_options).schema.names
+    else:
+        column_names = meta_col_names
+        read_options = pa_csv.ReadOptions(column_names=column_names)
+
+    convert_options = pa_csv.ConvertOptions(
+        column_types={c: pa.string() for c in column_names},
+        null_values=na_values,
+        strings_can_be_null=True,
+    )
+    with _open_input_stream(filepath) as f:
+        return pa_csv.read_csv(
+            f, read_options=read_options, convert_options=convert_options
+        )
+
+
+def _read_parquet_to_arrow(filepath: str) -> pa.Table:
+    if filepath.startswith("s3://"):
+        s3fs = get_s3_filesystem()
+        b, k = s3_path_to_bucket_key(filepath)
+        with s3fs.open_input_file(os.path.join(b, k)) as f:
+            return pq.read_table(f)
+    else:
+        return pq.read_table(filepath)
+
+
+def _open_input_stream(filepath: str):
+    if filepath.startswith("s3://"):
+        s3fs = get_s3_filesystem()
+        b, k = s3_path_to_bucket_key(filepath)
+        stream = s3fs.open_input_stream(os.path.join(b, k))
+    else:
+        stream = pa.OSFile(filepath)
+
+    compression = compression_extensions.get(os.path.splitext(filepath)[1])
+    if compression:
+        stream = pa.CompressedInputStream(stream, compression)
+    return stream
+
+
+def _cast_arrow_table_to_schema(table: pa.Table, metadata: Metadata) -> pa.Table:
+    """
+    Casts the columns in the table to the metadata with the same rules as
+    arrow_pd_parser.caster.cast_pandas_table_to_schema. Raises an error
+    if a value cannot be cast.
+    """
+    arrow_schema = ArrowConverter().generate_from_meta(metadata)
+    for meta_col in metadata.columns:
+        name = meta_col["name"]
+        if name not in table.column_names:
+            continue
+        try:
+            col = _cast_arrow_column(
+                table[name], meta_col, arrow_schema.field(name).type
+            )
+        except Exception as e:
+            raise ValueError(
+                f"Failed conversion - name: {name} | "
+                f"type_category: {meta_col['type_category']} | "
+                f"type: {meta_col.get('type')} - see traceback."
+            ) from e
+        table = table.set_column(table.schema.get_field_index(name), name, col)
+
+    return table
+
+
+def _cast_arrow_column(
+    col: pa.ChunkedArray, meta_col: dict, arrow_type: pa.DataType
+) -> pa.ChunkedArray:
+    type_category = meta_col["type_category"]
+    is_str = pa.types.is_string(col.type) or pa.types.is_large_string(col.type)
+
+    if type_category == "integer":
+        try:
+            col = col.cast(pa.int64())
+        except pa.ArrowInvalid:
+            # e.g. "1.0" which pandas.to_numeric reads as a float
+            col = col.cast(pa.float64()).cast(pa.int64())
+    elif type_category == "float":
+        col = col.cast(pa.float64())
+    elif type_category == "boolean":
+        if not pa.types.is_boolean(col.type):
+            col = _map_arrow_str_to_bool(col.cast(pa.string()))
+    elif type_category == "string":
+        col = col.cast(pa.string())
+    elif type_category == "timestamp" and is_str:
+        is_date = meta_col["type"].startswith("date")
+        default_format = default_date_format if is_date else default_datetime_format
+        dt_format = meta_col.get("datetime_format", default_format)
+        col = _arrow_strptime(col, dt_format)
+        # timestamps are kept in microseconds (as the other engines parse
+        # them) so the typed test can flag values more precise than the
+        # metadata unit, rather than truncating them here
+        if is_date:
+            col = col.cast(arrow_type, safe=False)
+
+    return col
+
+
+def _map_arrow_str_to_bool(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    s = pc.utf8_lower(pc.utf8_trim_whitespace(col))
+    is_true = pc.is_in(s, value_set=pa.array(bool_true_values))
+    is_false = pc.is_in(s, value_set=pa.array(bool_false_values))
+    return pc.if_else(
+        is_true, True, pc.if_else(is_false, False, pa.scalar(None, pa.bool_()))
+    )
+
+
+def _arrow_strptime(col: pa.ChunkedArray, dt_format: str) -> pa.ChunkedArray:
+    """
+    Parses the strings with pc.strptime. strptime is more lenient than
+    pandas.to_datetime (e.g. it rolls 2020-02-30 over to March) so values
+    that do not format back to the same string are parsed with
+    pandas.to_datetime instead (which raises an error if they are invalid).
+    """
+    parsed = pc.strptime(col, format=dt_format, unit="s", error_is_null=True)
+    recheck = pc.and_(
+        pc.fill_null(pc.not_equal(_arrow_strftime(parsed, dt_format), col), True),
+        pc.is_valid(col),
+    )
+
+    parsed = parsed.cast(pa.timestamp("us"))
+    if pc.any(recheck).as_py():
+        reparsed = pd.to_datetime(
+            _arrow_to_pandas(col.filter(recheck)), format=dt_format
+        )
+        parsed = pc.replace_with_mask(
+            parsed.combine_chunks(),
+            recheck.combine_chunks(),
+            pa.array(reparsed, type=pa.timestamp("us")),
+        )
+    return parsed
+
+
+def _arrow_strftime(parsed: pa.ChunkedArray, dt_format: str) -> pa.ChunkedArray:
+    # casting to a string gives the default formats and is much
+    # faster than pc.strftime
+    if dt_format == default_datetime_format:
+        return parsed.cast(pa.string())
+    elif dt_format == default_date_format:
+        return parsed.cast(pa.date32()).cast(pa.string())
+    else:
+        return pc.strftime(parsed, format=dt_format)
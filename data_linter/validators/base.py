@@ -5,6 +5,8 @@ from typing import List, Union
 from mojap_metadata import Metadata
 from jsonschema.exceptions import ValidationError
 
+log = logging.getLogger("root")
+
 
 class ValidatorResult:
     """
@@ -91,6 +93,14 @@ class ValidatorResult:
         if self.vvkn in test_result:
             self.result["valid"] = self.result["valid"] and test_result[self.vvkn]
 
+    def add_skipped_test(self, colname, testname):
+        """
+        Records a test that was not run (e.g. because of fail-fast) under
+        skipped_tests. Skipped tests do not change whether the result is valid.
+        """
+        skipped = self.result.setdefault("skipped_tests", {})
+        skipped.setdefault(colname, []).append(testname)
+
     def add_test_to_col(self, colname, testname, test_result):
         self.init_col(colname)
 
@@ -103,6 +113,11 @@ class ValidatorResult:
 
 
 class BaseTableValidator:
+    # whether the validator reads the footers of parquet files on their own
+    # (e.g. for their schema), so they are worth prefetching for every file
+    # of a table at once (see s3_files.prefetch_parquet_footers)
+    reads_parquet_footers = False
+
     def __init__(
         self,
         filepath: str,
@@ -133,6 +148,31 @@ class BaseTableValidator:
     def valid(self):
         return self.response.result["valid"]
 
+    @property
+    def fail_fast(self) -> bool:
+        """
+        Whether to stop validating the file at the first failed test
+        (set with the fail-fast table param). Validators that run every
+        test in a single pass can ignore it.
+        """
+        return self.table_params.get("fail-fast", False)
+
+    @classmethod
+    def compile_plan(cls, table_params: dict, metadata: Union[dict, str, Metadata]):
+        """Compiles anything the validator can reuse when validating every
+        file of a table (e.g. the tests to run derived from the metadata).
+        The result is passed to the validator with the plan kwarg.
+        Default behavior is that there is nothing to compile.
+
+        Args:
+            table_params (dict): Table params
+            metadata (Union[dict, str, Metadata]): Metadata for the table
+
+        Returns:
+            None if there is nothing to compile
+        """
+        return None
+
     def write_validation_result_to_log(self, log: logging.Logger):
         """Writes a the validators response to log provided.
         Default behavior is to just write str representation
@@ -145,7 +185,19 @@ class BaseTableValidator:
         log.error(str(self.response), extra={"context": "VALIDATION"})
 
     def write_validation_errors_to_log(self):
-        raise NotImplementedError("Needs to be overwritten")
+        """Writes a summary of the failed columns to the log (and the whole
+        response at debug level) if the table failed validation.
+        """
+        table_result = self.response.get_result()
+        if not table_result["valid"]:
+            failed_cols = self.response.get_names_of_column_failures()
+            err_msg = (
+                "Table failed validation. "
+                f"Col failures: {failed_cols}. "
+                "See response error log for more details."
+            )
+            log.error(err_msg, extra={"context": "VALIDATION"})
+            log.debug(str(table_result), extra={"context": "VALIDATION"})
 
     def read_data_and_validate(self):
         """Reads data from filepath and validates it.
@@ -0,0 +1,598 @@
+import logging
+import os
+import shutil
+import tempfile
+import traceback
+
+from copy import deepcopy
+from typing import Callable, Dict, List, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from arrow_pd_parser.utils import FileFormat, infer_file_format
+from dataengineeringutils3.s3 import s3_path_to_bucket_key
+from mojap_metadata import Metadata
+
+from data_linter.validators.arrow_validator import (
+    bool_false_values,
+    bool_true_values,
+    default_na_values,
+)
+from data_linter.validators.pandas_validator import (
+    CompiledRegex,
+    PlanValidator,
+    ValidationStep,
+    default_date_format,
+    default_datetime_format,
+    _check_columns,
+    _clean_column_names,
+    _compile_regex,
+    _fill_unexpected_sample,
+    _format_unexpected_value,
+    _get_invalid_date_or_datetime_col,
+    _get_meta_col_names,
+    _get_min_max_series_out_of_bounds_col,
+    _get_typed_datetime_bounds,
+    _result_dict,
+    re2_unmatched_whitespace,
+)
+from data_linter.validators.s3_files import get_s3_filesystem
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+log = logging.getLogger("root")
+row_index_name = "__data_linter_row_index"
+
+# python functions registered with each connection (for values duckdb cannot
+# check with the same rules as the PandasValidator)
+re_match_udf = "__data_linter_re_match"
+to_datetime_udf = "__data_linter_to_datetime"
+invalid_datetime_udf = "__data_linter_invalid_datetime"
+# unit (see pandas_validator.datetime_unit_ns) of each duckdb timestamp / date
+# type and the SQL for the (integer) number of those units since the epoch
+duckdb_datetime_units = {
+    "DATE": ("D", "({} - DATE '1970-01-01')"),
+    "TIMESTAMP_S": ("s", "(epoch_ms({}) // 1000)"),
+    "TIMESTAMP_MS": ("ms", "epoch_ms({})"),
+    "TIMESTAMP": ("us", "epoch_us({})"),
+    "TIMESTAMP_NS": ("ns", "epoch_ns({})"),
+}
+duckdb_timezone_types = ["TIMESTAMP WITH TIME ZONE"]
+duckdb_numeric_types = [
+    "TINYINT",
+    "SMALLINT",
+    "INTEGER",
+    "BIGINT",
+    "HUGEINT",
+    "UTINYINT",
+    "USMALLINT",
+    "UINTEGER",
+    "UBIGINT",
+    "FLOAT",
+    "DOUBLE",
+]
+duckdb_comparisons = {
+    "less": lambda c, v: f"({c} < {_literal(v)})",
+    "greater": lambda c, v: f"({c} > {_literal(v)})",
+    "or_": lambda a, b: f"({a} OR {b})",
+}
+
+
+class DuckDBValidator(PlanValidator):
+    """
+    Validator using duckdb (requires the duckdb extra). Every test in the
+    plan is translated to SQL and the whole file is validated by a single
+    aggregate query, which duckdb runs in parallel and can spill to disk.
+    So files much bigger than memory can be validated without chunking.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if duckdb is None:
+            raise ImportError(
+                "The duckdb validator engine requires duckdb. "
+                "Install it with: pip install data_linter[duckdb]"
+            )
+        super().__init__(*args, **kwargs)
+
+    def read_data_and_validate(self):
+        """Creates a view of the data cast to the metadata and validates it.
+
+        If any value cannot be cast the parse_data_to_duckdb table test
+        fails (with the number of values that could not be cast in each
+        column) and no column tests are added.
+        """
+        fail_response_dict = {self.response.vvkn: False}
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            con = _connect()
+            try:
+                view, cast_error_cols = _create_duckdb_view(
+                    con,
+                    self.filepath,
+                    self.table_params,
+                    self.metadata,
+                    with_index=self.log_verbosity is not None,
+                    tmpdir=tmpdir,
+                )
+            except Exception:
+                traceback_message = traceback.format_exc()
+                fail_response_dict["traceback"] = traceback_message
+                self.response.add_table_test("parse_data_to_duckdb", fail_response_dict)
+                log.error(traceback_message)
+                con.close()
+                return
+
+            try:
+                self.validate_view(con, view, cast_error_cols)
+            except Exception:
+                self.response.add_table_test("overall_validation", fail_response_dict)
+                log.error(traceback.format_exc())
+            finally:
+                con.close()
+
+    def validate_view(
+        self,
+        con: "duckdb.DuckDBPyConnection",
+        view: str,
+        cast_error_cols: Dict[str, str] = None,
+    ):
+        """
+        Validates the view against the plan with a single aggregate query.
+        The view needs a row index column if log_verbosity is not None.
+        cast_error_cols maps a column name to a bool column in the view that
+        is True where a value could not be cast.
+        """
+        cast_error_cols = cast_error_cols or {}
+        dtypes = _get_duckdb_types(con, view)
+
+        steps = []
+        kernels = []
+        for column in self.plan.columns:
+            if column not in dtypes:
+                continue
+            col_is_str = dtypes[column] in ["VARCHAR", '"NULL"']
+            col_is_datetime = (
+                dtypes[column] in duckdb_datetime_units
+                or dtypes[column] in duckdb_timezone_types
+            )
+            for step in self.plan.get_column_steps(column):
+                if not step.str_only or col_is_str:
+                    steps.append(step)
+                    kernels.append(_duckdb_kernels[step.test_name])
+                elif step.typed_step is not None and col_is_datetime:
+                    steps.append(step.typed_step)
+                    kernels.append(_duckdb_typed_datetime_kernel)
+                else:
+                    log.info(
+                        f"Column {step.column} not tested. "
+                        "Its values are neither str nor timestamps / dates."
+                    )
+
+        n = self.log_verbosity
+        aggs = ["count(*)"]
+        for error_col in cast_error_cols.values():
+            aggs.append(f"count_if({_quote(error_col)})")
+        for step, kernel in zip(steps, kernels):
+            c = _quote(step.column)
+            failed = kernel(c, dtypes[step.column], **step.args)
+            failed = f"coalesce({failed}, false)"
+            aggs.append(f"count_if({failed})")
+            if n is not None:
+                row = f"struct_pack(index := {_quote(row_index_name)}, value := {c})"
+                if n == 0:
+                    agg = f"list({row})"
+                else:
+                    agg = f"min_by({row}, random(), {int(n)})"
+                aggs.append(f"{agg} FILTER (WHERE {failed})")
+
+        result = list(con.execute(f"SELECT {', '.join(aggs)} FROM {view}").fetchone())
+
+        n_rows = result.pop(0)
+        failed_casts = {}
+        for name in cast_error_cols:
+            n_failed = result.pop(0)
+            if n_failed:
+                failed_casts[name] = n_failed
+        if failed_casts:
+            self.response.add_table_test(
+                "parse_data_to_duckdb",
+                {self.response.vvkn: False, "failed_casts": failed_casts},
+            )
+            return
+
+        for step in steps:
+            n_errors = result.pop(0)
+            sample = result.pop(0) if n is not None else None
+            res_dict = _duckdb_res_dict(
+                step, n_errors, n_rows, sample, dtypes[step.column], n
+            )
+            self.response.add_test_to_col(step.column, step.test_name, res_dict)
+
+
+def _duckdb_res_dict(
+    step: ValidationStep,
+    n_errors: int,
+    n_rows: int,
+    sample: Union[List[dict], None],
+    dtype: str,
+    n: Union[int, None],
+) -> dict:
+    res_dict = _result_dict(step.test_name, deepcopy(step.test_inputs))
+    res_dict["valid"] = n_errors == 0
+    if n_errors:
+        res_dict["percentage_of_column_is_error"] = n_errors / n_rows * 100
+        if n is not None:
+            if dtype.startswith(("DATE", "TIMESTAMP", "TIME")):
+                null_kind = "temporal"
+            elif dtype in ["DOUBLE", "FLOAT"]:
+                null_kind = "float"
+            else:
+                null_kind = None
+            unexpected_values = pd.Series(
+                [_format_unexpected_value(s["value"], null_kind) for s in sample],
+                index=[s["index"] for s in sample],
+                dtype=object,
+            )
+            _fill_unexpected_sample(res_dict, unexpected_values, n)
+
+    return res_dict
+
+
+def _duckdb_min_max_kernel(
+    c: str, dtype: str, colname: str, minimum=None, maximum=None
+) -> str:
+    failed = _get_min_max_series_out_of_bounds_col(
+        c, colname, minimum, maximum, **duckdb_comparisons
+    )
+    if dtype in ["DOUBLE", "FLOAT"]:
+        # NaN is bigger than every other value in duckdb
+        failed = f"(NOT isnan({c}) AND {failed})"
+    return failed
+
+
+def _duckdb_min_max_length_kernel(
+    c: str, dtype: str, colname: str, minimum=None, maximum=None
+) -> str:
+    return _get_min_max_series_out_of_bounds_col(
+        f"length({c})", colname, minimum, maximum, **duckdb_comparisons
+    )
+
+
+def _duckdb_pattern_kernel(c: str, dtype: str, regex: CompiledRegex) -> str:
+    re_failed = f"NOT {re_match_udf}({c}, {_literal(regex.pattern)})"
+    if regex.engine == "re2":
+        # RE2 differs from re for unicode classes (e.g. \d), $ before a
+        # trailing newline and some whitespace in \s so these values are
+        # rechecked with re (see _get_re2_recheck)
+        same_in_re2 = f"strlen({c}) = length({c}) AND NOT suffix({c}, chr(10))"
+        if regex.has_whitespace_class:
+            whitespace = _literal(re2_unmatched_whitespace)
+            same_in_re2 += f" AND NOT regexp_matches({c}, {whitespace})"
+        return (
+            f"CASE WHEN {c} IS NULL THEN NULL "
+            f"WHEN {same_in_re2} "
+            f"THEN NOT regexp_matches({c}, {_literal(regex.anchored_pattern)}) "
+            f"ELSE {re_failed} END"
+        )
+    return f"CASE WHEN {c} IS NULL THEN NULL ELSE {re_failed} END"
+
+
+def _duckdb_enum_kernel(c: str, dtype: str, enum: frozenset, nullable: bool) -> str:
+    enum = _get_duckdb_enum_values(enum, dtype)
+    if enum:
+        in_enum = f"coalesce({c} IN ({', '.join(_literal(e) for e in enum)}), false)"
+    else:
+        in_enum = "false"
+    if nullable:
+        in_enum = f"({in_enum} OR {c} IS NULL)"
+    return f"NOT {in_enum}"
+
+
+def _get_duckdb_enum_values(enum: frozenset, dtype: str) -> list:
+    """
+    Returns the enum values a column of dtype can be equal to with pandas
+    isin, which compares numbers (and bools) by value but never matches a
+    number to a str (e.g. 1 is not in ["1"]). duckdb would cast the values
+    to the type of the column instead.
+    """
+    numbers = [
+        e for e in enum if isinstance(e, (bool, int, float)) and not pd.isna(e)
+    ]
+    if dtype == "VARCHAR":
+        return [e for e in enum if isinstance(e, str)]
+    elif dtype == "BOOLEAN":
+        # e.g. 1 == True but 2 is not equal to either bool
+        return [bool(e) for e in numbers if e in (0, 1)]
+    elif dtype in duckdb_numeric_types or dtype.startswith("DECIMAL"):
+        return [int(e) if isinstance(e, bool) else e for e in numbers]
+    else:
+        return [e for e in enum if e is not None]
+
+
+def _duckdb_nullable_kernel(c: str, dtype: str) -> str:
+    if dtype in ["DOUBLE", "FLOAT"]:
+        return f"({c} IS NULL OR isnan({c}))"
+    return f"{c} IS NULL"
+
+
+def _duckdb_date_or_datetime_kernel(
+    c: str, dtype: str, dt_format: str, check_for_no_time_component=False
+) -> str:
+    check = "true" if check_for_no_time_component else "false"
+    return f"{invalid_datetime_udf}({c}, {_literal(dt_format)}, {check})"
+
+
+def _duckdb_typed_datetime_kernel(c: str, dtype: str, meta_type: str) -> str:
+    if dtype in duckdb_timezone_types:
+        return f"{c} IS NOT NULL"
+
+    unit, values = duckdb_datetime_units[dtype]
+    values = values.format(c)
+    divisor, max_abs = _get_typed_datetime_bounds(unit, meta_type)
+    failed = ["false"]
+    if divisor > 1:
+        failed.append(f"{values} % {divisor} != 0")
+    if max_abs is not None:
+        failed.append(f"abs({values}) > {max_abs}")
+    return f"({' OR '.join(failed)})"
+
+
+_duckdb_kernels: Dict[str, Callable[..., str]] = {
+    "min_max_test": _duckdb_min_max_kernel,
+    "min_max_length_test": _duckdb_min_max_length_kernel,
+    "pattern_test": _duckdb_pattern_kernel,
+    "enum_test": _duckdb_enum_kernel,
+    "nullable_test": _duckdb_nullable_kernel,
+    "datetime_format_test": _duckdb_date_or_datetime_kernel,
+    "date_format_test": _duckdb_date_or_datetime_kernel,
+}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value) -> str:
+    if value is None:
+        return "NULL"
+    elif isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (int, float)):
+        return repr(value)
+    elif isinstance(value, (list, tuple)):
+        return f"[{', '.join(_literal(v) for v in value)}]"
+    else:
+        return "'" + str(value).replace("'", "''") + "'"
+
+
+def _connect() -> "duckdb.DuckDBPyConnection":
+    """
+    Returns an in-memory duckdb connection (which spills to disk when it
+    runs out of memory) with the python functions used by the kernels.
+    """
+    con = duckdb.connect()
+    kwargs = {"type": "arrow", "null_handling": "special"}
+    con.create_function(
+        re_match_udf, _re_match, ["VARCHAR", "VARCHAR"], "BOOLEAN", **kwargs
+    )
+    con.create_function(
+        to_datetime_udf, _to_datetime, ["VARCHAR", "VARCHAR"], "TIMESTAMP", **kwargs
+    )
+    con.create_function(
+        invalid_datetime_udf,
+        _invalid_datetime,
+        ["VARCHAR", "VARCHAR", "BOOLEAN"],
+        "BOOLEAN",
+        **kwargs,
+    )
+    return con
+
+
+def _re_match(values: pa.Array, patterns: pa.Array) -> pa.Array:
+    return pa.array(
+        [
+            None if v is None else _compile_regex(p).regex.match(v) is not None
+            for v, p in zip(values.to_pylist(), patterns.to_pylist())
+        ],
+        type=pa.bool_(),
+    )
+
+
+def _to_datetime(values: pa.Array, formats: pa.Array) -> pa.Array:
+    # the format is a constant so is the same for every value
+    parsed = pd.to_datetime(
+        values.to_pandas(), format=formats[0].as_py(), errors="coerce"
+    )
+    return pa.array(parsed, type=pa.timestamp("us"), from_pandas=True)
+
+
+def _invalid_datetime(
+    values: pa.Array, formats: pa.Array, checks: pa.Array
+) -> pa.Array:
+    col_oob = _get_invalid_date_or_datetime_col(
+        values.to_pandas(), formats[0].as_py(), checks[0].as_py()
+    )
+    return pa.array(col_oob.to_numpy(dtype=bool))
+
+
+def _get_duckdb_types(con: "duckdb.DuckDBPyConnection", view: str) -> Dict[str, str]:
+    return {
+        name: dtype for name, dtype, *_ in con.execute(f"DESCRIBE {view}").fetchall()
+    }
+
+
+def _create_duckdb_view(
+    con: "duckdb.DuckDBPyConnection",
+    filepath: str,
+    table_params: dict,
+    metadata: Metadata,
+    with_index: bool = True,
+    tmpdir: str = None,
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Creates a view of the data from the given filepath. Column checks are
+    the same as the PandasValidator's and the metadata is updated in place
+    to match the data. Nothing is read apart from the header (and the first
+    rows of JSONL files to infer their types) unless the data is sampled
+    (with row-limit). S3 files are downloaded to tmpdir first.
+
+    Returns the name of the view, which has a row index column (if
+    with_index) and the columns in the metadata (cast to the metadata if it
+    is not for parquet). For each cast that can fail there is also a bool
+    column which is True where a value could not be cast (the names of these
+    are returned as a dict).
+    """
+    meta_col_names = _get_meta_col_names(metadata)
+    file_format = infer_file_format(filepath, metadata)
+
+    if filepath.startswith("s3://"):
+        filepath = _download_s3_file(filepath, tmpdir or tempfile.gettempdir())
+
+    if file_format == FileFormat.CSV:
+        pandas_kwargs = table_params.get("pandas-kwargs", {})
+        na_values = list(pandas_kwargs.get("na_values", []))
+        if pandas_kwargs.get("keep_default_na", True):
+            na_values += default_na_values
+        expect_header = table_params.get("expect-header", True)
+        csv_kwargs = {
+            "header": expect_header,
+            "all_varchar": True,
+            "delim": ",",
+            # duckdb needs at least one null string
+            "nullstr": na_values or [chr(0)],
+        }
+        if not expect_header:
+            csv_kwargs["names"] = meta_col_names
+        kwargs = ", ".join(f"{k} = {_literal(v)}" for k, v in csv_kwargs.items())
+        source = f"read_csv({_literal(filepath)}, {kwargs})"
+    elif file_format == FileFormat.JSON:
+        source = f"read_json({_literal(filepath)}, format = 'newline_delimited')"
+    else:
+        source = f"read_parquet({_literal(filepath)})"
+
+    con.execute(f"CREATE TEMP VIEW __data_linter_raw AS SELECT * FROM {source}")
+    columns = list(_get_duckdb_types(con, "__data_linter_raw"))
+    clean_columns = _clean_column_names(columns, table_params)
+
+    cols_to_keep = _check_columns(clean_columns, table_params, metadata, meta_col_names)
+    if cols_to_keep is None:
+        cols_to_keep = clean_columns
+
+    renamed = {clean: raw for raw, clean in zip(columns, clean_columns)}
+    selected = [f"{_quote(renamed[c])} AS {_quote(c)}" for c in cols_to_keep]
+    if with_index:
+        selected.insert(0, f"row_number() OVER () - 1 AS {_quote(row_index_name)}")
+    query = f"SELECT {', '.join(selected)} FROM __data_linter_raw"
+
+    # sample the data, if required
+    row_limit = table_params.get("row-limit", None)
+    if row_limit:
+        query = f"SELECT * FROM ({query}) USING SAMPLE reservoir({int(row_limit)} ROWS)"
+        seed = table_params.get("row-limit-seed")
+        if seed is not None:
+            query += f" REPEATABLE ({int(seed)})"
+    con.execute(f"CREATE TEMP VIEW __data_linter_data AS {query}")
+
+    schema = _get_duckdb_types(con, "__data_linter_data")
+    cols = [_quote(row_index_name)] if with_index else []
+    cast_error_cols = {}
+    cast_to_meta = metadata.file_format not in ["parquet", "snappy.parquet"]
+    for meta_col in metadata.columns:
+        name = meta_col["name"]
+        if name not in schema:
+            continue
+        elif not cast_to_meta:
+            cols.append(_quote(name))
+            continue
+
+        cast = _cast_duckdb_col(_quote(name), schema[name], meta_col)
+        cols.append(f"{cast} AS {_quote(name)}")
+        if meta_col["type_category"] in ["integer", "float", "timestamp"]:
+            cast_error_cols[name] = f"__cast_error_{name}"
+            cast_error = f"({cast}) IS NULL AND {_quote(name)} IS NOT NULL"
+            cols.append(f"{cast_error} AS {_quote(cast_error_cols[name])}")
+
+    con.execute(
+        "CREATE TEMP VIEW __data_linter_cast AS "
+        f"SELECT {', '.join(cols)} FROM __data_linter_data"
+    )
+    return "__data_linter_cast", cast_error_cols
+
+
+def _download_s3_file(filepath: str, dirpath: str) -> str:
+    s3fs = get_s3_filesystem()
+    b, k = s3_path_to_bucket_key(filepath)
+    local_path = os.path.join(dirpath, os.path.basename(k))
+    with s3fs.open_input_stream(os.path.join(b, k)) as stream:
+        with open(local_path, "wb") as f:
+            shutil.copyfileobj(stream, f)
+    return local_path
+
+
+def _cast_duckdb_col(r: str, dtype: str, meta_col: dict) -> str:
+    """
+    SQL casting the column to the metadata with the same rules as
+    arrow_pd_parser.caster.cast_pandas_table_to_schema (where possible).
+    Values that cannot be cast are null.
+    """
+    type_category = meta_col["type_category"]
+    is_str = dtype == "VARCHAR"
+    is_int = dtype in ["TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT"]
+
+    if type_category == "integer":
+        if is_int:
+            return f"CAST({r} AS BIGINT)"
+        # duckdb rounds floats cast to integers and pandas.to_numeric reads
+        # e.g. "1.0" as a float so only whole numbers are cast
+        f = _cast_duckdb_float(r, is_str)
+        value = r if is_str else f
+        return f"CASE WHEN {f} = trunc({f}) THEN TRY_CAST({value} AS BIGINT) END"
+    elif type_category == "float":
+        return _cast_duckdb_float(r, is_str)
+    elif type_category == "boolean":
+        if dtype == "BOOLEAN":
+            return r
+        s = f"lower(trim(CAST({r} AS VARCHAR)))"
+        return (
+            f"CASE WHEN list_contains({_literal(bool_true_values)}, {s}) THEN true "
+            f"WHEN list_contains({_literal(bool_false_values)}, {s}) THEN false END"
+        )
+    elif type_category == "string":
+        return f"CAST({r} AS VARCHAR)"
+    elif type_category == "timestamp":
+        is_date = meta_col["type"].startswith("date")
+        if is_str:
+            default_format = default_date_format if is_date else default_datetime_format
+            dt_format = meta_col.get("datetime_format", default_format)
+            fmt = _literal(dt_format)
+            # strptime is more lenient than pandas.to_datetime (e.g. it ignores
+            # leading whitespace) so values that do not format back to the
+            # same string are parsed with pandas.to_datetime instead
+            if dt_format == default_format:
+                # casting is quicker than strptime for the ISO formats
+                p = f"TRY_CAST({r} AS {'DATE' if is_date else 'TIMESTAMP'})"
+                formatted = f"CAST({p} AS VARCHAR)"
+            else:
+                p = f"try_strptime({r}, {fmt})"
+                formatted = f"strftime({p}, {fmt})"
+            parsed = (
+                f"CASE WHEN {r} IS NULL THEN NULL "
+                f"WHEN {formatted} = {r} THEN CAST({p} AS TIMESTAMP) "
+                f"ELSE {to_datetime_udf}({r}, {fmt}) END"
+            )
+        else:
+            parsed = f"TRY_CAST({r} AS TIMESTAMP)"
+        return f"CAST({parsed} AS DATE)" if is_date else parsed
+    else:
+        return r
+
+
+def _cast_duckdb_float(r: str, is_str: bool) -> str:
+    if is_str:
+        # duckdb also reads e.g. "1_000" (which pandas.to_numeric does not)
+        return f"TRY_CAST(CASE WHEN strpos({r}, '_') = 0 THEN {r} END AS DOUBLE)"
+    return f"TRY_CAST({r} AS DOUBLE)"
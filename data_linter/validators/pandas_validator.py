@@ -1,35 +1,176 @@
+import io
 import logging
-import inspect
+import operator
+import os
 import re
 import traceback
 
-from functools import wraps
+from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from mojap_metadata import Metadata
-from typing import Union
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 from arrow_pd_parser import reader
-from arrow_pd_parser.caster import cast_pandas_table_to_schema
+from dataengineeringutils3.s3 import s3_path_to_bucket_key
+from arrow_pd_parser.caster import PandasCastError, cast_pandas_column_to_schema
 
 from data_linter.validators.base import (
     BaseTableValidator,
+    ValidatorResult,
 )
+from data_linter.validators.s3_files import get_s3_filesystem, pop_prefetched_footer
+
+try:
+    import numba
+except ImportError:
+    numba = None
 
 log = logging.getLogger("root")
 default_date_format = "%Y-%m-%d"
 default_datetime_format = "%Y-%m-%d %H:%M:%S"
-global_log_verbosity = None
+# formats with every digit written out, so each valid value is the same width
+iso_format_widths = {default_date_format: 10, default_datetime_format: 19}
+iso_separators = {4: "-", 7: "-", 10: " ", 13: ":", 16: ":"}
+iso_days_in_month = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+# rows of values checked at once so each block of bytes stays in cache
+iso_block_rows = 65536
+# nanoseconds in each unit of a timestamp / date column that is already typed
+datetime_unit_ns = {"D": 86_400 * 10**9, "s": 10**9, "ms": 10**6, "us": 10**3, "ns": 1}
+default_unique_values_threshold = 0.2
+cardinality_sample_size = 10000
+row_limit_chunksize = 100000
+pyarrow_strings_chunksize = 100000
+header_probe_bytes = 65536
+# dtypes that CSV columns are parsed straight into (by type category), string
+# columns are parsed into the string dtype (see _get_string_dtype). Integer
+# and boolean columns are left to the parser to infer as it is faster to cast
+# its int64 and bool columns after reading than to parse them as Int64/boolean.
+csv_read_dtypes = {"float": "float64", "timestamp": str}
+regex_cache_size = 256
+# syntax RE2 reads differently to python's re (rather than rejecting it), so
+# patterns using it are matched with re: POSIX classes (e.g. [[:alpha:]],
+# which re reads as a set of characters) and {,n} (which RE2 reads as text)
+re2_differing_syntax = re.compile(r"\[:\^?[a-z]+:\]|\{,\d*\}")
+# ASCII whitespace matched by python's \s but not by RE2's
+re2_unmatched_whitespace = r"[\x0b\x1c-\x1f]"
+# nullable numeric dtypes the fused kernel runs on (with a null mask)
+masked_numeric_dtypes = (
+    pd.Int8Dtype,
+    pd.Int16Dtype,
+    pd.Int32Dtype,
+    pd.Int64Dtype,
+    pd.Float32Dtype,
+    pd.Float64Dtype,
+)
+# bit set in the code of a row for each test the fused kernel runs
+fused_test_bits = {"min_max_test": 1, "enum_test": 2, "nullable_test": 4}
+# enums up to this size are scanned by the fused kernel rather than searched
+fused_enum_scan_size = 32
+# max number of values in each block of columns that are checked together
+batch_max_cells = 10_000_000
+# min number of tested columns for a table to be checked in blocks. Narrower
+# tables spend more time copying the blocks than they save on the per column
+# overhead of the tests
+batch_min_columns = 1000
 
 
 class ColumnError(Exception):
     pass
 
 
-class PandasValidator(BaseTableValidator):
+class ReservoirSample:
     """
-    Validator using Pandas
+    Uniform random sample (without replacement) of up to n rows from a
+    stream of dataframes. Each row is given a random key and the rows with
+    the n smallest keys are kept, so only the sample and the current chunk
+    are ever held in memory.
+    """
+
+    def __init__(self, n: int, seed: int = None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.df = None
+        self.keys = np.empty(0)
+
+    def add(self, df: pd.DataFrame):
+        keys = self.rng.random(len(df))
+        if len(self.keys) >= self.n:
+            # only rows with a smaller key than the biggest in the sample
+            # can make it into the sample
+            in_sample = keys < self.keys.max()
+            df, keys = df[in_sample], keys[in_sample]
+
+        if self.df is not None:
+            df = pd.concat([self.df, df])
+            keys = np.concatenate([self.keys, keys])
+
+        if len(keys) > self.n:
+            keep = np.argpartition(keys, self.n)[: self.n]
+            df, keys = df.iloc[keep], keys[keep]
+
+        self.df, self.keys = df, keys
+
+
+class ChunkedValidatorResult(ValidatorResult):
+    """
+    ValidatorResult that combines the column test results of each chunk
+    of a file, so the final result is the same as one from validating
+    the whole file at once.
+    """
+
+    def __init__(
+        self,
+        result_dict=None,
+        validator_valid_key_name=None,
+        log_verbosity: int = None,
+    ):
+        super().__init__(result_dict, validator_valid_key_name)
+        self.log_verbosity = log_verbosity
+        self.n_rows = 0
+        self.chunk_n_rows = 0
+        self._n_errors = {}
+
+    def start_chunk(self, n_rows: int):
+        self.n_rows += n_rows
+        self.chunk_n_rows = n_rows
+
+    def add_test_to_col(self, colname, testname, test_result):
+        key = (colname, testname)
+        n_errors = self._n_errors.get(key, 0)
+        chunk_n_errors = _get_n_errors(test_result, self.chunk_n_rows)
+
+        previous_result = self.result.get(colname, {}).get(testname)
+        if previous_result is not None:
+            test_result = _merge_test_results(
+                previous_result,
+                n_errors,
+                test_result,
+                chunk_n_errors,
+                self.log_verbosity,
+            )
+
+        self._n_errors[key] = n_errors + chunk_n_errors
+        if self._n_errors[key]:
+            test_result["percentage_of_column_is_error"] = (
+                self._n_errors[key] / self.n_rows * 100
+            )
+
+        super().add_test_to_col(colname, testname, test_result)
+
+
+class PlanValidator(BaseTableValidator):
+    """
+    Base class for the validators that run the tests of a ValidationPlan,
+    which is compiled from the metadata once per table and passed to the
+    validator of each file with the plan kwarg.
     """
 
     def __init__(
@@ -39,283 +180,1212 @@ class PandasValidator(BaseTableValidator):
         metadata: Union[dict, str, Metadata],
         log_verbosity: int = None,
         ignore_missing_cols: bool = False,
+        plan: "ValidationPlan" = None,
     ):
         super().__init__(filepath, table_params, metadata)
-        global global_log_verbosity
-        global_log_verbosity = table_params.get("log_verbosity", log_verbosity)
+        self.log_verbosity = table_params.get("log_verbosity", log_verbosity)
         self.ignore_missing_cols = ignore_missing_cols
+        if not plan:
+            try:
+                plan = self.compile_plan(table_params, self.metadata)
+            except Exception:
+                # e.g. an invalid regex in the metadata. The file fails and
+                # none of its tests are run
+                traceback_message = traceback.format_exc()
+                self.response.add_table_test(
+                    "compile_validation_plan",
+                    {self.response.vvkn: False, "traceback": traceback_message},
+                )
+                log.error(traceback_message)
+                plan = ValidationPlan()
+        self.plan = plan
 
-    def write_validation_errors_to_log(self):
-        table_result = self.response.get_result()
-        if not table_result["valid"]:
-            failed_cols = self.response.get_names_of_column_failures()
-            err_msg = (
-                "Table failed validation. "
-                f"Col failures: {failed_cols}. "
-                "See response error log for more details."
-            )
-            log.error(err_msg, extra={"context": "VALIDATION"})
-            log.debug(str(table_result), extra={"context": "VALIDATION"})
+    @classmethod
+    def compile_plan(
+        cls, table_params: dict, metadata: Union[dict, str, Metadata]
+    ) -> "ValidationPlan":
+        return ValidationPlan.from_metadata(metadata, table_params)
+
+
+class PandasValidator(PlanValidator):
+    """
+    Validator using Pandas
+    """
+
+    reads_parquet_footers = True
 
     def read_data_and_validate(self):
         """Reads data from filepath and validates it.
 
-        Data is read using pd_arrow_parser.
+        Data is read using pd_arrow_parser. If the table params set a
+        chunksize (number of rows or a memory size like "500MB") the data
+        is streamed and validated one chunk at a time, with the results
+        of each chunk combined into a single response.
         """
         fail_response_dict = {self.response.vvkn: False}
-        try:
-            df, self.metadata = _parse_data_to_pandas(
-                self.filepath, self.table_params, self.metadata
+
+        chunksize = self.table_params.get("chunksize")
+        read_cols = None
+        if self.table_params.get("only-read-tested-cols"):
+            read_cols = self.plan.columns
+        dfs = _iter_data_to_pandas(
+            self.filepath, self.table_params, self.metadata, chunksize, read_cols
+        )
+        if self.table_params.get("row-limit"):
+            # the chunks are only used to sample the data
+            chunksize = None
+
+        if chunksize:
+            self.response = ChunkedValidatorResult(
+                result_dict=self.response.result,
+                validator_valid_key_name=self.response.vvkn,
+                log_verbosity=self.log_verbosity,
             )
-        except Exception:
-            traceback_message = traceback.format_exc()
-            fail_response_dict["traceback"] = traceback_message
-            self.response.add_table_test("parse_data_to_pandas", fail_response_dict)
-            log.error(traceback_message)
-            df = None
-
-        if df is not None:
+
+        while True:
+            try:
+                df = next(dfs)
+            except StopIteration:
+                break
+            except Exception:
+                traceback_message = traceback.format_exc()
+                fail_response_dict["traceback"] = traceback_message
+                self.response.add_table_test("parse_data_to_pandas", fail_response_dict)
+                log.error(traceback_message)
+                break
+
+            if chunksize:
+                self.response.start_chunk(len(df))
+
             try:
                 self.validate_df(df)
             except Exception:
                 self.response.add_table_test("overall_validation", fail_response_dict)
                 log.error(traceback.format_exc())
+                break
 
-    def validate_df(self, df):
-        for m in self.metadata.columns:
-            self.validate_col(df[m["name"]], m)
+            if self.fail_fast and not self.valid:
+                if chunksize:
+                    log.info("fail-fast is set so not validating the remaining chunks")
+                break
 
-    def validate_col(self, col, meta_col):
+    def validate_df(self, df):
+        self.plan.run(
+            df,
+            self.response,
+            fail_fast=self.fail_fast,
+            log_verbosity=self.log_verbosity,
+        )
 
-        self.min_max_test(col, meta_col)
-        self.min_max_length_test(col, meta_col)
-        self.pattern_test(col, meta_col)
-        self.enum_test(col, meta_col)
-        self.nullable_test(col, meta_col)
-        self.datetime_format_test(col, meta_col)
-        self.date_format_test(col, meta_col)
+    def validate_col(self, col, meta_col, col_is_str: bool = None):
+        plan = ValidationPlan.from_meta_cols([meta_col])
+        plan.run_col(
+            col,
+            meta_col["name"],
+            self.response,
+            col_is_str=col_is_str,
+            log_verbosity=self.log_verbosity,
+        )
 
     def min_max_test(self, col, meta_col):
-        res_dict = _min_max_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "min_max_test", res_dict)
+        self._run_test("min_max_test", col, meta_col)
 
     def min_max_length_test(self, col, meta_col):
-        res_dict = _min_max_length_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "min_max_length_test", res_dict)
+        self._run_test("min_max_length_test", col, meta_col)
 
     def pattern_test(self, col, meta_col):
-        res_dict = _pattern_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "pattern_test", res_dict)
+        self._run_test("pattern_test", col, meta_col)
 
     def enum_test(self, col, meta_col):
-        res_dict = _enum_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "enum_test", res_dict)
+        self._run_test("enum_test", col, meta_col)
 
     def nullable_test(self, col, meta_col):
-        res_dict = _nullable_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "nullable_test", res_dict)
+        self._run_test("nullable_test", col, meta_col)
 
-    def datetime_format_test(self, col, meta_col):
-        res_dict = _datetime_format_test(col, meta_col)
-        col_name = meta_col["name"]
-        if res_dict is not None:
-            self.response.add_test_to_col(col_name, "datetime_format_test", res_dict)
+    def datetime_format_test(self, col, meta_col, col_is_str: bool = None):
+        self._run_test("datetime_format_test", col, meta_col, col_is_str)
 
-    def date_format_test(self, col, meta_col):
-        res_dict = _date_format_test(col, meta_col)
-        col_name = meta_col["name"]
+    def date_format_test(self, col, meta_col, col_is_str: bool = None):
+        self._run_test("date_format_test", col, meta_col, col_is_str)
+
+    def _run_test(self, test_name, col, meta_col, col_is_str: bool = None):
+        res_dict = _run_test_for_meta(
+            test_name, col, meta_col, col_is_str, self.log_verbosity
+        )
         if res_dict is not None:
-            self.response.add_test_to_col(col_name, "date_format_test", res_dict)
-
-
-def check_run_validation_for_meta(func):
-    """
-    Wrapper for each validation test. Will get inputs to function
-    and check if function should be called based on the inputs.
-    (Most likely this will be done based on the properties of the supplied
-    metadata).
-
-    Will return nothing if function should not be called.
-    """
-
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        sig = inspect.signature(func)
-        argmap = sig.bind_partial(*args, **kwargs).arguments
-        mc = argmap.get("meta_col")
-
-        # Check if column is string or str dtype
-        col_is_str = _check_pandas_series_is_str(argmap.get("col"))
-
-        call_method = False
-        if func.__name__ == "_min_max_test" and _check_meta_has_params(
-            ["minimum", "maximum"], mc
-        ):
-            call_method = True
-        elif func.__name__ == "_min_max_length_test" and _check_meta_has_params(
-            ["minLength", "maxLength"], mc
-        ):
-            call_method = True
-        elif func.__name__ == "_pattern_test" and _check_meta_has_params(
-            ["pattern"], mc
-        ):
-            call_method = True
-        elif func.__name__ == "_enum_test" and _check_meta_has_params(["enum"], mc):
-            call_method = True
-        elif func.__name__ == "_nullable_test" and not _check_meta_has_params(
-            [None, True], [mc.get("nullable")]
-        ):
-            call_method = True
-        elif func.__name__ == "_date_format_test" and mc.get("type", "").startswith(
-            "date"
-        ):
-            if col_is_str:
-                call_method = True
+            self.response.add_test_to_col(meta_col["name"], test_name, res_dict)
+
+
+@dataclass
+class ValidationStep:
+    """
+    A single test to run against a column. The kernel is called with the
+    column and the (pre-parsed) args and returns a bool series that is True
+    where a value fails the test.
+
+    If on_uniques is True the kernel only depends on each value, so it can be
+    run against the unique values of the column instead of every row.
+
+    Most columns pass, so the per row result is only built if the test fails.
+    The check is called with the column and the args and returns True if
+    cheap reductions over the column (e.g. its min and max) show no value
+    can fail. Columns that are factorized are checked with the kernel's
+    result for their unique values instead, and numeric columns that are
+    fused take the result from the fused kernel.
+
+    Tests that are str_only are only run against str columns. The
+    typed_step (if there is one) is run instead if the column is already
+    typed as timestamps / dates (e.g. read from parquet).
+    """
+
+    column: str
+    test_name: str
+    kernel: Callable[..., pd.Series]
+    args: dict = field(default_factory=dict)
+    test_inputs: dict = field(default_factory=dict)
+    str_only: bool = False
+    on_uniques: bool = False
+    check: Callable[..., bool] = None
+    typed_step: "ValidationStep" = None
+
+    def valid_result(self) -> dict:
+        res_dict = _result_dict(self.test_name, deepcopy(self.test_inputs))
+        res_dict["valid"] = True
+        return res_dict
+
+    def run(
+        self,
+        col: pd.Series,
+        factorized: "FactorizedCol" = None,
+        log_verbosity: int = None,
+        fused: "FusedCol" = None,
+    ) -> dict:
+        if fused is not None and self.test_name in fused:
+            col_oob = fused.get_oob(self.test_name)
+        elif self.on_uniques and factorized is not None:
+            unique_oob = self.kernel(factorized.uniques, **self.args)
+            if unique_oob.fillna(False).any():
+                col_oob = factorized.broadcast(unique_oob)
             else:
-                msg = (
-                    f"Column {mc['name']} not tested. "
-                    "Tests for datetime encoded columns are not yet implemented."
+                col_oob = None
+        elif self.check is not None and self.check(col, **self.args):
+            col_oob = None
+        else:
+            col_oob = self.kernel(col, **self.args)
+
+        if col_oob is None:
+            # no value fails the test
+            return self.valid_result()
+        res_dict = _result_dict(self.test_name, deepcopy(self.test_inputs))
+        return _fill_res_dict(col, col_oob, res_dict, log_verbosity)
+
+
+class FactorizedCol:
+    """
+    A column split into the codes and unique values from pd.factorize.
+    The uniques have an extra NA value on the end so that NA values
+    (which have a code of -1) are also tested.
+    """
+
+    def __init__(self, col: pd.Series):
+        codes, uniques = pd.factorize(col)
+        self.index = col.index
+        self.codes = codes
+        self.uniques = pd.Series(uniques).reindex(range(len(uniques) + 1))
+
+    def __len__(self):
+        return len(self.uniques) - 1
+
+    def broadcast(self, unique_oob: pd.Series) -> pd.Series:
+        """
+        Maps the test result for each unique value back onto every row
+        """
+        unique_oob = unique_oob.fillna(False).to_numpy(dtype=bool)
+        return pd.Series(unique_oob[self.codes], index=self.index)
+
+    @classmethod
+    def from_low_cardinality_col(
+        cls, col: pd.Series, threshold: float
+    ) -> Union["FactorizedCol", None]:
+        """
+        Returns the factorized column if its ratio of distinct values to rows
+        is below the threshold, otherwise None. The ratio is first estimated
+        from the start of the column to avoid factorizing columns that are
+        clearly high cardinality.
+        """
+        if not threshold or col.empty:
+            return None
+
+        sample = col.iloc[:cardinality_sample_size]
+        if sample.nunique(dropna=False) >= threshold * len(sample):
+            return None
+
+        factorized = cls(col)
+        return factorized if len(factorized) < threshold * len(col) else None
+
+
+class FusedCol:
+    """
+    The results of the min/max, enum and nullable tests of a numeric column,
+    worked out in a single pass over its values (and null mask) by the fused
+    kernel instead of a pass per test. Each row has a code with the bit in
+    fused_test_bits set for every test it fails.
+
+    The fused kernel is compiled with numba, so columns are only fused if
+    numba is installed (see the numba extra).
+    """
+
+    def __init__(
+        self,
+        index: pd.Index,
+        test_names: List[str],
+        codes: np.ndarray,
+        counts: np.ndarray,
+    ):
+        self.index = index
+        self.test_names = test_names
+        self.codes = codes
+        self.counts = counts
+
+    def __contains__(self, test_name: str) -> bool:
+        return test_name in self.test_names
+
+    def get_oob(self, test_name: str) -> Union[pd.Series, None]:
+        """
+        Returns the bool series that is True where a value fails the test, or
+        None if no value fails it.
+        """
+        bit = fused_test_bits[test_name]
+        if not self.counts[bit.bit_length() - 1]:
+            return None
+        return pd.Series((self.codes & bit).astype(bool), index=self.index)
+
+    @classmethod
+    def from_numeric_col(
+        cls, col: pd.Series, steps: List["ValidationStep"]
+    ) -> Union["FusedCol", None]:
+        """
+        Runs the fused kernel over the column if it is numeric and has more
+        than one test that can be fused, otherwise returns None.
+        """
+        if _fused_numeric_kernel is None:
+            return None
+
+        buffers = _get_numeric_buffers(col)
+        if buffers is None:
+            return None
+        values, mask, nan_is_null = buffers
+
+        kernel_args = {
+            "minimum": 0,
+            "maximum": 0,
+            "has_min": False,
+            "has_max": False,
+            "enum_values": np.empty(0, dtype=values.dtype),
+            "check_enum": False,
+            "enum_nullable": True,
+        }
+        test_names = []
+        for step in steps:
+            if step.test_name == "min_max_test":
+                # bounds that are not set are not checked (see has_min/has_max)
+                bounds = [step.args["minimum"], step.args["maximum"]]
+                bounds = _get_fused_values(
+                    [0 if v is None else v for v in bounds], values.dtype
                 )
-                log.info(msg)
-        elif func.__name__ == "_datetime_format_test" and mc.get("type", "").startswith(
-            "timestamp"
-        ):
-            if col_is_str:
-                call_method = True
+                if bounds is None:
+                    continue
+                kernel_args["minimum"], kernel_args["maximum"] = bounds
+                kernel_args["has_min"] = step.args["minimum"] is not None
+                kernel_args["has_max"] = step.args["maximum"] is not None
+            elif step.test_name == "enum_test":
+                # isin does not match nulls to a None in the enum, so it is
+                # dropped (nulls only pass if the enum is nullable)
+                enum_values = [v for v in step.args["enum"] if v is not None]
+                enum_values = _get_fused_values(enum_values, values.dtype)
+                if enum_values is None:
+                    continue
+                kernel_args["enum_values"] = np.sort(enum_values)
+                kernel_args["check_enum"] = True
+                kernel_args["enum_nullable"] = step.args["nullable"]
+            elif step.test_name != "nullable_test":
+                continue
+            test_names.append(step.test_name)
+
+        # a single test is as quick to run with its check
+        if len(test_names) < 2:
+            return None
+
+        codes = np.empty(len(values), dtype=np.uint8)
+        counts = _fused_numeric_kernel(
+            values, mask, nan_is_null, codes=codes, **kernel_args
+        )
+        return cls(col.index, test_names, codes, counts)
+
+
+class ValidationPlan:
+    """
+    The tests to run against a table, compiled once from its metadata
+    (and table params) so the same plan can be run against every file
+    of the table. Plans only hold plain data, module level functions and
+    compiled regexes so can be pickled and sent to worker processes.
+    """
+
+    def __init__(
+        self,
+        steps: List[ValidationStep] = None,
+        unique_values_threshold: float = default_unique_values_threshold,
+    ):
+        self.steps = steps if steps else []
+        self.unique_values_threshold = unique_values_threshold
+        # looked up for every column, so wide tables are not quadratic
+        self.column_steps = {}
+        for step in self.steps:
+            self.column_steps.setdefault(step.column, []).append(step)
+
+    def __repr__(self):
+        return f"ValidationPlan({self.steps})"
+
+    @classmethod
+    def from_metadata(
+        cls, metadata: Union[dict, str, Metadata], table_params: dict = None
+    ) -> "ValidationPlan":
+        table_params = table_params if table_params else {}
+        metadata = Metadata.from_infer(metadata)
+
+        meta_cols = deepcopy(metadata.columns)
+        if table_params.get("headers-ignore-case"):
+            for c in meta_cols:
+                c["name"] = c["name"].lower()
+
+        return cls.from_meta_cols(
+            meta_cols,
+            unique_values_threshold=table_params.get(
+                "unique-values-threshold", default_unique_values_threshold
+            ),
+        )
+
+    @classmethod
+    def from_meta_cols(cls, meta_cols: List[dict], **kwargs) -> "ValidationPlan":
+        steps = []
+        for meta_col in meta_cols:
+            for test_name in _step_compilers:
+                step = _compile_step(test_name, meta_col)
+                if step is not None:
+                    steps.append(step)
+        return cls(steps, **kwargs)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.column_steps)
+
+    def get_column_steps(self, column: str) -> List[ValidationStep]:
+        return self.column_steps.get(column, [])
+
+    def get_batched_passes(
+        self, df: pd.DataFrame, columns: List[str]
+    ) -> Dict[str, set]:
+        """
+        Runs the nullable and min/max tests of wide tables for blocks of
+        columns at once, with one DataFrame reduction per block (e.g.
+        df[cols].isna().any()) instead of one per column. Returns the names
+        of the tests each column passes. The columns that fail are left to
+        run_col to work out which values fail.
+
+        Only tables with at least batch_min_columns tested columns are
+        batched. Blocks are at most batch_max_cells values, so tables are only
+        batched if more than one column fits in a block.
+        """
+        passed = {}
+        batch_size = batch_max_cells // max(len(df), 1)
+        if len(columns) < batch_min_columns or batch_size < 2:
+            return passed
+
+        nullable_cols = []
+        min_max_cols = {}
+        for column in columns:
+            for step in self.column_steps[column]:
+                if step.test_name == "nullable_test":
+                    nullable_cols.append(column)
+                elif step.test_name == "min_max_test":
+                    dtype = df[column].dtype
+                    if dtype.kind in "iuf":
+                        min_max_cols.setdefault(dtype, []).append(step)
+
+        for batch in _batched(nullable_cols, batch_size):
+            has_nulls = df[batch].isna().any()
+            for column in batch:
+                if not has_nulls[column]:
+                    passed.setdefault(column, set()).add("nullable_test")
+
+        # columns of the same dtype so the min and max keep their type
+        for steps in min_max_cols.values():
+            for batch in _batched(steps, batch_size):
+                block = df[[s.column for s in batch]]
+                lowest, highest = block.min(), block.max()
+                for step in batch:
+                    in_bounds = _check_in_bounds(
+                        lowest[step.column],
+                        highest[step.column],
+                        step.args["minimum"],
+                        step.args["maximum"],
+                    )
+                    if in_bounds:
+                        passed.setdefault(step.column, set()).add(step.test_name)
+
+        return passed
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        response: ValidatorResult,
+        fail_fast=False,
+        log_verbosity: int = None,
+    ):
+        """
+        Runs every step against the dataframe and adds the results to the
+        response. Steps for columns that are not in the dataframe are skipped
+        (i.e. missing columns that are allowed).
+
+        If fail_fast is True the steps after the first failed test are not
+        run and are recorded as skipped in the response. log_verbosity is the
+        number of unexpected values to sample for each failed test (all of
+        them if 0 and none if None).
+
+        Plans hold no state from a run, so the same plan can be run by
+        validators in several threads at once.
+        """
+        columns = [c for c in self.columns if c in df.columns]
+        str_cols = _get_str_columns(
+            df, [c for c in columns if any(s.str_only for s in self.column_steps[c])]
+        )
+        passed = self.get_batched_passes(df, columns)
+        for i, column in enumerate(columns):
+            self.run_col(
+                df[column],
+                column,
+                response,
+                str_cols.get(column),
+                fail_fast,
+                log_verbosity,
+                passed.get(column),
+            )
+            if fail_fast and not response.result["valid"]:
+                for skipped_column in columns[i + 1 :]:
+                    for step in self.get_column_steps(skipped_column):
+                        response.add_skipped_test(skipped_column, step.test_name)
+                break
+
+    def run_col(
+        self,
+        col: pd.Series,
+        column: str,
+        response: ValidatorResult,
+        col_is_str: bool = None,
+        fail_fast: bool = False,
+        log_verbosity: int = None,
+        passed: set = None,
+    ):
+        """
+        Runs the steps for a single column and adds the results to the
+        response. passed is the names of the tests the column is already
+        known to pass (see get_batched_passes), which are not run again.
+        """
+        steps = self.get_column_steps(column)
+        passed = passed if passed else set()
+        to_run = [s for s in steps if s.test_name not in passed]
+
+        fused = FusedCol.from_numeric_col(col, to_run)
+        unfused = [s for s in to_run if fused is None or s.test_name not in fused]
+        factorized = None
+        if any(s.on_uniques for s in unfused):
+            factorized = FactorizedCol.from_low_cardinality_col(
+                col, self.unique_values_threshold
+            )
+
+        for i, step in enumerate(steps):
+            if step.test_name in passed:
+                res_dict = step.valid_result()
             else:
-                msg = (
-                    f"Column {mc['name']} not tested. "
-                    "Tests for datetime encoded columns are not yet implemented."
+                res_dict = _run_step(
+                    step, col, col_is_str, factorized, log_verbosity, fused
                 )
-                log.info(msg)
+            if res_dict is not None:
+                response.add_test_to_col(column, step.test_name, res_dict)
+                if fail_fast and not res_dict["valid"]:
+                    for skipped_step in steps[i + 1 :]:
+                        response.add_skipped_test(column, skipped_step.test_name)
+                    break
+
+
+def _run_step(
+    step: ValidationStep,
+    col: pd.Series,
+    col_is_str: bool = None,
+    factorized: FactorizedCol = None,
+    log_verbosity: int = None,
+    fused: FusedCol = None,
+):
+    if step.str_only:
+        if col_is_str is None:
+            col_is_str = _check_pandas_series_is_str(col)
+        if not col_is_str:
+            if step.typed_step is not None and _check_pandas_series_is_datetime(col):
+                return step.typed_step.run(col, log_verbosity=log_verbosity)
+            msg = (
+                f"Column {step.column} not tested. "
+                "Its values are neither str nor timestamps / dates."
+            )
+            log.info(msg)
+            return None
 
-        else:
-            pass
+    return step.run(col, factorized, log_verbosity, fused)
+
+
+def _run_test_for_meta(
+    test_name: str,
+    col: pd.Series,
+    meta_col: dict,
+    col_is_str: bool = None,
+    log_verbosity: int = None,
+) -> Union[dict, None]:
+    """
+    Runs a single test against a column. Returns None if the test does not
+    apply to the column based on its metadata.
+    """
+    step = _compile_step(test_name, meta_col)
+    if step is None:
+        return None
+    return _run_step(step, col, col_is_str, log_verbosity=log_verbosity)
 
-        return func(*args, **kwargs) if call_method else None
 
-    return wrapper
+def _compile_step(test_name: str, meta_col: dict) -> Union[ValidationStep, None]:
+    return _step_compilers[test_name](meta_col)
 
 
-@check_run_validation_for_meta
-def _min_max_test(col: pd.Series, meta_col: dict) -> dict:
+def _compile_min_max_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not _check_meta_has_params(["minimum", "maximum"], meta_col):
+        return None
 
     col_name = meta_col["name"]
     mi = meta_col.get("minimum")
     ma = meta_col.get("maximum")
 
-    test_inputs = {"column": col_name, "minimum_value": mi, "maximum_value": ma}
-    res_dict = _result_dict("min max numerical", test_inputs)
-
-    col_oob = _get_min_max_series_out_of_bounds_col(col, col_name, mi, ma)
-
-    return _fill_res_dict(col, col_oob, res_dict)
+    return ValidationStep(
+        column=col_name,
+        test_name="min_max_test",
+        kernel=_min_max_kernel,
+        check=_min_max_check,
+        args={"colname": col_name, "minimum": mi, "maximum": ma},
+        test_inputs={"column": col_name, "minimum_value": mi, "maximum_value": ma},
+    )
 
 
-@check_run_validation_for_meta
-def _min_max_length_test(col: pd.Series, meta_col: dict) -> dict:
+def _compile_min_max_length_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not _check_meta_has_params(["minLength", "maxLength"], meta_col):
+        return None
 
     col_name = meta_col["name"]
     mil = meta_col.get("minLength")
     mal = meta_col.get("maxLength")
 
-    test_inputs = {"column": col_name, "minimum_length": mil, "maximum_length": mal}
-    res_dict = _result_dict("min max length", test_inputs)
+    return ValidationStep(
+        column=col_name,
+        test_name="min_max_length_test",
+        kernel=_min_max_length_kernel,
+        on_uniques=True,
+        args={"colname": col_name, "minimum": mil, "maximum": mal},
+        test_inputs={
+            "column": col_name,
+            "minimum_length": mil,
+            "maximum_length": mal,
+        },
+    )
 
-    col_oob = _get_min_max_series_out_of_bounds_col(col.str.len(), col_name, mil, mal)
 
-    return _fill_res_dict(col, col_oob, res_dict)
+def _compile_pattern_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not _check_meta_has_params(["pattern"], meta_col):
+        return None
 
+    col_name = meta_col["name"]
+    pattern = meta_col.get("pattern")
+    regex = _compile_regex(pattern)
+
+    return ValidationStep(
+        column=col_name,
+        test_name="pattern_test",
+        kernel=_pattern_kernel,
+        on_uniques=True,
+        args={"regex": regex},
+        test_inputs={
+            "column": col_name,
+            "regex": pattern,
+            "regex_engine": regex.engine,
+        },
+    )
 
-@check_run_validation_for_meta
-def _pattern_test(col: pd.Series, meta_col: dict) -> dict:
+
+def _compile_enum_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not _check_meta_has_params(["enum"], meta_col):
+        return None
 
     col_name = meta_col["name"]
-    pattern = meta_col.get("pattern")
 
-    test_inputs = {"column": col_name, "regex": pattern}
+    return ValidationStep(
+        column=col_name,
+        test_name="enum_test",
+        kernel=_enum_kernel,
+        on_uniques=True,
+        check=_enum_check,
+        args={
+            "enum": frozenset(meta_col["enum"]),
+            "nullable": meta_col.get("nullable", True),
+        },
+        test_inputs={"column": col_name},
+    )
+
 
-    res_dict = _result_dict("regex", test_inputs)
+def _compile_nullable_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if meta_col.get("nullable") in [None, True]:
+        return None
 
-    col_oob = ~col.str.match(pattern)
+    col_name = meta_col.get("name")
 
-    return _fill_res_dict(col, col_oob, res_dict)
+    return ValidationStep(
+        column=col_name,
+        test_name="nullable_test",
+        kernel=_nullable_kernel,
+        check=_nullable_check,
+        test_inputs={"column": col_name},
+    )
 
 
-@check_run_validation_for_meta
-def _enum_test(col: pd.Series, meta_col: dict) -> dict:
+def _compile_datetime_format_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not meta_col.get("type", "").startswith("timestamp"):
+        return None
 
     col_name = meta_col["name"]
-    enum = meta_col.get("enum")
+    datetime_format = meta_col.get("datetime_format", default_datetime_format)
 
-    test_inputs = {"column": col_name}
+    return ValidationStep(
+        column=col_name,
+        test_name="datetime_format_test",
+        kernel=_get_invalid_date_or_datetime_col,
+        args={"dt_format": datetime_format},
+        test_inputs={"column": col_name, "datetime_format": datetime_format},
+        str_only=True,
+        on_uniques=True,
+        typed_step=_compile_typed_datetime_step("datetime_format_test", meta_col),
+    )
 
-    res_dict = _result_dict("enum", test_inputs)
 
-    if meta_col.get("nullable", True):
-        col_oob = ~col.fillna(enum[0]).isin(enum)
-    else:
-        col_oob = ~col.isin(enum)
+def _compile_date_format_step(meta_col: dict) -> Union[ValidationStep, None]:
+    if not meta_col.get("type", "").startswith("date"):
+        return None
 
-    return _fill_res_dict(col, col_oob, res_dict)
+    col_name = meta_col["name"]
+    datetime_format = meta_col.get("datetime_format", default_date_format)
 
+    return ValidationStep(
+        column=col_name,
+        test_name="date_format_test",
+        kernel=_get_invalid_date_or_datetime_col,
+        args={"dt_format": datetime_format, "check_for_no_time_component": True},
+        test_inputs={"column": col_name, "datetime_format": datetime_format},
+        str_only=True,
+        on_uniques=True,
+        typed_step=_compile_typed_datetime_step("date_format_test", meta_col),
+    )
 
-@check_run_validation_for_meta
-def _nullable_test(col: pd.Series, meta_col: dict) -> dict:
 
-    col_name = meta_col.get("name")
+def _compile_typed_datetime_step(
+    test_name: str, meta_col: dict
+) -> Union[ValidationStep, None]:
+    meta_type = meta_col["type"]
+    if _get_meta_datetime_unit(meta_type) is None:
+        return None
 
-    test_inputs = {
-        "column": col_name,
-    }
+    col_name = meta_col["name"]
 
-    res_dict = _result_dict("nullable", test_inputs)
+    return ValidationStep(
+        column=col_name,
+        test_name=test_name,
+        kernel=_get_invalid_typed_datetime_col,
+        args={"meta_type": meta_type},
+        test_inputs={"column": col_name, "type": meta_type},
+    )
 
-    col_oob = col.isnull()
 
-    return _fill_res_dict(col, col_oob, res_dict)
+# Order here is the order tests are run (and appear in the response)
+_step_compilers = {
+    "min_max_test": _compile_min_max_step,
+    "min_max_length_test": _compile_min_max_length_step,
+    "pattern_test": _compile_pattern_step,
+    "enum_test": _compile_enum_step,
+    "nullable_test": _compile_nullable_step,
+    "datetime_format_test": _compile_datetime_format_step,
+    "date_format_test": _compile_date_format_step,
+}
 
 
-@check_run_validation_for_meta
-def _date_format_test(col: pd.Series, meta_col) -> dict:
+def _min_max_kernel(
+    col: pd.Series, colname: str, minimum=None, maximum=None
+) -> pd.Series:
+    return _get_min_max_series_out_of_bounds_col(col, colname, minimum, maximum)
 
-    col_name = meta_col["name"]
 
-    datetime_format = meta_col.get("datetime_format", default_date_format)
-    test_inputs = {"column": col_name, "datetime_format": datetime_format}
+def _min_max_check(col: pd.Series, colname: str, minimum=None, maximum=None) -> bool:
+    return _check_in_bounds(*_min_and_max(col), minimum, maximum)
 
-    res_dict = _result_dict("datetime_format", test_inputs)
 
-    col_oob = ~col.apply(
-        lambda x: _valid_date_or_datetime_conversion(x, datetime_format, True)
+def _check_in_bounds(lowest, highest, minimum=None, maximum=None) -> bool:
+    """
+    Checks the min and max of a column are within the bounds. False if they
+    cannot be compared, so the kernel raises or handles it.
+    """
+    try:
+        if pd.isna(lowest):
+            # every value is null
+            return True
+        below = minimum is not None and bool(lowest < minimum)
+        above = maximum is not None and bool(highest > maximum)
+    except (TypeError, ValueError):
+        return False
+    return not (below or above)
+
+
+def _min_and_max(col: pd.Series) -> tuple:
+    """
+    The min and max of a column ignoring nulls (both null if every value is).
+    Numeric columns are reduced in a single pass over their values rather
+    than with Series.min/max, which copies the non null values of nullable
+    (masked) columns.
+    """
+    if col.empty:
+        return None, None
+    elif isinstance(col.dtype, np.dtype) and col.dtype.kind in "iuf":
+        values = col.to_numpy()
+        return np.fmin.reduce(values), np.fmax.reduce(values)
+    elif pd.api.types.is_numeric_dtype(col.dtype) and not col.dtype == "boolean":
+        min_max = pc.min_max(pa.array(col, from_pandas=True))
+        return min_max["min"].as_py(), min_max["max"].as_py()
+    else:
+        return col.min(), col.max()
+
+
+def _min_max_length_kernel(
+    col: pd.Series, colname: str, minimum=None, maximum=None
+) -> pd.Series:
+    return _get_min_max_series_out_of_bounds_col(
+        col.str.len(), colname, minimum, maximum
     )
-    return _fill_res_dict(col, col_oob, res_dict)
 
 
-@check_run_validation_for_meta
-def _datetime_format_test(col: pd.Series, meta_col):
+@dataclass(frozen=True)
+class CompiledRegex:
+    """
+    A pattern compiled for the pattern test. The engine is "re2" if the
+    pattern can be matched by pyarrow (which uses RE2) and "re" if it uses
+    features only Python's re module supports (e.g. lookarounds or
+    backreferences) or syntax RE2 reads differently (see re2_differing_syntax).
+    """
+
+    pattern: str
+    engine: str
+    regex: re.Pattern
 
-    col_name = meta_col["name"]
+    @property
+    def anchored_pattern(self) -> str:
+        # re.match only anchors at the start of the string
+        return f"^(?:{self.pattern})"
+
+    @property
+    def has_whitespace_class(self) -> bool:
+        return re.search(r"\\[sS]", self.pattern) is not None
+
+
+@lru_cache(maxsize=regex_cache_size)
+def _compile_regex(pattern: str) -> CompiledRegex:
+    regex = re.compile(pattern)
+    if re2_differing_syntax.search(pattern):
+        return CompiledRegex(pattern, "re", regex)
+
+    compiled = CompiledRegex(pattern, "re2", regex)
+    try:
+        pc.match_substring_regex(
+            pa.array([""], type=pa.string()), compiled.anchored_pattern
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        compiled = CompiledRegex(pattern, "re", regex)
+    return compiled
+
+
+def _pattern_kernel(col: pd.Series, regex: CompiledRegex) -> pd.Series:
+    if regex.engine == "re2":
+        try:
+            arr = pa.array(col, from_pandas=True)
+            matched = pc.match_substring_regex(arr, regex.anchored_pattern)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+        else:
+            col_oob = ~pd.Series(
+                pd.BooleanDtype().__from_arrow__(matched), index=col.index
+            )
+            recheck = _get_re2_recheck(arr, regex)
+            recheck = recheck.to_numpy(zero_copy_only=False)
+            recheck = recheck.astype(bool) & ~col_oob.isna().to_numpy()
+            if recheck.any():
+                col_oob[recheck] = ~_str_match(col[recheck], regex)
+            return col_oob
+
+    return ~_str_match(col, regex)
+
+
+def _get_re2_recheck(arr: pa.Array, regex: CompiledRegex) -> pa.Array:
+    """
+    Returns which values RE2 may match differently to re, to be rechecked
+    with re. These are values that are not ASCII (RE2's classes, e.g. \\d, are
+    not unicode aware), values ending in a newline (re's $ matches before it)
+    and, for patterns with \\s or \\S, values with whitespace that only re's \\s
+    matches.
+    """
+    recheck = pc.or_(pc.invert(pc.string_is_ascii(arr)), pc.ends_with(arr, "\n"))
+    if regex.has_whitespace_class:
+        recheck = pc.or_(
+            recheck, pc.match_substring_regex(arr, re2_unmatched_whitespace)
+        )
+    return recheck
+
+
+def _str_match(col: pd.Series, regex: CompiledRegex) -> pd.Series:
+    # string[pyarrow] columns can only be matched against a str pattern (with
+    # RE2) so are matched as python strings
+    if isinstance(col.dtype, pd.StringDtype) and col.dtype.storage != "python":
+        col = col.astype(pd.StringDtype("python"))
+    return col.str.match(regex.regex)
+
+
+def _enum_kernel(col: pd.Series, enum: frozenset, nullable: bool) -> pd.Series:
+    if nullable:
+        return ~(col.isin(enum) | col.isna())
+    else:
+        return ~col.isin(enum)
 
-    datetime_format = meta_col.get("datetime_format", default_datetime_format)
-    test_inputs = {"column": col_name, "datetime_format": datetime_format}
 
-    res_dict = _result_dict("datetime_format", test_inputs)
+def _enum_check(col: pd.Series, enum: frozenset, nullable: bool) -> bool:
+    # the column can only pass if it has at most the enum values and null, so
+    # high cardinality columns are caught from their start before col.unique
+    sample = col.iloc[:cardinality_sample_size]
+    if sample.nunique(dropna=False) > len(enum) + 1:
+        return False
+    uniques = pd.Series(col.unique())
+    return not _enum_kernel(uniques, enum, nullable).fillna(False).any()
 
-    col_oob = ~col.apply(
-        lambda x: _valid_date_or_datetime_conversion(x, datetime_format)
+
+def _nullable_kernel(col: pd.Series) -> pd.Series:
+    return col.isnull()
+
+
+def _nullable_check(col: pd.Series) -> bool:
+    return not col.hasnans
+
+
+def _get_numeric_buffers(col: pd.Series) -> Union[tuple, None]:
+    """
+    Returns the values of a signed integer or float column, its null mask
+    (empty if it has none) and whether NaN values are null. None if the column
+    is any other type.
+    """
+    if col.dtype.kind not in "if":
+        return None
+    elif isinstance(col.dtype, np.dtype):
+        nan_is_null = col.dtype.kind == "f"
+        return col.to_numpy(), np.empty(0, dtype=bool), nan_is_null
+    elif isinstance(col.dtype, masked_numeric_dtypes):
+        values = col.to_numpy(dtype=col.dtype.numpy_dtype, na_value=0)
+        return values, col.isna().to_numpy(), False
+    else:
+        return None
+
+
+def _get_fused_values(values, dtype: np.dtype) -> Union[np.ndarray, None]:
+    """
+    Returns the min/max bounds or enum values as an array the fused kernel can
+    compare against a column of the given dtype, or None if they are not all
+    numbers.
+    """
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    # ints are compared as ints so large values are not rounded
+    if dtype.kind == "i" and all(isinstance(v, int) for v in values):
+        info = np.iinfo(np.int64)
+        if all(info.min <= v <= info.max for v in values):
+            return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+
+def _fused_numeric_codes(
+    values: np.ndarray,
+    mask: np.ndarray,
+    nan_is_null: bool,
+    minimum,
+    maximum,
+    has_min: bool,
+    has_max: bool,
+    enum_values: np.ndarray,
+    check_enum: bool,
+    enum_nullable: bool,
+    codes: np.ndarray,
+) -> np.ndarray:
+    """
+    Writes the code of each row to codes (see fused_test_bits) and returns
+    the number of rows that fail each test. Only uses what numba can compile.
+    """
+    n_min_max, n_enum_failed, n_null = 0, 0, 0
+    has_mask = len(mask) > 0
+    n_enum = len(enum_values)
+    for i in range(len(values)):
+        v = values[i]
+        code = 0
+        if (has_mask and mask[i]) or (nan_is_null and v != v):
+            code = 4
+            if check_enum and not enum_nullable:
+                code |= 2
+        else:
+            if (has_min and v < minimum) or (has_max and v > maximum):
+                code |= 1
+            if check_enum:
+                found = False
+                if n_enum <= fused_enum_scan_size:
+                    # without a branch per value so the loop is not held up
+                    # by mispredictions
+                    for j in range(n_enum):
+                        found |= enum_values[j] == v
+                else:
+                    lo, hi = 0, n_enum
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if enum_values[mid] < v:
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    found = lo < n_enum and enum_values[lo] == v
+                if not found:
+                    code |= 2
+        codes[i] = code
+        n_min_max += code & 1
+        n_enum_failed += (code >> 1) & 1
+        n_null += code >> 2
+    return np.array([n_min_max, n_enum_failed, n_null], dtype=np.int64)
+
+
+if numba is not None:
+    _fused_numeric_kernel = numba.njit(nogil=True)(_fused_numeric_codes)
+else:
+    _fused_numeric_kernel = None
+
+
+def _min_max_test(col: pd.Series, meta_col: dict) -> dict:
+    return _run_test_for_meta("min_max_test", col, meta_col)
+
+
+def _min_max_length_test(col: pd.Series, meta_col: dict) -> dict:
+    return _run_test_for_meta("min_max_length_test", col, meta_col)
+
+
+def _pattern_test(col: pd.Series, meta_col: dict) -> dict:
+    return _run_test_for_meta("pattern_test", col, meta_col)
+
+
+def _enum_test(col: pd.Series, meta_col: dict) -> dict:
+    return _run_test_for_meta("enum_test", col, meta_col)
+
+
+def _nullable_test(col: pd.Series, meta_col: dict) -> dict:
+    return _run_test_for_meta("nullable_test", col, meta_col)
+
+
+def _date_format_test(col: pd.Series, meta_col, col_is_str: bool = None) -> dict:
+    return _run_test_for_meta("date_format_test", col, meta_col, col_is_str)
+
+
+def _datetime_format_test(col: pd.Series, meta_col, col_is_str: bool = None) -> dict:
+    return _run_test_for_meta("datetime_format_test", col, meta_col, col_is_str)
+
+
+def _get_invalid_date_or_datetime_col(
+    col: pd.Series, dt_format: str, check_for_no_time_component=False
+) -> pd.Series:
+    """
+    Vectorised equivalent of applying _valid_date_or_datetime_conversion to
+    each value in col (and negating it). Returns a bool series that is True
+    where the value is not a valid date / datetime in the given format.
+
+    Columns in the default date or datetime format (see iso_format_widths)
+    are first checked with _check_iso_values and only the values that are
+    not written out in the format (e.g. 2020-1-5) are parsed.
+    """
+    if dt_format not in iso_format_widths:
+        return _parse_invalid_date_or_datetime_col(
+            col, dt_format, check_for_no_time_component
+        )
+
+    checked = _check_iso_values(
+        col, iso_format_widths[dt_format], check_for_no_time_component
     )
-    return _fill_res_dict(col, col_oob, res_dict)
+    if checked is None:
+        return _parse_invalid_date_or_datetime_col(
+            col, dt_format, check_for_no_time_component
+        )
+
+    is_checked, is_valid = checked
+    col_oob = pd.Series(is_checked & ~is_valid, index=col.index)
+    if not is_checked.all():
+        # e.g. 2020-1-5 which strptime allows, or values that are not dates
+        col_oob[~is_checked] = _parse_invalid_date_or_datetime_col(
+            col[~is_checked], dt_format, check_for_no_time_component
+        ).to_numpy(dtype=bool)
+    return col_oob
+
+
+def _check_iso_values(
+    col: pd.Series, width: int, check_for_no_time_component=False
+) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+    """
+    Checks the values of a str column that are dates (YYYY-MM-DD) or, if
+    width is 19, datetimes (YYYY-MM-DD HH:MM:SS) with every digit written
+    out. Returns two bool arrays. The first is True where the value is null,
+    empty or written out like this, and the second is True where these
+    values are valid (as strptime would find). Returns None if the column
+    cannot be read as arrow strings.
+
+    Values that are width bytes long are checked on the arrow data buffer
+    as a 2D array of bytes (one row per value, see _check_iso_chars) so no
+    python objects are made.
+    """
+    try:
+        arr = pa.array(col, type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+
+    lengths = pc.fill_null(pc.binary_length(arr), 0).to_numpy()
+    is_checked = lengths == 0
+    is_valid = lengths == 0
+    fixed = lengths == width
+    if not fixed.any():
+        return is_checked, is_valid
+
+    fixed_arr = arr if fixed.all() else arr.filter(pa.array(fixed))
+    offsets = np.frombuffer(fixed_arr.buffers()[1], dtype=np.int64)
+    offsets = offsets[fixed_arr.offset : fixed_arr.offset + len(fixed_arr) + 1]
+    data = np.frombuffer(fixed_arr.buffers()[2], dtype=np.uint8)
+    chars = data[offsets[0] : offsets[-1]].reshape(-1, width)
+
+    fixed_checked = np.empty(len(chars), dtype=bool)
+    fixed_valid = np.empty(len(chars), dtype=bool)
+    for start in range(0, len(chars), iso_block_rows):
+        block = slice(start, start + iso_block_rows)
+        fixed_checked[block], fixed_valid[block] = _check_iso_chars(
+            chars[block], check_for_no_time_component
+        )
+
+    is_checked[fixed] = fixed_checked
+    is_valid[fixed] = fixed_valid
+    return is_checked, is_valid
+
+
+def _check_iso_chars(
+    chars: np.ndarray, check_for_no_time_component=False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Checks each row of a 2D array of bytes is written as YYYY-MM-DD
+    (HH:MM:SS), and if so whether it is a valid date or datetime. The rows
+    are transposed so each position of the values is read from contiguous
+    memory.
+    """
+    width = chars.shape[1]
+    # uint8 wraps below "0" so only the digits are under 10
+    digits = np.ascontiguousarray((chars - np.uint8(ord("0"))).T)
+
+    is_written_out = np.ones(len(chars), dtype=bool)
+    for i in range(width):
+        if i in iso_separators:
+            is_written_out &= chars[:, i] == ord(iso_separators[i])
+        else:
+            is_written_out &= digits[i] < 10
+
+    def field(start: int, end: int) -> np.ndarray:
+        value = digits[start].astype(np.int16)
+        for i in range(start + 1, end):
+            value = value * 10 + digits[i]
+        return value
+
+    year, month, day = field(0, 4), field(5, 7), field(8, 10)
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = iso_days_in_month[np.clip(month, 0, 12)] + (is_leap & (month == 2))
+    is_valid = is_written_out & (year >= 1) & (month >= 1) & (month <= 12)
+    is_valid &= (day >= 1) & (day <= days_in_month)
+
+    if width == iso_format_widths[default_datetime_format]:
+        hour, minute, second = field(11, 13), field(14, 16), field(17, 19)
+        is_valid &= (hour <= 23) & (minute <= 59) & (second <= 59)
+        if check_for_no_time_component:
+            is_valid &= (hour == 0) & (minute == 0) & (second == 0)
+
+    return is_written_out, is_valid
+
+
+def _parse_invalid_date_or_datetime_col(
+    col: pd.Series, dt_format: str, check_for_no_time_component=False
+) -> pd.Series:
+    """
+    The general path of _get_invalid_date_or_datetime_col for any format.
+
+    Values are parsed with pd.to_datetime and only the values it fails to parse,
+    or whose text is not given back by formatting the parsed value with the same
+    format, are rechecked with datetime.strptime. This covers datetimes that are
+    valid but outside the bounds of a pandas Timestamp (e.g. 3000-01-01), values
+    written without zero padding, and values pandas accepts but strptime does
+    not (e.g. second 60, which pandas rolls over to the next minute, or more
+    than 6 digits of %f).
+    """
+    is_empty = (col.isna() | col.eq("")).fillna(False).astype(bool)
+
+    try:
+        parsed = pd.to_datetime(col, format=dt_format, errors="coerce")
+    except (ValueError, TypeError, OverflowError):
+        parsed = None
+
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # e.g. mixed timezones which pandas cannot hold in a single dtype
+        return ~col.apply(
+            lambda x: _valid_date_or_datetime_conversion(
+                x, dt_format, check_for_no_time_component
+            )
+        )
+
+    is_parsed = parsed.notna()
+    round_trips = pd.Series(False, index=col.index)
+    if is_parsed.any():
+        formatted = parsed[is_parsed].dt.strftime(dt_format).to_numpy(dtype=object)
+        round_trips[is_parsed] = formatted == col[is_parsed].to_numpy(dtype=object)
+
+    recheck = ~is_empty & ~round_trips
+    col_oob = pd.Series(False, index=col.index)
+    if check_for_no_time_component:
+        col_oob |= is_parsed & (parsed != parsed.dt.normalize())
+
+    if recheck.any():
+        valid = col[recheck].apply(
+            lambda x: _valid_date_or_datetime_conversion(
+                x, dt_format, check_for_no_time_component
+            )
+        )
+        col_oob[recheck] = ~valid.to_numpy(dtype=bool)
+
+    return col_oob
 
 
 def _valid_date_or_datetime_conversion(
@@ -339,6 +1409,102 @@ def _check_no_time_component_in_expected_date(dt: datetime):
     return result
 
 
+def _get_invalid_typed_datetime_col(col: pd.Series, meta_type: str) -> pd.Series:
+    """
+    Checks a column that is already typed as timestamps / dates against the
+    timestamp / date type in its metadata. Returns a bool series that is
+    True where the value cannot be stored as the metadata type without
+    changing it, i.e. where it:
+
+    - has a timezone (metadata timestamps have none)
+    - is more precise than the unit of the metadata type (e.g. a date
+      with a time component or a timestamp(s) with milliseconds)
+    - is out of the range of the metadata type (e.g. a timestamp(ns)
+      after the year 2262)
+    """
+    arr = pa.array(col, from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    return pd.Series(_get_invalid_typed_datetime_array(arr, meta_type), index=col.index)
+
+
+def _get_invalid_typed_datetime_array(arr: pa.Array, meta_type: str) -> np.ndarray:
+    """
+    _get_invalid_typed_datetime_col for a pyarrow timestamp / date array
+    """
+    unit, tz = _get_arrow_datetime_unit(arr.type)
+    is_null = arr.is_null().to_numpy(zero_copy_only=False)
+    if tz is not None:
+        return ~is_null
+
+    divisor, max_abs = _get_typed_datetime_bounds(unit, meta_type)
+    int_type = pa.int32() if pa.types.is_date32(arr.type) else pa.int64()
+    values = arr.cast(int_type).fill_null(0).to_numpy().astype(np.int64)
+    col_oob = np.zeros(len(values), dtype=bool)
+    if divisor > 1:
+        col_oob |= values % divisor != 0
+    if max_abs is not None:
+        col_oob |= (values > max_abs) | (values < -max_abs)
+    return col_oob & ~is_null
+
+
+def _get_arrow_datetime_unit(arrow_type: pa.DataType) -> Tuple[str, Union[str, None]]:
+    """
+    Returns the unit (see datetime_unit_ns) and timezone of a pyarrow
+    timestamp / date type
+    """
+    if pa.types.is_timestamp(arrow_type):
+        return arrow_type.unit, arrow_type.tz
+    elif pa.types.is_date32(arrow_type):
+        return "D", None
+    elif pa.types.is_date64(arrow_type):
+        return "ms", None
+    else:
+        raise TypeError(f"{arrow_type} is not a timestamp or date type")
+
+
+def _get_meta_datetime_unit(meta_type: str) -> Union[Tuple[str, int], None]:
+    """
+    Returns the unit (see datetime_unit_ns) of a timestamp / date metadata
+    type and the largest number of those units it can store. Returns None
+    for other types.
+    """
+    int64_max = np.iinfo(np.int64).max
+    timestamp_match = re.fullmatch(r"timestamp\((s|ms|us|ns)\)", meta_type)
+    if timestamp_match:
+        return timestamp_match.group(1), int64_max
+    elif meta_type == "date32":
+        return "D", int(np.iinfo(np.int32).max)
+    elif meta_type == "date64":
+        # stored as milliseconds
+        return "D", int64_max // (datetime_unit_ns["D"] // datetime_unit_ns["ms"])
+    else:
+        return None
+
+
+def _get_typed_datetime_bounds(
+    unit: str, meta_type: str
+) -> Tuple[int, Union[int, None]]:
+    """
+    Returns the number every (integer) value of a timestamp / date column
+    in the given unit must be divisible by to be as precise as the metadata
+    type, and the largest absolute value it can have to be in the range of
+    the metadata type (or None if every value is in range).
+    """
+    meta_unit, meta_max = _get_meta_datetime_unit(meta_type)
+    unit_ns, meta_unit_ns = datetime_unit_ns[unit], datetime_unit_ns[meta_unit]
+    if unit_ns < meta_unit_ns:
+        divisor = meta_unit_ns // unit_ns
+        max_abs = meta_max * divisor
+    else:
+        divisor = 1
+        max_abs = meta_max // (unit_ns // meta_unit_ns)
+
+    if max_abs >= np.iinfo(np.int64).max:
+        max_abs = None
+    return divisor, max_abs
+
+
 def _result_dict(test_name: str, test_inputs: dict) -> dict:
 
     d = {
@@ -349,50 +1515,138 @@ def _result_dict(test_name: str, test_inputs: dict) -> dict:
     return d
 
 
-def _fill_res_dict(col: pd.Series, col_oob: pd.Series, res_dict: dict) -> dict:
+def _fill_res_dict(
+    col: pd.Series, col_oob: pd.Series, res_dict: dict, log_verbosity: int = None
+) -> dict:
 
-    valid = not col_oob.any()
-    res_dict["valid"] = valid
+    col_oob = col_oob.fillna(False).to_numpy(dtype=bool)
+    n_errors = int(col_oob.sum())
+    res_dict["valid"] = n_errors == 0
 
-    if not valid:
-        col_oob = col_oob.fillna(False)
-        n = global_log_verbosity
-
-        # get the unexpected values
-        unexpected_index = col_oob.index[col_oob]
-        unexpected_values = col[unexpected_index].astype(str)
-
-        res_dict["percentage_of_column_is_error"] = (
-            len(unexpected_index) / len(col) * 100
-        )
+    if n_errors:
+        res_dict["percentage_of_column_is_error"] = n_errors / len(col) * 100
 
+        n = log_verbosity
         if n is not None:
-            # if the global_log_verbosity is not 0, sample
+            # sample the rows first so only the sampled values are made str
+            unexpected_rows = np.flatnonzero(col_oob)
             if n != 0:
-                # asking for a higher sample than is there?
-                if global_log_verbosity > len(unexpected_values):
-                    n = len(unexpected_values)
-                # sample the requested amount
-                unexpected_values = unexpected_values.sample(n=n)
-                unexpected_index = unexpected_values[unexpected_values.index]
-            # log the required unexpected values
-            res_dict["unexpected_index_sample"] = unexpected_index.tolist()
-            res_dict["unexpected_values_sample"] = unexpected_values.tolist()
+                # a Generator only draws n rows (np.random.choice shuffles all)
+                unexpected_rows = np.random.default_rng().choice(
+                    unexpected_rows, min(n, n_errors), replace=False
+                )
+            unexpected_values = col.iloc[unexpected_rows].astype(str)
+            _fill_unexpected_sample(res_dict, unexpected_values, 0)
 
     return res_dict
 
 
+def _fill_unexpected_sample(
+    res_dict: dict, unexpected_values: pd.Series, n: Union[int, None]
+) -> dict:
+    """
+    Adds a sample of n of the unexpected values (and their index) to the
+    res_dict. All of them if n is 0 and none if n is None.
+    """
+    if n is not None:
+        # if the log verbosity is not 0, sample the requested amount
+        if n != 0:
+            n = min(n, len(unexpected_values))
+            unexpected_values = unexpected_values.sample(n=n)
+        # log the required unexpected values
+        res_dict["unexpected_index_sample"] = unexpected_values.index.tolist()
+        res_dict["unexpected_values_sample"] = unexpected_values.tolist()
+
+    return res_dict
+
+
+def _format_unexpected_value(value, null_kind: str = None) -> str:
+    """
+    Formats a value read by another engine the same as the PandasValidator
+    (which uses astype(str) on the arrow_pd_parser dtypes). null_kind is
+    "temporal" or "float" if the column is of that type.
+    """
+    if value is None:
+        if null_kind == "temporal":
+            return "None"
+        elif null_kind == "float":
+            return "nan"
+        else:
+            return "<NA>"
+    return str(value)
+
+
+def _get_n_errors(res_dict: dict, n_rows: int) -> int:
+    if res_dict["valid"]:
+        return 0
+    else:
+        return round(res_dict["percentage_of_column_is_error"] * n_rows / 100)
+
+
+def _merge_test_results(
+    res_dict: dict,
+    n_errors: int,
+    new_res_dict: dict,
+    new_n_errors: int,
+    n: Union[int, None],
+) -> dict:
+    """
+    Merges the result of a test on a new chunk of data into the result of
+    the same test on the previous chunks. The unexpected value samples are
+    combined so they are still a random sample of n values across all chunks.
+    """
+    if not new_n_errors:
+        return deepcopy(res_dict)
+    elif not n_errors:
+        return new_res_dict
+
+    merged = new_res_dict
+    sample_keys = ["unexpected_index_sample", "unexpected_values_sample"]
+    if n is None or sample_keys[0] not in res_dict:
+        return merged
+
+    if n == 0:
+        for k in sample_keys:
+            merged[k] = res_dict[k] + new_res_dict[k]
+    else:
+        # number of values to take from the previous sample is
+        # hypergeometric as both samples are drawn without replacement
+        n_sample = min(n, n_errors + new_n_errors)
+        n_previous = np.random.hypergeometric(n_errors, new_n_errors, n_sample)
+        previous_pos = np.random.choice(
+            len(res_dict[sample_keys[0]]), n_previous, replace=False
+        )
+        new_pos = np.random.choice(
+            len(new_res_dict[sample_keys[0]]), n_sample - n_previous, replace=False
+        )
+        for k in sample_keys:
+            merged[k] = [res_dict[k][i] for i in previous_pos] + [
+                new_res_dict[k][i] for i in new_pos
+            ]
+
+    return merged
+
+
 def _get_min_max_series_out_of_bounds_col(
-    col: pd.Series, colname: str, mi: Union[int, None], ma: Union[int, None]
+    col: pd.Series,
+    colname: str,
+    mi: Union[int, None],
+    ma: Union[int, None],
+    less: Callable = operator.lt,
+    greater: Callable = operator.gt,
+    or_: Callable = operator.or_,
 ) -> pd.Series:
-
+    """
+    The comparisons can be given so the other engines can use this for their
+    own columns (e.g. pyarrow.compute functions or SQL).
+    """
     # Test if values out of bounds
     if mi is not None and ma is None:
-        return col < mi
+        return less(col, mi)
     elif ma is not None and mi is None:
-        return col > ma
+        return greater(col, ma)
     elif mi is not None and ma is not None:
-        return (col < mi) | (col > ma)
+        return or_(less(col, mi), greater(col, ma))
     else:
         raise ValueError(f"invalid min/max values for column: {colname}")
 
@@ -406,39 +1660,398 @@ def _parse_data_to_pandas(filepath: str, table_params: dict, metadata: Metadata)
     Reads in the data from the given filepath and returns
     a dataframe
     """
+    df = next(_iter_data_to_pandas(filepath, table_params, metadata))
+    return df, metadata
 
-    # get the required sets of column names
-    meta_col_names = [
-        c["name"] for c in metadata.columns if c["name"] not in metadata.partitions
-    ]
 
+def _iter_data_to_pandas(
+    filepath: str,
+    table_params: dict,
+    metadata: Metadata,
+    chunksize: Union[int, str, None] = None,
+    read_cols: List[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads in the data from the given filepath and yields it as dataframes.
+    If chunksize is None the whole file is yielded as a single dataframe.
+    Otherwise it is yielded in chunks of chunksize rows (or memory
+    if given as a str e.g. "500MB") with an index that runs on from the
+    previous chunk. The columns are checked against the metadata and the
+    metadata is updated in place to match the data.
+
+    The columns are checked before the data is read where they can be found
+    from the first line of a csv or the footer of a parquet file (see
+    _read_header), so a ColumnError is raised without parsing the file and
+    only the columns kept are parsed. Otherwise they are checked on the first
+    chunk. If read_cols is given only those columns (of the ones kept) are
+    read and the others are removed from the metadata.
+
+    CSV float and string columns are parsed straight into the dtypes they
+    are cast to and timestamp columns are read as str (see csv_read_dtypes).
+    Each column that still needs casting is then cast in place. String
+    columns are cast to string[pyarrow] if the pyarrow-strings table param
+    is set, in which case a CSV is read (and cast) in chunks of
+    pyarrow_strings_chunksize rows that are joined back into a single
+    dataframe, so only one chunk of strings is held as python objects at once.
+
+    If the table params set a row-limit the file is streamed in chunks
+    (of chunksize or row_limit_chunksize rows) and a single dataframe of
+    a random sample of row-limit rows is yielded (seeded with the
+    row-limit-seed table param).
+    """
+    meta_col_names = _get_meta_col_names(metadata)
     pandas_kwargs = table_params.get("pandas-kwargs", {})
+    expect_header = table_params.get("expect-header", True)
+    is_csv = filepath.lower().endswith("csv")
+    string_dtype = _get_string_dtype(table_params)
+
+    row_limit = table_params.get("row-limit", None)
+    sample = None
+    if row_limit:
+        sample = ReservoirSample(row_limit, table_params.get("row-limit-seed"))
+        chunksize = chunksize or row_limit_chunksize
+
+    # pre-flight check of the columns before reading the data
+    read_kwargs = {}
+    cols_to_keep = None
+    raw_columns = _read_header(filepath, table_params, metadata)
+    if raw_columns is not None:
+        columns = _clean_column_names(raw_columns, table_params)
+        cols_to_keep = _check_columns(columns, table_params, metadata, meta_col_names)
+        cols_to_keep = _select_read_cols(columns, cols_to_keep, read_cols, metadata)
+        # the parquet reader cannot select columns when reading in chunks
+        if cols_to_keep is not None and (is_csv or chunksize is None):
+            keep = set(cols_to_keep)
+            if is_csv and not expect_header:
+                projection = [i for i, c in enumerate(columns) if c in keep]
+            else:
+                projection = [r for r, c in zip(raw_columns, columns) if c in keep]
+            read_kwargs["usecols" if is_csv else "columns"] = projection
+
+        if is_csv and "dtype" not in pandas_kwargs:
+            keys = range(len(columns)) if not expect_header else raw_columns
+            read_kwargs["dtype"] = _get_csv_read_dtypes(
+                dict(zip(columns, keys)), metadata, string_dtype
+            )
+
+    concat_chunks = is_csv and chunksize is None and string_dtype.storage == "pyarrow"
+    read_chunksize = pyarrow_strings_chunksize if concat_chunks else chunksize
 
     # read data (and do headers stuff if csv)
+    if is_csv:
+        read_kwargs.update(header=0 if expect_header else None, low_memory=False)
+    data = _read_data(filepath, read_chunksize, {**read_kwargs, **pandas_kwargs})
+
+    n_rows = 0
+    chunks = []
+    for i, df in enumerate(data):
+        if is_csv and not expect_header:
+            df.columns = cols_to_keep if cols_to_keep is not None else meta_col_names
+
+        df.columns = _clean_column_names(df.columns, table_params)
+
+        if i == 0 and raw_columns is None:
+            columns = list(df.columns)
+            cols_to_keep = _check_columns(
+                columns, table_params, metadata, meta_col_names
+            )
+            cols_to_keep = _select_read_cols(
+                columns, cols_to_keep, read_cols, metadata
+            )
+
+        # only select if the columns could not be dropped by the reader
+        if cols_to_keep is not None and list(df.columns) != cols_to_keep:
+            df = df[cols_to_keep]
+
+        if read_chunksize is not None:
+            df.index = pd.RangeIndex(n_rows, n_rows + len(df))
+            n_rows += len(df)
+
+        if sample is not None:
+            sample.add(df)
+        elif concat_chunks:
+            chunks.append(_cast_df_to_metadata(df, metadata, string_dtype))
+        else:
+            yield _cast_df_to_metadata(df, metadata, string_dtype)
+
+    if sample is not None:
+        yield _cast_df_to_metadata(sample.df, metadata, string_dtype)
+    elif concat_chunks:
+        yield pd.concat(chunks)
+
+
+def _read_header(
+    filepath: str, table_params: dict, metadata: Metadata
+) -> Union[List[str], None]:
+    """
+    Pre-flight read of the names of the columns in the data (before they are
+    cleaned) from the first line of a CSV or the footer of a parquet file,
+    so the columns can be checked (and the ones not needed dropped by the
+    reader) before the data is parsed. Returns None if the columns cannot
+    be read up front (jsonl or when pandas-kwargs sets the columns to read).
+
+    For a CSV without a header the names are those of the metadata, and a
+    ColumnError is raised if the file does not have the same number of columns.
+    """
+    pandas_kwargs = table_params.get("pandas-kwargs", {})
+    expect_header = table_params.get("expect-header", True)
+
     if filepath.lower().endswith("csv"):
-        expect_header = table_params.get("expect-header", True)
+        if "usecols" in pandas_kwargs:
+            return None
         header = 0 if expect_header else None
-        df = reader.read(filepath, header=header, low_memory=False, **pandas_kwargs)
-        if not expect_header:
-            df.columns = meta_col_names
+        columns = _read_csv_header(filepath, header, pandas_kwargs)
+        if expect_header:
+            return columns
+
+        meta_col_names = _get_meta_col_names(metadata)
+        if len(columns) != len(meta_col_names):
+            raise ColumnError(
+                f"data has {len(columns)} columns but the metadata has "
+                f"{len(meta_col_names)} (expect-header is false)"
+            )
+        return meta_col_names
+    elif filepath.lower().endswith("parquet"):
+        if "columns" in pandas_kwargs:
+            return None
+        return _read_parquet_schema(filepath).names
+    else:
+        return None
+
+
+def _read_parquet_schema(filepath: str) -> pa.Schema:
+    """
+    Reads the schema of a parquet file from its footer (a small ranged GET
+    on S3, unless it was prefetched) without reading any of its data.
+    """
+    footer = pop_prefetched_footer(filepath)
+    if footer is not None:
+        return footer.schema.to_arrow_schema().remove_metadata()
+    elif filepath.startswith("s3://"):
+        s3fs = get_s3_filesystem()
+        b, k = s3_path_to_bucket_key(filepath)
+        with s3fs.open_input_file(os.path.join(b, k)) as f:
+            return pq.read_schema(f).remove_metadata()
+    else:
+        return pq.read_schema(filepath).remove_metadata()
+
+
+def _read_csv_header(filepath: str, header: Union[int, None], pandas_kwargs: dict):
+    """
+    Returns the columns of a CSV (or their positions if header is None)
+    by parsing only the start of the file. Falls back to reading the
+    header with reader.read if it is not in the start of the file
+    (e.g. because pandas-kwargs skips rows).
+    """
+    probe_kwargs = {k: v for k, v in pandas_kwargs.items() if k != "nrows"}
+    try:
+        df = pd.read_csv(
+            io.BytesIO(_read_csv_head(filepath)),
+            header=header,
+            nrows=0,
+            **probe_kwargs,
+        )
+    except Exception:
+        df = reader.read(
+            filepath, header=header, nrows=0, low_memory=False, **probe_kwargs
+        )
+    return list(df.columns)
+
+
+def _read_csv_head(filepath: str) -> bytes:
+    """
+    Reads the complete lines at the start of a file (at least the first
+    line) in blocks of header_probe_bytes. On S3 this is a single ranged GET
+    unless the first line is longer than a block.
+    """
+    if filepath.startswith("s3://"):
+        s3fs = get_s3_filesystem()
+        b, k = s3_path_to_bucket_key(filepath)
+        f = s3fs.open_input_file(os.path.join(b, k))
+    else:
+        f = open(filepath, "rb")
+
+    head = b""
+    with f:
+        while True:
+            block = f.read(header_probe_bytes)
+            head += block
+            if not block:
+                return head
+            elif b"\n" in block:
+                return head[: head.rindex(b"\n") + 1]
+
+
+def _select_read_cols(
+    columns: List[str],
+    cols_to_keep: Union[List[str], None],
+    read_cols: Union[List[str], None],
+    metadata: Metadata,
+) -> Union[List[str], None]:
+    """
+    Restricts the columns kept from the data to read_cols (if given) and
+    removes the other columns from the metadata so they are not cast.
+    """
+    if read_cols is None:
+        return cols_to_keep
+
+    read_cols = set(read_cols)
+    cols_to_keep = [
+        c for c in (columns if cols_to_keep is None else cols_to_keep) if c in read_cols
+    ]
+    for col in _get_meta_col_names(metadata):
+        if col not in read_cols:
+            metadata.remove_column(col)
+    return cols_to_keep
+
+
+def _read_data(
+    filepath: str, chunksize: Union[int, str, None], read_kwargs: dict
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the data with reader.read and yields it as dataframes (a single
+    one if chunksize is None). If the read fails because a column parsed
+    with a dtype from the metadata has a value of the wrong type, a
+    PandasCastError is raised naming those columns.
+    """
+    typed_cols = [
+        c for c, t in read_kwargs.get("dtype", {}).items() if t is not str
+    ]
+    try:
+        data = reader.read(filepath, chunksize=chunksize, **read_kwargs)
+        if chunksize is None:
+            data = [data]
+        yield from data
+    except pd.errors.ParserError:
+        raise
+    except (ValueError, TypeError) as e:
+        if not typed_cols:
+            raise
+        raise PandasCastError(
+            f"Failed to parse the data with the metadata types of columns: "
+            f"{typed_cols} - see traceback."
+        ) from e
+
+
+def _get_string_dtype(table_params: dict) -> pd.StringDtype:
+    """
+    Returns the dtype string columns are cast to. This is string[pyarrow]
+    if the pyarrow-strings table param is set, which holds the values in
+    a single arrow buffer rather than as a python object per value.
+    """
+    if table_params.get("pyarrow-strings"):
+        return pd.StringDtype("pyarrow")
     else:
-        df = reader.read(filepath, **pandas_kwargs)
+        return pd.StringDtype("python")
+
+
+def _get_csv_read_dtypes(
+    columns: Dict[str, Union[str, int]],
+    metadata: Metadata,
+    string_dtype: pd.StringDtype,
+):
+    """
+    Returns the dtype to read each column of a CSV with, keyed by the
+    given column keys (the header names or positions in the file) of each
+    metadata column name.
+    """
+    dtypes = {}
+    for meta_col in metadata.columns:
+        if meta_col["name"] in columns:
+            dtype = _get_read_dtype(meta_col, string_dtype)
+            if dtype is not None:
+                dtypes[columns[meta_col["name"]]] = dtype
+    return dtypes
+
+
+def _get_read_dtype(meta_col: dict, string_dtype: pd.StringDtype):
+    if meta_col.get("type_category") == "string":
+        return string_dtype
+    else:
+        return csv_read_dtypes.get(meta_col.get("type_category"))
+
+
+def _cast_df_to_metadata(
+    df: pd.DataFrame, metadata: Metadata, string_dtype: pd.StringDtype
+) -> pd.DataFrame:
+    """
+    Casts the columns of the dataframe to the metadata with
+    arrow_pd_parser.caster.cast_pandas_column_to_schema (and string columns
+    to string_dtype). Columns that were read in as the dtype they are cast
+    to are left as they are, and the others are replaced in place so the
+    whole dataframe is never copied. Parquet columns are already cast by
+    the reader so only their string dtype is changed (if needed).
+    """
+    is_parquet = metadata.file_format in ["parquet", "snappy.parquet"]
+    if is_parquet and string_dtype == pd.StringDtype("python"):
+        return df
+
+    for meta_col in metadata.columns:
+        name = meta_col["name"]
+        is_string = meta_col.get("type_category") == "string"
+        if name in metadata.partitions or (is_parquet and not is_string):
+            continue
+        elif name not in df.columns:
+            raise ValueError(f"Column '{name}' not in df")
+
+        dtype = _get_read_dtype(meta_col, string_dtype)
+        if dtype is not None and dtype is not str and df[name].dtype == dtype:
+            continue
+        elif is_string:
+            col = df[name].astype(string_dtype)
+        else:
+            col = cast_pandas_column_to_schema(
+                df[name], meta_col, bool_errors="coerce"
+            )
+        df.isetitem(df.columns.get_loc(name), col)
+
+    return df
+
+
+def _get_meta_col_names(metadata: Metadata) -> List[str]:
+    return [
+        c["name"] for c in metadata.columns if c["name"] not in metadata.partitions
+    ]
+
+
+def _clean_column_names(columns: List[str], table_params: dict) -> List[str]:
+    columns = [re.sub(r"^(?:\ufeff|ï»¿)", "", col) for col in columns]
+
+    # eliminate case sensitivity, if requested
+    if table_params.get("headers-ignore-case"):
+        columns = [c.lower() for c in columns]
+
+    return columns
+
 
-    df.columns = [re.sub(r"^(?:\ufeff|ï»¿)", "", col) for col in df.columns]
+def _check_columns(
+    columns: List[str],
+    table_params: dict,
+    metadata: Metadata,
+    meta_col_names: List[str],
+) -> Union[List[str], None]:
+    """
+    Checks the columns in the data against the metadata. Raises a ColumnError
+    if they do not match (taking the allow-missing-cols and allow-unexpected-data
+    table params into account). Columns in the metadata but not the data are
+    removed from the metadata if allowed.
+
+    Returns the columns to select from the data or None if all of them are
+    kept.
+    """
 
     # eliminate case sensitivity, if requested
     if table_params.get("headers-ignore-case"):
         for c in metadata.columns:
             c["name"] = c["name"].lower()
-        df.columns = [c.lower() for c in df.columns]
         meta_col_names = [c.lower() for c in meta_col_names]
 
     allow_missing_cols = table_params.get("allow-missing-cols", False)
     allow_unexpected_data = table_params.get("allow-unexpected-data", False)
 
-    cols_in_meta_but_not_data = [c for c in meta_col_names if c not in df.columns]
-    cols_in_data_but_not_meta = [c for c in df.columns if c not in meta_col_names]
-    cols_in_data_and_meta = [c for c in df.columns if c in meta_col_names]
+    cols_in_meta_but_not_data = [c for c in meta_col_names if c not in columns]
+    cols_in_data_but_not_meta = [c for c in columns if c not in meta_col_names]
+    cols_in_data_and_meta = [c for c in columns if c in meta_col_names]
 
     # error if there are no common columns
     if not cols_in_data_and_meta:
@@ -447,6 +2060,7 @@ def _parse_data_to_pandas(filepath: str, table_params: dict, metadata: Metadata)
     # this is so that both mitigations can be checked and both errors are made visible
     raise_column_error = False
     err_msg = ""
+    cols_to_keep = None
 
     # remove columns from meta that aren't in the data if allowed
     msg_1 = f"columns present in metadata but not in data: {cols_in_meta_but_not_data}"
@@ -465,29 +2079,23 @@ def _parse_data_to_pandas(filepath: str, table_params: dict, metadata: Metadata)
         raise_column_error = True
     elif allow_unexpected_data and cols_in_data_but_not_meta:
         log.info("not testing " + msg_2)
-        df = df[cols_in_data_and_meta]
+        cols_to_keep = cols_in_data_and_meta
 
     # raise the error with all details, if required
     if raise_column_error:
         raise ColumnError(err_msg)
 
-    # sample the data, if required
-    row_limit = table_params.get("row-limit", None)
-    if row_limit:
-        row_limit = row_limit if row_limit <= len(df) else len(df)
-        df = df.sample(row_limit)
-
-    if metadata.file_format not in ["parquet", "snappy.parquet"]:
-        df = cast_pandas_table_to_schema(df, metadata)
-
-    return df, metadata
+    return cols_to_keep
 
 
-def _check_pandas_series_is_str(s: pd.Series, na_as=True):
+def _check_pandas_series_is_str(s: pd.Series, na_as=True) -> bool:
     """
     Checks if a pandas series is a str or string. No I can't use
     pd.api.types.is_string_dtype. See issue #164.
 
+    Uses the dtype of the series and only inspects the values (in a single
+    vectorised pass with pd.api.types.infer_dtype) if it is an object dtype.
+
     Args:
         s (pd.Series): A Pandas Series to check
         na_as (bool, optional): How you want to treat NAs or None.
@@ -495,12 +2103,45 @@ def _check_pandas_series_is_str(s: pd.Series, na_as=True):
           Any other value that is not missing should be accurately
           determined as a string or not a string.
     """
+    is_na = s.isna()
+    if not na_as and is_na.any():
+        return False
+    elif isinstance(s.dtype, pd.StringDtype):
+        return True
+    elif s.dtype == object:
+        return pd.api.types.infer_dtype(s, skipna=True) in ["string", "empty"]
+    else:
+        return bool(is_na.all())
+
+
+def _check_pandas_series_is_datetime(s: pd.Series) -> bool:
+    """
+    Checks if a pandas series is already typed as timestamps / dates, i.e.
+    has a datetime64 or pyarrow timestamp / date dtype or is an object
+    series of python datetimes / dates (e.g. read from parquet).
+    """
+    if isinstance(s.dtype, pd.ArrowDtype):
+        arrow_type = s.dtype.pyarrow_dtype
+        return pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type)
+    elif pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return True
+    elif s.dtype == object:
+        inferred = pd.api.types.infer_dtype(s, skipna=True)
+        return inferred in ["datetime", "datetime64", "date"]
+    else:
+        return False
+
+
+def _get_str_columns(df: pd.DataFrame, columns: List[str] = None) -> Dict[str, bool]:
+    """
+    Classifies each column in the dataframe (or just the given columns) as
+    str or not (see _check_pandas_series_is_str) so it is only done once per
+    dataframe.
+    """
+    columns = df.columns if columns is None else columns
+    return {c: _check_pandas_series_is_str(df[c]) for c in columns}
 
-    def check(x):
-        if pd.isna(x) or x is None:
-            return na_as
-        else:
-            return isinstance(x, tuple([str, pd.StringDtype]))
 
-    out = s.apply(check)
-    return out.all()
+def _batched(items: list, size: int) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
@@ -1,43 +1,100 @@
 import logging
 import os
-from typing import Union
+import traceback
+from copy import deepcopy
+from typing import Dict, List, Union
 
+import numpy as np
+import pyarrow as pa
 import pyarrow.parquet as pq
 from dataengineeringutils3.s3 import s3_path_to_bucket_key
 from mojap_metadata import Metadata
 from mojap_metadata.converters.arrow_converter import ArrowConverter
 from pyarrow import Schema
-from pyarrow.fs import S3FileSystem
 
-from data_linter.validators.base import BaseTableValidator
+from data_linter.validators.arrow_validator import (
+    ArrowValidator,
+    _arrow_kernels,
+    _fill_res_dict_from_arrow,
+)
+from data_linter.validators.pandas_validator import (
+    ChunkedValidatorResult,
+    ValidationPlan,
+    ValidationStep,
+    _check_in_bounds,
+    _clean_column_names,
+    _result_dict,
+)
+from data_linter.validators.s3_files import get_s3_filesystem, pop_prefetched_footer
 
 log = logging.getLogger("root")
 default_date_format = "%Y-%m-%d"
 default_datetime_format = "%Y-%m-%d %H:%M:%S"
-aws_default_region = os.getenv(
-    "AWS_DEFAULT_REGION", os.getenv("AWS_REGION", "eu-west-1")
-)
+parquet_modes = ["schema", "stats", "data"]
+# tests that the statistics of a row group can show pass without reading it
+stats_test_names = ["min_max_test", "nullable_test"]
+# max number of rows in each record batch validated in data mode
+parquet_batch_rows = 65536
 
 
-class ParquetValidator(BaseTableValidator):
+class ParquetValidator(ArrowValidator):
     """
     Validator for checking that a parquet file's schema matches a given Metadata.
-    For validating the data itself, use the Pandas validator.
+
+    The parquet-mode table param sets what else is validated:
+
+    - "schema" (default): nothing else, only the file's footer is read.
+    - "stats": the min/max and nullable tests are also run, using the
+      statistics (min, max and null count) of each row group in the footer.
+      Only the row groups whose statistics cannot show a test passes are
+      read (and only the column being tested).
+    - "data": every test is run (with the same kernels as the
+      ArrowValidator) one record batch at a time, reading only the columns
+      with tests, so no more than a row group of the file is held in memory.
+      The results of each batch are combined into a single response.
     """
 
+    reads_parquet_footers = True
+
     def __init__(
         self,
         filepath: str,
         table_params: dict,
         metadata: Union[dict, str, Metadata],
+        log_verbosity: int = None,
+        ignore_missing_cols: bool = False,
+        plan: ValidationPlan = None,
         **kwargs,
     ):
-        super().__init__(filepath, table_params, metadata)
+        self.mode = table_params.get("parquet-mode", "schema")
+        if self.mode not in parquet_modes:
+            raise ValueError(
+                f"parquet-mode must be one of {parquet_modes} (given {self.mode})"
+            )
+        super().__init__(
+            filepath,
+            table_params,
+            metadata,
+            log_verbosity=log_verbosity,
+            ignore_missing_cols=ignore_missing_cols,
+            plan=plan,
+        )
+
+    @classmethod
+    def compile_plan(
+        cls, table_params: dict, metadata: Union[dict, str, Metadata]
+    ) -> Union[ValidationPlan, None]:
+        if table_params.get("parquet-mode", "schema") == "schema":
+            return None
+        return ValidationPlan.from_metadata(metadata, table_params)
 
     @staticmethod
     def _read_schema(filepath: str) -> Schema:
-        if filepath.startswith("s3://"):
-            s3fs = S3FileSystem(region=aws_default_region)
+        footer = pop_prefetched_footer(filepath)
+        if footer is not None:
+            schema = footer.schema.to_arrow_schema().remove_metadata()
+        elif filepath.startswith("s3://"):
+            s3fs = get_s3_filesystem()
             b, k = s3_path_to_bucket_key(filepath)
             pa_pth = os.path.join(b, k)
             with s3fs.open_input_file(pa_pth) as file:
@@ -47,7 +104,29 @@ class ParquetValidator(BaseTableValidator):
         return schema
 
     def read_data_and_validate(self):
-        table_arrow_schema = self._read_schema(self.filepath)
+        if self.mode == "schema":
+            self.validate_schema(self._read_schema(self.filepath))
+            return
+
+        with _open_input_file(self.filepath) as f:
+            pf = pq.ParquetFile(f, metadata=pop_prefetched_footer(self.filepath))
+            self.validate_schema(pf.schema_arrow.remove_metadata())
+            if self.fail_fast and not self.valid:
+                # the schema check is the first test of the file, so none of
+                # the tests of the plan are run if it fails
+                self._skip_plan_tests(pf)
+                return
+            try:
+                if self.mode == "stats":
+                    self.validate_stats(pf)
+                else:
+                    self.validate_batches(pf)
+            except Exception:
+                fail_response_dict = {self.response.vvkn: False}
+                self.response.add_table_test("overall_validation", fail_response_dict)
+                log.error(traceback.format_exc())
+
+    def validate_schema(self, table_arrow_schema: Schema):
         ac = ArrowConverter()
         metadata_arrow_schema = ac.generate_from_meta(self.metadata).remove_metadata()
         metas_match = table_arrow_schema.equals(metadata_arrow_schema)
@@ -80,14 +159,196 @@ class ParquetValidator(BaseTableValidator):
 
         self.response.add_table_test("check_schema_conforms", result_dict)
 
-    def write_validation_errors_to_log(self):
-        table_result = self.response.get_result()
-        if not table_result["valid"]:
-            failed_cols = self.response.get_names_of_column_failures()
-            err_msg = (
-                "Table failed validation. "
-                f"Col failures: {failed_cols}. "
-                "See response error log for more details."
+    def validate_stats(self, pf: pq.ParquetFile):
+        """
+        Runs the min/max and nullable tests of the plan against the parquet
+        file. Each row group passes a test if its statistics show that every
+        value in it passes, and only the row groups that do not are read and
+        tested. With the fail-fast table param the tests after the first
+        failed test are skipped.
+        """
+        file_columns = self._get_file_columns(pf)
+        columns = [c for c in self.plan.columns if c in file_columns]
+        for i, column in enumerate(columns):
+            self.validate_col_stats(pf, column, file_columns[column])
+            if self.fail_fast and not self.valid:
+                for skipped_column in columns[i + 1 :]:
+                    for step in self._get_stats_steps(skipped_column):
+                        self.response.add_skipped_test(skipped_column, step.test_name)
+                break
+
+    def validate_col_stats(self, pf: pq.ParquetFile, column: str, file_column: str):
+        steps = self._get_stats_steps(column)
+        for i, step in enumerate(steps):
+            res_dict = _validate_step_from_stats(
+                pf, step, file_column, self.log_verbosity
             )
-            log.error(err_msg, extra={"context": "VALIDATION"})
-            log.debug(str(table_result), extra={"context": "VALIDATION"})
+            self.response.add_test_to_col(column, step.test_name, res_dict)
+            if self.fail_fast and not res_dict["valid"]:
+                for skipped_step in steps[i + 1 :]:
+                    self.response.add_skipped_test(column, skipped_step.test_name)
+                break
+
+    def _skip_plan_tests(self, pf: pq.ParquetFile):
+        file_columns = self._get_file_columns(pf)
+        for column in self.plan.columns:
+            if column not in file_columns:
+                continue
+            elif self.mode == "stats":
+                steps = self._get_stats_steps(column)
+            else:
+                steps = self.plan.get_column_steps(column)
+            for step in steps:
+                self.response.add_skipped_test(column, step.test_name)
+
+    def _get_stats_steps(self, column: str) -> List[ValidationStep]:
+        steps = []
+        for step in self.plan.get_column_steps(column):
+            if step.test_name in stats_test_names:
+                steps.append(step)
+            else:
+                log.info(
+                    f"Column {column} not tested for {step.test_name}. "
+                    "Only min/max and nullable tests are run in stats mode."
+                )
+        return steps
+
+    def validate_batches(self, pf: pq.ParquetFile):
+        """
+        Runs the plan against the parquet file one record batch (of up to
+        parquet_batch_rows rows) at a time. Only the columns with tests are
+        read, and the results of each batch are combined so the response is
+        the same as validating the whole file at once.
+        """
+        self.response = ChunkedValidatorResult(
+            result_dict=self.response.result,
+            validator_valid_key_name=self.response.vvkn,
+            log_verbosity=self.log_verbosity,
+        )
+        file_columns = self._get_file_columns(pf)
+        columns = [c for c in self.plan.columns if c in file_columns]
+        if not columns:
+            return
+
+        n_rows = 0
+        batches = pf.iter_batches(
+            batch_size=parquet_batch_rows,
+            columns=[file_columns[c] for c in columns],
+        )
+        for batch in batches:
+            table = pa.Table.from_batches([batch]).rename_columns(columns)
+            index = np.arange(n_rows, n_rows + table.num_rows)
+            n_rows += table.num_rows
+
+            self.response.start_chunk(table.num_rows)
+            self.validate_table(table, index)
+            if self.fail_fast and not self.valid:
+                log.info("fail-fast is set so not validating the remaining batches")
+                break
+
+    def _get_file_columns(self, pf: pq.ParquetFile) -> Dict[str, str]:
+        """
+        Maps the (cleaned) name of each column in the parquet file to its
+        name in the file
+        """
+        names = pf.schema_arrow.names
+        return dict(zip(_clean_column_names(names, self.table_params), names))
+
+
+def _open_input_file(filepath: str):
+    if filepath.startswith("s3://"):
+        s3fs = get_s3_filesystem()
+        b, k = s3_path_to_bucket_key(filepath)
+        return s3fs.open_input_file(os.path.join(b, k))
+    else:
+        return pa.OSFile(filepath)
+
+
+def _validate_step_from_stats(
+    pf: pq.ParquetFile, step: ValidationStep, file_column: str, n: Union[int, None]
+) -> dict:
+    """
+    Runs a min/max or nullable test against the row groups of the parquet
+    file whose statistics do not show that every value passes. Returns the
+    result for the whole file (so the percentage of errors is of every row
+    and the index of unexpected values is their row number in the file).
+    """
+    row_groups = _get_unproven_row_groups(
+        pf.metadata, file_column, pf.schema_arrow.field(file_column).type, step
+    )
+    if not row_groups:
+        return step.valid_result()
+
+    col = pf.read_row_groups(row_groups, columns=[file_column])[file_column]
+    index = None
+    if n is not None:
+        n_rows = [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)]
+        starts = np.cumsum([0] + n_rows)
+        index = np.concatenate(
+            [np.arange(starts[i], starts[i + 1]) for i in row_groups]
+        )
+
+    col_oob = _arrow_kernels[step.test_name](col, **step.args)
+    res_dict = _result_dict(step.test_name, deepcopy(step.test_inputs))
+    return _fill_res_dict_from_arrow(
+        col, col_oob, res_dict, n, index, pf.metadata.num_rows
+    )
+
+
+def _get_unproven_row_groups(
+    metadata: pq.FileMetaData,
+    column: str,
+    arrow_type: pa.DataType,
+    step: ValidationStep,
+) -> List[int]:
+    """
+    Returns the row groups whose statistics do not show that every value of
+    the column passes the test (all of them if the column has no
+    statistics, e.g. because it is nested).
+    """
+    column_index = None
+    for i in range(metadata.num_columns):
+        if metadata.schema.column(i).path == column:
+            column_index = i
+
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        if column_index is None or not _check_stats_pass(
+            row_group.column(column_index).statistics,
+            row_group.num_rows,
+            arrow_type,
+            step,
+        ):
+            row_groups.append(i)
+    return row_groups
+
+
+def _check_stats_pass(
+    stats: Union[pq.Statistics, None],
+    num_rows: int,
+    arrow_type: pa.DataType,
+    step: ValidationStep,
+) -> bool:
+    """
+    Returns True if the statistics of a column in a row group show every
+    value in it passes the min/max or nullable test
+    """
+    if stats is None:
+        return False
+
+    if step.test_name == "nullable_test":
+        # NaNs fail the test but are not counted as nulls in the statistics
+        is_float = pa.types.is_floating(arrow_type)
+        return stats.has_null_count and stats.null_count == 0 and not is_float
+
+    if stats.has_null_count and stats.null_count == num_rows:
+        return True
+    is_numeric = pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+    if not stats.has_min_max or not is_numeric:
+        return False
+    lowest, highest = stats.min, stats.max
+    if lowest != lowest or highest != highest:
+        # some writers include NaNs in the statistics
+        return False
+    return _check_in_bounds(lowest, highest, step.args["minimum"], step.args["maximum"])
@@ -0,0 +1,548 @@
+import logging
+import traceback
+
+from copy import deepcopy
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Tuple, Union
+
+import pandas as pd
+
+from arrow_pd_parser.utils import FileFormat, infer_file_format
+from mojap_metadata import Metadata
+
+from data_linter.validators.arrow_validator import (
+    bool_false_values,
+    bool_true_values,
+    default_na_values,
+)
+from data_linter.validators.pandas_validator import (
+    CompiledRegex,
+    PlanValidator,
+    ValidationStep,
+    default_date_format,
+    default_datetime_format,
+    _check_columns,
+    _clean_column_names,
+    _fill_unexpected_sample,
+    _format_unexpected_value,
+    _get_meta_col_names,
+    _get_min_max_series_out_of_bounds_col,
+    _get_typed_datetime_bounds,
+    _result_dict,
+    _valid_date_or_datetime_conversion,
+    re2_differing_syntax,
+    re2_unmatched_whitespace,
+    regex_cache_size,
+)
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+log = logging.getLogger("root")
+row_index_name = "__data_linter_row_index"
+
+
+class PolarsValidator(PlanValidator):
+    """
+    Validator using polars (requires the polars extra). The file is scanned
+    lazily and every test in the plan is expressed as a polars expression,
+    so the whole table is validated by a single multi-threaded (streaming)
+    query that returns the number of failures and a sample of the failing
+    rows for each test.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if pl is None:
+            raise ImportError(
+                "The polars validator engine requires polars. "
+                "Install it with: pip install data_linter[polars]"
+            )
+        super().__init__(*args, **kwargs)
+
+    def read_data_and_validate(self):
+        """Scans the data from filepath and validates it in a single query.
+
+        CSV and JSONL files are cast to the metadata as part of the query.
+        If any value cannot be cast the parse_data_to_polars table test
+        fails (with the number of values that could not be cast in each
+        column) and no column tests are added.
+        """
+        fail_response_dict = {self.response.vvkn: False}
+
+        try:
+            lf, cast_error_cols = _scan_data_to_polars(
+                self.filepath, self.table_params, self.metadata
+            )
+        except Exception:
+            traceback_message = traceback.format_exc()
+            fail_response_dict["traceback"] = traceback_message
+            self.response.add_table_test("parse_data_to_polars", fail_response_dict)
+            log.error(traceback_message)
+            return
+
+        try:
+            self.validate_lazy_frame(lf, cast_error_cols)
+        except Exception:
+            self.response.add_table_test("overall_validation", fail_response_dict)
+            log.error(traceback.format_exc())
+
+    def validate_lazy_frame(
+        self, lf: "pl.LazyFrame", cast_error_cols: Dict[str, str] = None
+    ):
+        """
+        Validates the lazy frame against the plan. The lazy frame needs a
+        row index column. cast_error_cols maps a column name to a bool column
+        in the lazy frame that is True where a value could not be cast.
+        """
+        cast_error_cols = cast_error_cols or {}
+        dtypes = lf.collect_schema()
+
+        steps = []
+        kernels = []
+        for column in self.plan.columns:
+            if column not in dtypes:
+                continue
+            col_is_str = dtypes[column] in [pl.String, pl.Null]
+            col_is_datetime = _check_polars_dtype_is_datetime(dtypes[column])
+            for step in self.plan.get_column_steps(column):
+                if not step.str_only or col_is_str:
+                    steps.append(step)
+                    kernels.append(_polars_kernels[step.test_name])
+                elif step.typed_step is not None and col_is_datetime:
+                    steps.append(step.typed_step)
+                    kernels.append(_polars_typed_datetime_kernel)
+                else:
+                    log.info(
+                        f"Column {step.column} not tested. "
+                        "Its values are neither str nor timestamps / dates."
+                    )
+
+        n = self.log_verbosity
+        aggs = [pl.len().alias("n_rows")]
+        for name, error_col in cast_error_cols.items():
+            aggs.append(pl.col(error_col).sum().alias(f"cast_{name}"))
+        for i, (step, kernel) in enumerate(zip(steps, kernels)):
+            c = pl.col(step.column)
+            failed = kernel(c, dtypes[step.column], **step.args).fill_null(False)
+            aggs.append(failed.sum().alias(f"n_{i}"))
+            if n is not None:
+                positions = pl.arg_where(failed)
+                if n != 0:
+                    positions = positions.shuffle().head(n)
+                aggs.append(
+                    pl.struct(index=pl.col(row_index_name), value=c)
+                    .gather(positions)
+                    .implode()
+                    .alias(f"sample_{i}")
+                )
+
+        result = lf.select(aggs).collect(engine="streaming").row(0, named=True)
+
+        failed_casts = {
+            name: result[f"cast_{name}"]
+            for name in cast_error_cols
+            if result[f"cast_{name}"]
+        }
+        if failed_casts:
+            self.response.add_table_test(
+                "parse_data_to_polars",
+                {self.response.vvkn: False, "failed_casts": failed_casts},
+            )
+            return
+
+        for i, step in enumerate(steps):
+            res_dict = _polars_res_dict(
+                step,
+                result[f"n_{i}"],
+                result["n_rows"],
+                result.get(f"sample_{i}"),
+                dtypes[step.column],
+                n,
+            )
+            self.response.add_test_to_col(step.column, step.test_name, res_dict)
+
+
+def _polars_res_dict(
+    step: ValidationStep,
+    n_errors: int,
+    n_rows: int,
+    sample: Union[List[dict], None],
+    dtype: "pl.DataType",
+    n: Union[int, None],
+) -> dict:
+    test_inputs = deepcopy(step.test_inputs)
+    if step.test_name == "pattern_test":
+        regex = step.args["regex"]
+        test_inputs["regex_engine"] = _get_polars_regex_engine(regex.pattern)
+
+    res_dict = _result_dict(step.test_name, test_inputs)
+    res_dict["valid"] = n_errors == 0
+    if n_errors:
+        res_dict["percentage_of_column_is_error"] = n_errors / n_rows * 100
+        if n is not None:
+            if dtype.is_temporal():
+                null_kind = "temporal"
+            elif dtype.is_float():
+                null_kind = "float"
+            else:
+                null_kind = None
+            unexpected_values = pd.Series(
+                [_format_unexpected_value(s["value"], null_kind) for s in sample],
+                index=[s["index"] for s in sample],
+                dtype=object,
+            )
+            _fill_unexpected_sample(res_dict, unexpected_values, n)
+
+    return res_dict
+
+
+def _polars_min_max_kernel(
+    c: "pl.Expr", dtype, colname: str, minimum=None, maximum=None
+) -> "pl.Expr":
+    return _get_min_max_series_out_of_bounds_col(c, colname, minimum, maximum)
+
+
+def _polars_min_max_length_kernel(
+    c: "pl.Expr", dtype, colname: str, minimum=None, maximum=None
+) -> "pl.Expr":
+    return _get_min_max_series_out_of_bounds_col(
+        c.str.len_chars(), colname, minimum, maximum
+    )
+
+
+def _polars_pattern_kernel(c: "pl.Expr", dtype, regex: CompiledRegex) -> "pl.Expr":
+    if _get_polars_regex_engine(regex.pattern) == "polars":
+        return c.map_batches(
+            partial(_get_unmatched_series, regex=regex),
+            return_dtype=pl.Boolean,
+            is_elementwise=True,
+        )
+    else:
+        return ~c.map_elements(
+            lambda v: regex.regex.match(v) is not None, return_dtype=pl.Boolean
+        )
+
+
+def _get_unmatched_series(s: "pl.Series", regex: CompiledRegex) -> "pl.Series":
+    """
+    Matches the values with polars and rechecks the values the rust regex
+    crate may match differently with re. These are values ending in a newline
+    (re's $ matches before it) and, for patterns with \\s or \\S, values with
+    whitespace that python's \\s matches but the rust regex crate's does not.
+    """
+    failed = ~s.str.contains(regex.anchored_pattern)
+    recheck = s.str.ends_with("\n")
+    if regex.has_whitespace_class:
+        recheck = recheck | s.str.contains(re2_unmatched_whitespace)
+    recheck = recheck.fill_null(False)
+    if recheck.any():
+        idx = recheck.arg_true()
+        failed = failed.scatter(
+            idx, [regex.regex.match(v) is None for v in s.gather(idx).to_list()]
+        )
+    return failed
+
+
+def _polars_enum_kernel(
+    c: "pl.Expr", dtype, enum: frozenset, nullable: bool
+) -> "pl.Expr":
+    in_enum = _polars_is_in_enum(c, dtype, enum).fill_null(False)
+    if nullable:
+        in_enum = in_enum | c.is_null()
+    return ~in_enum
+
+
+def _polars_is_in_enum(c: "pl.Expr", dtype, enum: frozenset) -> "pl.Expr":
+    """
+    Checks the values are in the enum with pandas isin semantics, which
+    compares numbers (and bools) by value but never matches a number to a
+    str (e.g. 1 is not in ["1"]). polars' is_in raises an error if the enum
+    values are not of the same type as the column.
+    """
+    numbers = [
+        e for e in enum if isinstance(e, (bool, int, float)) and not pd.isna(e)
+    ]
+    if dtype == pl.String:
+        values = pl.Series([e for e in enum if isinstance(e, str)], dtype=pl.String)
+    elif dtype == pl.Boolean:
+        # e.g. 1 == True but 2 is not equal to either bool
+        values = pl.Series([bool(e) for e in numbers if e in (0, 1)], dtype=pl.Boolean)
+    elif dtype.is_integer() and all(float(e).is_integer() for e in numbers):
+        c = c.cast(pl.Int64)
+        values = pl.Series([int(e) for e in numbers], dtype=pl.Int64)
+    elif dtype.is_numeric():
+        c = c.cast(pl.Float64)
+        values = pl.Series([float(e) for e in numbers], dtype=pl.Float64)
+    else:
+        return c.is_in([e for e in enum if e is not None])
+
+    return c.is_in(values)
+
+
+def _polars_nullable_kernel(c: "pl.Expr", dtype) -> "pl.Expr":
+    if dtype.is_float():
+        return c.is_null() | c.is_nan()
+    return c.is_null()
+
+
+def _polars_date_or_datetime_kernel(
+    c: "pl.Expr", dtype, dt_format: str, check_for_no_time_component=False
+) -> "pl.Expr":
+    return c.map_batches(
+        partial(
+            _get_invalid_date_or_datetime_series,
+            dt_format=dt_format,
+            check_for_no_time_component=check_for_no_time_component,
+        ),
+        return_dtype=pl.Boolean,
+        is_elementwise=True,
+    )
+
+
+def _get_invalid_date_or_datetime_series(
+    s: "pl.Series", dt_format: str, check_for_no_time_component=False
+) -> "pl.Series":
+    """
+    Only the values polars parses and formats back to the same text (see
+    _polars_strptime) are taken as valid, and the rest are checked with
+    datetime.strptime.
+    """
+    is_empty = (s.is_null() | (s == "")).fill_null(True)
+    parsed, round_trips = _polars_strptime(s, dt_format)
+
+    failed = pl.Series(s.name, [False] * len(s))
+    if check_for_no_time_component:
+        failed = (round_trips & (parsed != parsed.dt.truncate("1d"))).fill_null(
+            False
+        )
+
+    recheck = ~is_empty & ~round_trips
+    if recheck.any():
+        idx = recheck.arg_true()
+        valid = [
+            _valid_date_or_datetime_conversion(
+                v, dt_format, check_for_no_time_component
+            )
+            for v in s.gather(idx).to_list()
+        ]
+        failed = failed.scatter(idx, [not v for v in valid])
+    return failed
+
+
+def _polars_strptime(
+    s: "pl.Series", dt_format: str
+) -> Tuple["pl.Series", "pl.Series"]:
+    """
+    Parses the values with polars' (chrono) strptime, which is more lenient
+    than python's strptime (e.g. it ignores leading whitespace, rolls second
+    60 over and reads year 0) and reads %f as nanoseconds. So ".%f" is given
+    to chrono as "%.6f" (a dot then 6 digits).
+
+    Returns the parsed values and which of them format back to the same text
+    (in a year python supports), which python's strptime reads the same.
+    """
+    chrono_format = dt_format.replace(".%f", "%.6f")
+    try:
+        parsed = s.str.strptime(pl.Datetime("us"), chrono_format, strict=False)
+        round_trips = (parsed.dt.to_string(chrono_format) == s) & (
+            parsed.dt.year() >= 1
+        )
+        round_trips = round_trips.fill_null(False)
+    except pl.exceptions.PolarsError:
+        # e.g. a directive chrono does not know
+        parsed = pl.Series(s.name, [None] * len(s), dtype=pl.Datetime("us"))
+        round_trips = pl.Series(s.name, [False] * len(s))
+    return parsed, round_trips
+
+
+def _polars_to_datetime(s: "pl.Series", dt_format: str) -> "pl.Series":
+    """
+    Parses the values with polars and, as the other engines do, the values
+    that do not format back to the same text with pandas.to_datetime (null
+    if they are invalid).
+    """
+    parsed, round_trips = _polars_strptime(s, dt_format)
+    recheck = s.is_not_null() & ~round_trips
+    if recheck.any():
+        idx = recheck.arg_true()
+        reparsed = pd.to_datetime(
+            s.gather(idx).to_pandas(), format=dt_format, errors="coerce"
+        )
+        parsed = parsed.scatter(idx, pl.from_pandas(reparsed).cast(pl.Datetime("us")))
+    return parsed
+
+
+def _polars_typed_datetime_kernel(c: "pl.Expr", dtype, meta_type: str) -> "pl.Expr":
+    if dtype == pl.Date:
+        unit, tz = "D", None
+    else:
+        unit, tz = dtype.time_unit, dtype.time_zone
+    if tz is not None:
+        return c.is_not_null()
+
+    divisor, max_abs = _get_typed_datetime_bounds(unit, meta_type)
+    values = c.to_physical().cast(pl.Int64)
+    failed = pl.lit(False)
+    if divisor > 1:
+        failed = failed | (values % divisor != 0)
+    if max_abs is not None:
+        failed = failed | (values > max_abs) | (values < -max_abs)
+    return failed
+
+
+_polars_kernels: Dict[str, Callable[..., "pl.Expr"]] = {
+    "min_max_test": _polars_min_max_kernel,
+    "min_max_length_test": _polars_min_max_length_kernel,
+    "pattern_test": _polars_pattern_kernel,
+    "enum_test": _polars_enum_kernel,
+    "nullable_test": _polars_nullable_kernel,
+    "datetime_format_test": _polars_date_or_datetime_kernel,
+    "date_format_test": _polars_date_or_datetime_kernel,
+}
+
+
+@lru_cache(maxsize=regex_cache_size)
+def _get_polars_regex_engine(pattern: str) -> str:
+    """
+    Returns "polars" if polars (which uses the rust regex crate) can match
+    the pattern and "re" if it has to be matched with python's re (e.g.
+    patterns with lookarounds, or syntax it reads differently to re such as
+    POSIX classes).
+    """
+    if re2_differing_syntax.search(pattern):
+        return "re"
+    try:
+        pl.Series([""]).str.contains(f"^(?:{pattern})")
+    except pl.exceptions.ComputeError:
+        return "re"
+    return "polars"
+
+
+def _check_polars_dtype_is_datetime(dtype: "pl.DataType") -> bool:
+    return dtype == pl.Date or isinstance(dtype, pl.Datetime)
+
+
+def _scan_data_to_polars(
+    filepath: str, table_params: dict, metadata: Metadata
+) -> Tuple["pl.LazyFrame", Dict[str, str]]:
+    """
+    Lazily scans the data from the given filepath. Column checks are the
+    same as the PandasValidator's and the metadata is updated in place to
+    match the data. Nothing is read apart from the schema unless the data
+    is sampled (with row-limit).
+
+    Returns the lazy frame with a row index column and the columns in the
+    metadata (cast to the metadata if it is not for parquet). For each cast
+    that can fail there is also a bool column which is True where a value
+    could not be cast (the names of these are returned as a dict).
+    """
+    meta_col_names = _get_meta_col_names(metadata)
+    file_format = infer_file_format(filepath, metadata)
+
+    if file_format == FileFormat.CSV:
+        pandas_kwargs = table_params.get("pandas-kwargs", {})
+        na_values = list(pandas_kwargs.get("na_values", []))
+        if pandas_kwargs.get("keep_default_na", True):
+            na_values += default_na_values
+        expect_header = table_params.get("expect-header", True)
+        lf = pl.scan_csv(
+            filepath,
+            has_header=expect_header,
+            new_columns=None if expect_header else meta_col_names,
+            infer_schema=False,
+            null_values=na_values,
+        )
+    elif file_format == FileFormat.JSON:
+        lf = pl.scan_ndjson(filepath)
+    else:
+        lf = pl.scan_parquet(filepath)
+
+    columns = lf.collect_schema().names()
+    lf = lf.rename(dict(zip(columns, _clean_column_names(columns, table_params))))
+    columns = lf.collect_schema().names()
+
+    cols_to_keep = _check_columns(columns, table_params, metadata, meta_col_names)
+    if cols_to_keep is not None:
+        lf = lf.select(cols_to_keep)
+
+    lf = lf.with_row_index(row_index_name)
+
+    # sample the data, if required
+    row_limit = table_params.get("row-limit", None)
+    if row_limit:
+        df = lf.collect()
+        seed = table_params.get("row-limit-seed")
+        lf = df.sample(min(row_limit, len(df)), seed=seed).lazy()
+
+    schema = lf.collect_schema()
+    cols = [pl.col(row_index_name)]
+    cast_error_cols = {}
+    cast_to_meta = metadata.file_format not in ["parquet", "snappy.parquet"]
+    for meta_col in metadata.columns:
+        name = meta_col["name"]
+        if name not in schema:
+            continue
+        elif not cast_to_meta:
+            cols.append(pl.col(name))
+            continue
+
+        cast = _cast_polars_col(pl.col(name), schema[name], meta_col)
+        cols.append(cast.alias(name))
+        if meta_col["type_category"] in ["integer", "float", "timestamp"]:
+            cast_error_cols[name] = f"__cast_error_{name}"
+            cast_error = cast.is_null() & pl.col(name).is_not_null()
+            cols.append(cast_error.alias(cast_error_cols[name]))
+
+    return lf.select(cols), cast_error_cols
+
+
+def _cast_polars_col(r: "pl.Expr", dtype: "pl.DataType", meta_col: dict) -> "pl.Expr":
+    """
+    Expression casting the column to the metadata with the same rules as
+    arrow_pd_parser.caster.cast_pandas_table_to_schema (where possible).
+    Values that cannot be cast are null.
+    """
+    type_category = meta_col["type_category"]
+    is_str = dtype == pl.String
+
+    if type_category == "integer":
+        if dtype.is_integer():
+            return r.cast(pl.Int64)
+        f = r.cast(pl.Float64, strict=False)
+        # e.g. "1.0" which pandas.to_numeric reads as a float
+        int_from_float = pl.when(f == f.floor()).then(f.cast(pl.Int64, strict=False))
+        if is_str:
+            return pl.coalesce(r.cast(pl.Int64, strict=False), int_from_float)
+        return int_from_float
+    elif type_category == "float":
+        return r.cast(pl.Float64, strict=False)
+    elif type_category == "boolean":
+        if dtype == pl.Boolean:
+            return r
+        s = r.cast(pl.String).str.strip_chars().str.to_lowercase()
+        return (
+            pl.when(s.is_in(bool_true_values))
+            .then(True)
+            .when(s.is_in(bool_false_values))
+            .then(False)
+            .otherwise(None)
+        )
+    elif type_category == "string":
+        return r.cast(pl.String)
+    elif type_category == "timestamp":
+        is_date = meta_col["type"].startswith("date")
+        if is_str:
+            default_format = default_date_format if is_date else default_datetime_format
+            dt_format = meta_col.get("datetime_format", default_format)
+            parsed = r.map_batches(
+                partial(_polars_to_datetime, dt_format=dt_format),
+                return_dtype=pl.Datetime("us"),
+                is_elementwise=True,
+            )
+        else:
+            parsed = r.cast(pl.Datetime("us"), strict=False)
+        return parsed.dt.date() if is_date else parsed
+    else:
+        return r
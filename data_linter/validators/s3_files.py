@@ -0,0 +1,112 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from typing import Dict, Iterator, List, Union
+
+import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+from botocore.config import Config
+from dataengineeringutils3.s3 import s3_path_to_bucket_key
+from pyarrow.fs import S3FileSystem
+
+log = logging.getLogger("root")
+aws_default_region = os.getenv(
+    "AWS_DEFAULT_REGION", os.getenv("AWS_REGION", "eu-west-1")
+)
+# bytes read from the end of a parquet file to get its footer in one request
+# (bigger footers take a second request)
+footer_read_bytes = 65536
+# max number of parquet footers read from S3 at once
+footer_read_threads = 32
+
+# footers read by prefetch_parquet_footers that have not been used yet
+_prefetched_footers: Dict[str, pq.FileMetaData] = {}
+
+
+@lru_cache(maxsize=None)
+def get_s3_filesystem() -> S3FileSystem:
+    """
+    Returns the S3FileSystem shared by every validator. It is thread safe
+    and pools its connections, so reading each file does not set up a new
+    client (and new connections).
+    """
+    return S3FileSystem(region=aws_default_region)
+
+
+def read_parquet_footers(
+    filepaths: List[str], max_workers: int = footer_read_threads
+) -> Dict[str, pq.FileMetaData]:
+    """
+    Reads the footers (metadata) of many parquet files at once. Each footer
+    in S3 is read with a single suffix range GET of the last
+    footer_read_bytes of the file (and a second if the footer is bigger),
+    with up to max_workers requests at once over one client. Files whose
+    footer cannot be read are left out, so they fail when validated.
+    """
+    s3_client = None
+    if any(f.startswith("s3://") for f in filepaths):
+        s3_client = boto3.client(
+            "s3", config=Config(max_pool_connections=max_workers)
+        )
+
+    read_footer = partial(_try_read_parquet_footer, s3_client=s3_client)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        footers = list(executor.map(read_footer, filepaths))
+    return {f: footer for f, footer in zip(filepaths, footers) if footer is not None}
+
+
+def read_parquet_footer(filepath: str, s3_client=None) -> pq.FileMetaData:
+    if not filepath.startswith("s3://"):
+        return pq.read_metadata(filepath)
+
+    s3_client = s3_client if s3_client else boto3.client("s3")
+    bucket, key = s3_path_to_bucket_key(filepath)
+    tail = _read_s3_suffix(s3_client, bucket, key, footer_read_bytes)
+    # the footer ends with its length (4 bytes) and the magic bytes PAR1
+    footer_size = int.from_bytes(tail[-8:-4], "little") + 8
+    if footer_size > len(tail):
+        tail = _read_s3_suffix(s3_client, bucket, key, footer_size)
+    return pq.read_metadata(pa.BufferReader(tail))
+
+
+def _try_read_parquet_footer(
+    filepath: str, s3_client=None
+) -> Union[pq.FileMetaData, None]:
+    try:
+        return read_parquet_footer(filepath, s3_client)
+    except Exception as e:
+        log.info(f"Could not read the parquet footer of {filepath}: {e}")
+        return None
+
+
+def _read_s3_suffix(s3_client, bucket: str, key: str, n_bytes: int) -> bytes:
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{n_bytes}")
+    return response["Body"].read()
+
+
+@contextmanager
+def prefetch_parquet_footers(filepaths: List[str]) -> Iterator[None]:
+    """
+    Reads the footers of the parquet files in filepaths at once (see
+    read_parquet_footers), so validators can take them with
+    pop_prefetched_footer rather than reading them one at a time.
+    The footers that were not used are dropped on exit.
+    """
+    filepaths = [f for f in filepaths if f.lower().endswith("parquet")]
+    _prefetched_footers.update(read_parquet_footers(filepaths))
+    try:
+        yield
+    finally:
+        for filepath in filepaths:
+            _prefetched_footers.pop(filepath, None)
+
+
+def pop_prefetched_footer(filepath: str) -> Union[pq.FileMetaData, None]:
+    """
+    Returns (and forgets) the prefetched footer of a parquet file, or None
+    if it was not prefetched
+    """
+    return _prefetched_footers.pop(filepath, None)
@@ -0,0 +1,310 @@
+import os
+
+import awswrangler as wr
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pytest
+from moto import mock_s3
+from mojap_metadata import Metadata
+
+import data_linter.validators.arrow_validator as av
+from data_linter.validators import ArrowValidator, PandasValidator
+import data_linter.validators.pandas_validator as pv
+from data_linter.validators.pandas_validator import _compile_regex
+from tests.helpers import mock_get_file
+
+bucket = "dummy-bucket"
+
+
+@pytest.mark.parametrize(
+    "filepath,meta_path,table_params",
+    [
+        (
+            "tests/data/end_to_end1/land/table1.csv",
+            "tests/data/end_to_end1/meta_data/table1.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end1/land/table2.jsonl",
+            "tests/data/end_to_end1/meta_data/table2.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end2/land/table1.parquet",
+            "tests/data/end_to_end2/metadata/table1.json",
+            {},
+        ),
+        (
+            "tests/data/pandas_validator/table1_typed_datetimes.parquet",
+            "tests/data/pandas_validator/meta_data/table1_typed_datetimes.json",
+            {},
+        ),
+        (
+            "tests/data/headers/table1_uppercase.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"headers-ignore-case": True},
+        ),
+        (
+            "tests/data/headers/table1_no_header.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"expect-header": False},
+        ),
+        (
+            "tests/data/pandas_validator/table1_na_test.csv",
+            "tests/data/pandas_validator/meta_data/table1.json",
+            {"pandas-kwargs": {"keep_default_na": False, "na_values": [""]}},
+        ),
+        (
+            "tests/data/pandas_validator/table1_na_test.csv",
+            "tests/data/pandas_validator/meta_data/table1.json",
+            {},
+        ),
+    ],
+)
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_arrow_validator_matches_pandas_validator(
+    filepath, meta_path, table_params, log_verbosity
+):
+    """
+    Check the ArrowValidator gives the same response as the PandasValidator
+    """
+    responses = []
+    for validator_class in [PandasValidator, ArrowValidator]:
+        validator = validator_class(
+            filepath,
+            dict(table_params),
+            Metadata.from_json(meta_path),
+            log_verbosity=log_verbosity,
+        )
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0] == responses[1]
+
+
+@pytest.mark.parametrize("log_verbosity", [None, 0, 2])
+def test_arrow_validator_column_tests(tmp_path, log_verbosity):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": ["1", "12", "15", "25", "11", "", "19", "10", "3.0", "30"],
+            "code": ["ab-1", "ab-2", "ab-٣", "ab-4\n", "x", "", "ab", "a", "b", ""],
+            "is_cat": ["true", "T", "no", "0", "1", "maybe", "", "f", "yes", "1.0"],
+            "my_date": [""] * 9 + ["2020-01-5"],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {
+                "name": "code",
+                "type": "string",
+                "pattern": "^ab-\\d$",
+                "enum": ["ab-1", "ab-2"],
+                "maxLength": 4,
+            },
+            {"name": "is_cat", "type": "bool", "nullable": False},
+            {"name": "my_date", "type": "date64"},
+        ],
+    }
+
+    responses = []
+    for validator_class in [PandasValidator, ArrowValidator]:
+        validator = validator_class(
+            full_file_path, {}, metadata, log_verbosity=log_verbosity
+        )
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[1]["valid"] is False
+    if log_verbosity == 2:
+        # samples are random so only check their size
+        for col in ["my_int", "code", "is_cat"]:
+            for test_name, res in responses[1][col].items():
+                if test_name != "valid" and not res["valid"]:
+                    pandas_res = responses[0][col][test_name]
+                    for k in ["unexpected_index_sample", "unexpected_values_sample"]:
+                        assert len(res.pop(k)) == len(pandas_res.pop(k))
+
+    assert responses[0] == responses[1]
+
+
+def test_arrow_validator_parse_failure(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame({"my_date": ["2020-01-01", "2020-02-30"]}).to_csv(
+        full_file_path, index=False
+    )
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [{"name": "my_date", "type": "date64"}],
+    }
+    validator = ArrowValidator(full_file_path, {}, metadata)
+    validator.read_data_and_validate()
+
+    response = validator.get_response_dict()
+    assert response["valid"] is False
+    assert "name: my_date" in response["parse_data_to_arrow"]["traceback"]
+
+
+def test_arrow_validator_excess_timestamp_precision(tmp_path):
+    """
+    Check CSV timestamps more precise than the metadata unit are not
+    truncated before the typed test, so they fail as in the PandasValidator
+    """
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_ts": [
+                "2020-01-01 00:00:00.000001",
+                "2020-01-01 00:00:00.123000",
+                "2020-01-01 00:00:00.123456",
+                "",
+            ]
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {
+                "name": "my_ts",
+                "type": "timestamp(ms)",
+                "datetime_format": "%Y-%m-%d %H:%M:%S.%f",
+            },
+        ],
+    }
+
+    responses = []
+    for validator_class in [PandasValidator, ArrowValidator]:
+        validator = validator_class(full_file_path, {}, metadata, log_verbosity=0)
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[1]["my_ts"]["datetime_format_test"][
+        "unexpected_values_sample"
+    ] == ["2020-01-01 00:00:00.000001", "2020-01-01 00:00:00.123456"]
+    assert responses[0] == responses[1]
+
+
+@pytest.mark.parametrize(
+    "values,dt_format,expected",
+    [
+        (["2020-01-01", None], "%Y-%m-%d", [pd.Timestamp("2020-01-01"), None]),
+        (["2020-1-5"], "%Y-%m-%d", [pd.Timestamp("2020-01-05")]),
+        (
+            ["01/02/2020 10:01:02"],
+            "%d/%m/%Y %H:%M:%S",
+            [pd.Timestamp(2020, 2, 1, 10, 1, 2)],
+        ),
+        (["2020-02-30"], "%Y-%m-%d", ValueError),
+        (["2020-01-01 10:00"], "%Y-%m-%d %H:%M:%S", ValueError),
+    ],
+)
+def test_arrow_strptime(values, dt_format, expected):
+    col = pa.chunked_array([pa.array(values, type=pa.string())])
+    if expected is ValueError:
+        with pytest.raises(ValueError):
+            av._arrow_strptime(col, dt_format)
+    else:
+        parsed = av._arrow_strptime(col, dt_format)
+        expected = [None if e is None else e.to_pydatetime() for e in expected]
+        assert parsed.to_pylist() == expected
+
+
+@mock_s3
+def test_arrow_validator_s3(monkeypatch):
+    s3_client = boto3.client("s3")
+    _ = s3_client.create_bucket(
+        Bucket=bucket,
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-1"},
+    )
+    filepath = "tests/data/end_to_end1/land/table1.csv"
+    full_path = f"s3://{bucket}/{filepath}"
+    wr.s3.upload(filepath, full_path)
+
+    _ = monkeypatch.setattr(av, "get_s3_filesystem", mock_get_file)
+
+    metadata = Metadata.from_json("tests/data/end_to_end1/meta_data/table1.json")
+    validator = ArrowValidator(full_path, {}, metadata)
+    validator.read_data_and_validate()
+    assert validator.valid
+
+
+def test_arrow_validator_row_limit():
+    validator = ArrowValidator(
+        "tests/data/headers/table1.csv",
+        {"row-limit": 4},
+        Metadata.from_json("tests/data/headers/meta_data/table1.json"),
+    )
+    table, index = av._read_data_to_arrow(
+        validator.filepath, validator.table_params, validator.metadata
+    )
+
+    assert table.num_rows == 4
+    assert len(set(index)) == 4
+
+
+def test_arrow_validator_fail_fast():
+    responses = []
+    for validator_class in [PandasValidator, ArrowValidator]:
+        validator = validator_class(
+            "tests/data/pandas_validator/table1_na_test.csv",
+            {"fail-fast": True},
+            Metadata.from_json("tests/data/pandas_validator/meta_data/table1.json"),
+        )
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[1]["valid"] is False
+    assert "skipped_tests" in responses[1]
+    assert responses[0] == responses[1]
+
+
+pattern_values = [
+    "abc-1234",
+    "\u0661\u0662",
+    "a\n",
+    "a b",
+    "a\x0bb",
+    "a\x1cb",
+    "abc",
+    ":",
+    "aa",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern", ["\\d+", "a$", "a\\sb", "a\\Sb", "[[:alpha:]]+", "a{,3}"]
+)
+def test_arrow_pattern_kernel_matches_re(pattern):
+    regex = _compile_regex(pattern)
+    col = pa.chunked_array([pa.array(pattern_values, type=pa.string())])
+    expected = [regex.regex.match(v) is None for v in pattern_values]
+    assert av._arrow_pattern_kernel(col, regex).to_pylist() == expected
+
+
+@pytest.mark.parametrize(
+    "values,dtype,enum",
+    [
+        ([1, 2, 3, None], "Int64", ["1", "3"]),
+        ([1, 2, 3, None], "Int64", [1.0, True, None]),
+        ([1.0, 2.5, None], "float64", [1, 2.5]),
+        (["a", "1", None], "string", [1, "a"]),
+        ([True, False, None], "boolean", [1, 2]),
+    ],
+)
+@pytest.mark.parametrize("nullable", [True, False])
+def test_arrow_enum_kernel_matches_isin(values, dtype, enum, nullable):
+    """
+    Check enum values are not converted to the type of the column
+    (e.g. "1" is not in an int column), as with pandas isin
+    """
+    s = pd.Series(values, dtype=dtype)
+    expected = pv._enum_kernel(s, frozenset(enum), nullable).fillna(True).tolist()
+    col = pa.chunked_array([pa.array(s, from_pandas=True)])
+    actual = av._arrow_enum_kernel(col, frozenset(enum), nullable).to_pylist()
+    assert actual == expected
@@ -0,0 +1,242 @@
+import os
+
+import awswrangler as wr
+import boto3
+import pandas as pd
+import pytest
+from moto import mock_s3
+from mojap_metadata import Metadata
+
+import data_linter.validators.duckdb_validator as dv
+from data_linter.validators import DuckDBValidator, PandasValidator
+import data_linter.validators.pandas_validator as pv
+from data_linter.validators.pandas_validator import _compile_regex
+from tests.helpers import mock_get_file
+
+duckdb = pytest.importorskip("duckdb")
+
+bucket = "dummy-bucket"
+
+
+@pytest.mark.parametrize(
+    "filepath,meta_path,table_params",
+    [
+        (
+            "tests/data/end_to_end1/land/table1.csv",
+            "tests/data/end_to_end1/meta_data/table1.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end1/land/table2.jsonl",
+            "tests/data/end_to_end1/meta_data/table2.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end2/land/table1.parquet",
+            "tests/data/end_to_end2/metadata/table1.json",
+            {},
+        ),
+        (
+            "tests/data/pandas_validator/table1_typed_datetimes.parquet",
+            "tests/data/pandas_validator/meta_data/table1_typed_datetimes.json",
+            {},
+        ),
+        (
+            "tests/data/headers/table1_uppercase.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"headers-ignore-case": True},
+        ),
+        (
+            "tests/data/headers/table1_no_header.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"expect-header": False},
+        ),
+        (
+            "tests/data/pandas_validator/table1_na_test.csv",
+            "tests/data/pandas_validator/meta_data/table1.json",
+            {"pandas-kwargs": {"keep_default_na": False, "na_values": [""]}},
+        ),
+    ],
+)
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_duckdb_validator_matches_pandas_validator(
+    filepath, meta_path, table_params, log_verbosity
+):
+    """
+    Check the DuckDBValidator gives the same response as the PandasValidator
+    """
+    responses = []
+    for validator_class in [PandasValidator, DuckDBValidator]:
+        validator = validator_class(
+            filepath,
+            dict(table_params),
+            Metadata.from_json(meta_path),
+            log_verbosity=log_verbosity,
+        )
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0] == responses[1]
+
+
+@pytest.mark.parametrize("log_verbosity", [None, 0, 2])
+def test_duckdb_validator_column_tests(tmp_path, log_verbosity):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": ["1", "12", "15", "25", "11", "", "19", "10", "3.0", "30"],
+            "code": ["ab-1", "ab-2", "ab-٣", "ab-4\n", "x", "", "ab", "a", "b", ""],
+            "is_cat": ["true", "T", "no", "0", "1", "maybe", "", "f", "yes", "1.0"],
+            "my_date": [""] * 9 + ["2020-01-5"],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {
+                "name": "code",
+                "type": "string",
+                "pattern": "^ab-\\d$",
+                "enum": ["ab-1", "ab-2"],
+                "maxLength": 4,
+            },
+            {"name": "is_cat", "type": "bool", "nullable": False},
+            {"name": "my_date", "type": "date64"},
+        ],
+    }
+
+    responses = []
+    for validator_class in [PandasValidator, DuckDBValidator]:
+        validator = validator_class(
+            full_file_path, {}, metadata, log_verbosity=log_verbosity
+        )
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[1]["valid"] is False
+    if log_verbosity == 2:
+        # samples are random so only check their size
+        for col in ["my_int", "code", "is_cat"]:
+            for test_name, res in responses[1][col].items():
+                if test_name != "valid" and not res["valid"]:
+                    pandas_res = responses[0][col][test_name]
+                    for k in ["unexpected_index_sample", "unexpected_values_sample"]:
+                        assert len(res.pop(k)) == len(pandas_res.pop(k))
+
+    assert responses[0] == responses[1]
+
+
+def test_duckdb_validator_failed_casts(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": ["1", "a", "3.5", "0x10"],
+            "my_date": ["2020-01-01", "2020-02-30", " 2020-01-01", ""],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64"},
+            {"name": "my_date", "type": "date64"},
+        ],
+    }
+    validator = DuckDBValidator(full_file_path, {}, metadata)
+    validator.read_data_and_validate()
+
+    response = validator.get_response_dict()
+    assert response["valid"] is False
+    assert response["parse_data_to_duckdb"]["failed_casts"] == {
+        "my_int": 3,
+        "my_date": 2,
+    }
+
+
+@mock_s3
+def test_duckdb_validator_s3(monkeypatch):
+    s3_client = boto3.client("s3")
+    _ = s3_client.create_bucket(
+        Bucket=bucket,
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-1"},
+    )
+    filepath = "tests/data/end_to_end1/land/table1.csv"
+    full_path = f"s3://{bucket}/{filepath}"
+    wr.s3.upload(filepath, full_path)
+
+    _ = monkeypatch.setattr(dv, "get_s3_filesystem", mock_get_file)
+
+    metadata = Metadata.from_json("tests/data/end_to_end1/meta_data/table1.json")
+    validator = DuckDBValidator(full_path, {}, metadata)
+    validator.read_data_and_validate()
+    assert validator.valid
+
+
+def test_duckdb_validator_row_limit():
+    validator = DuckDBValidator(
+        "tests/data/headers/table1.csv",
+        {"row-limit": 4},
+        Metadata.from_json("tests/data/headers/meta_data/table1.json"),
+    )
+    con = dv._connect()
+    view, _ = dv._create_duckdb_view(
+        con, validator.filepath, validator.table_params, validator.metadata
+    )
+    index = [r[0] for r in con.execute(f"SELECT * FROM {view}").fetchall()]
+
+    assert len(set(index)) == 4
+
+
+pattern_values = [
+    "abc-1234",
+    "\u0661\u0662",
+    "a\n",
+    "a b",
+    "a\x0bb",
+    "a\x1cb",
+    "abc",
+    ":",
+    "aa",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern", ["\\d+", "a$", "a\\sb", "a\\Sb", "[[:alpha:]]+", "a{,3}"]
+)
+def test_duckdb_pattern_kernel_matches_re(pattern):
+    regex = _compile_regex(pattern)
+    con = dv._connect()
+    con.register("t", pd.DataFrame({"c": pattern_values}))
+    kernel = dv._duckdb_pattern_kernel("c", "VARCHAR", regex)
+    actual = [r[0] for r in con.execute(f"SELECT {kernel} FROM t").fetchall()]
+    expected = [regex.regex.match(v) is None for v in pattern_values]
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "values,dtype,enum",
+    [
+        ([1, 2, 3, None], "Int64", ["1", "3"]),
+        ([1, 2, 3, None], "Int64", [1.0, True, None]),
+        ([1.0, 2.5, None], "float64", [1, 2.5]),
+        (["a", "1", None], "string", [1, "a"]),
+        ([True, False, None], "boolean", [1, 2]),
+    ],
+)
+@pytest.mark.parametrize("nullable", [True, False])
+def test_duckdb_enum_kernel_matches_isin(values, dtype, enum, nullable):
+    """
+    Check enum values are not converted to the type of the column
+    (e.g. "1" is not in an int column), as with pandas isin
+    """
+    s = pd.Series(values, dtype=dtype)
+    expected = pv._enum_kernel(s, frozenset(enum), nullable).fillna(True).tolist()
+    con = dv._connect()
+    con.register("t", pd.DataFrame({"c": s}))
+    kernel = dv._duckdb_enum_kernel(
+        "c", dv._get_duckdb_types(con, "t")["c"], frozenset(enum), nullable
+    )
+    actual = [r[0] for r in con.execute(f"SELECT {kernel} FROM t").fetchall()]
+    assert actual == expected
@@ -1,9 +1,11 @@
 import os
+import json
 import yaml
 import gzip
 import tempfile
 import pytest
 
+from copy import deepcopy
 from pyarrow import fs
 
 from tests.helpers import (
@@ -291,13 +293,16 @@ def test_read_all_file_body(s3, land_path):
 
 
 @pytest.mark.parametrize(
-    "meta, engine_choice",
+    "meta, engine_choice, table_params",
     [
-        ("table1", "pandas"),
-        ("table1_pq", "parquet"),
+        ("table1", "pandas", {}),
+        ("table1_pq", "parquet", {}),
+        ("table1_pq", "parquet", {"parquet-mode": "stats"}),
+        ("table1_pq", "parquet", {"parquet-mode": "data"}),
+        ("table1", "arrow", {}),
     ]
 )
-def test_parquet_linting(s3, meta, engine_choice):
+def test_parquet_linting(s3, meta, engine_choice, table_params):
 
     from data_linter.validation import run_validation
 
@@ -315,6 +320,7 @@ def test_parquet_linting(s3, meta, engine_choice):
                 "required": True,
                 "metadata": f"tests/data/end_to_end2/metadata/{meta}.json",
                 "expect-header": True,
+                **table_params,
             }
         },
     }
@@ -503,3 +509,109 @@ def test_pandas_kwargs(s3, config_path, expected_pass):
 
     response = validate_data(config)
     assert response.result["valid"] == expected_pass
+
+
+@pytest.mark.parametrize("all_must_pass", [True, False])
+def test_fail_fast_run(s3, monkeypatch, all_must_pass):
+    import data_linter.validation as validation
+
+    land_folder = "tests/data/pandas_validator/"
+    with open("tests/data/pandas_validator/config_fail.yaml") as f:
+        config = yaml.safe_load(f)
+
+    config["fail-fast"] = True
+    config["all-must-pass"] = all_must_pass
+    config["tables"]["table1_na_test"]["matched_files"] = [
+        "s3://land/table1_na_test.csv"
+    ] * 3
+
+    set_up_s3(s3, land_folder, config)
+
+    saved_responses = []
+    monkeypatch.setattr(
+        validation,
+        "save_completion_status",
+        lambda config, responses: saved_responses.extend(responses),
+    )
+    validation.validate_data(config)
+
+    assert len(saved_responses) == 3
+    assert not any(r["valid"] for r in saved_responses)
+    skipped = [r.get("skipped", False) for r in saved_responses]
+    # files are only skipped if they will all fail anyway
+    assert skipped == [False, all_must_pass, all_must_pass]
+    # each validated file stops at its first failed test
+    assert "skipped_tests" in saved_responses[0]["response"]
+
+
+def test_validation_threads(s3, monkeypatch):
+    import data_linter.validation as validation
+
+    land_folder = "tests/data/pandas_validator/"
+    with open("tests/data/pandas_validator/config_fail.yaml") as f:
+        config = yaml.safe_load(f)
+
+    config["tables"]["table1_na_test"]["matched_files"] = [
+        "s3://land/table1_na_test.csv"
+    ] * 4
+
+    set_up_s3(s3, land_folder, config)
+
+    saved_responses = []
+    monkeypatch.setattr(
+        validation,
+        "save_completion_status",
+        lambda config, responses: saved_responses.append(responses),
+    )
+    for n_threads in [1, 4]:
+        run_config = deepcopy(config)
+        run_config["validation-threads"] = n_threads
+        validation.validate_data(run_config)
+
+    assert len(saved_responses[1]) == 4
+    assert saved_responses[0] == saved_responses[1]
+
+
+def test_invalid_pattern_run(s3, monkeypatch, tmp_path):
+    """
+    Check a table whose metadata has an invalid pattern fails each of its
+    files and the rest of the run carries on
+    """
+    import data_linter.validation as validation
+
+    land_folder = "tests/data/pandas_validator/"
+    with open("tests/data/pandas_validator/config_pass.yaml") as f:
+        config = yaml.safe_load(f)
+
+    with open("tests/data/pandas_validator/meta_data/table1.json") as f:
+        metadata = json.load(f)
+    metadata["columns"][2]["pattern"] = "[a-z"
+    meta_path = os.path.join(tmp_path, "table1.json")
+    with open(meta_path, "w") as f:
+        json.dump(metadata, f)
+
+    table_params = config["tables"]["table1_na_test"]
+    table_params["matched_files"] = ["s3://land/table1_na_test.csv"]
+    config["tables"] = {
+        "table1_invalid_pattern": dict(deepcopy(table_params), metadata=meta_path),
+        "table1_na_test": table_params,
+    }
+
+    set_up_s3(s3, land_folder, config)
+
+    saved_responses = []
+    monkeypatch.setattr(
+        validation,
+        "save_completion_status",
+        lambda config, responses: saved_responses.extend(responses),
+    )
+    validation.validate_data(config)
+
+    assert [r["table-name"] for r in saved_responses] == [
+        "table1_invalid_pattern",
+        "table1_na_test",
+    ]
+    assert [r["valid"] for r in saved_responses] == [False, True]
+    plan_result = saved_responses[0]["response"]["compile_validation_plan"]
+    assert plan_result["valid"] is False
+    assert "re.error" in plan_result["traceback"]
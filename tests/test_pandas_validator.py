@@ -1,5 +1,8 @@
 import os
+import pickle
+import re
 import pytest
+from dataclasses import replace
 from data_linter.validators import pandas_validator as pv
 from datetime import datetime
 
@@ -188,6 +191,57 @@ def test_pattern_test_pass(col_values, expected_valid):
     res = pv._pattern_test(col, meta_col)
     assert isinstance(res, dict)
     assert res["valid"] == expected_valid
+    assert res["test_inputs"]["regex_engine"] == "re2"
+
+
+pattern_kernel_values = [
+    "abc-1234",
+    "\u0661\u0662",
+    "a\n",
+    "a",
+    "aa",
+    "AB",
+    None,
+    "",
+    "abc-\u0661",
+    "a b",
+    "a\x0bb",
+    "a\x1cb",
+    "a\x1fb",
+    ":",
+    "a{,3}",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern,expected_engine",
+    [
+        ("^\\D{3}-\\d{4}$", "re2"),
+        ("\\d+", "re2"),
+        ("a$", "re2"),
+        ("(?i)ab", "re2"),
+        ("(?=a)a", "re"),
+        ("(\\w)\\1", "re"),
+        ("abc\\Z", "re"),
+        ("a\\sb", "re2"),
+        ("a\\Sb", "re2"),
+        ("[[:alpha:]]+", "re"),
+        ("a{,3}", "re"),
+    ],
+)
+def test_pattern_kernel_matches_re(pattern, expected_engine):
+    """
+    Check the pattern kernel gives the same result as re.match whichever
+    engine is used (including unicode digits, trailing newlines, whitespace
+    only re's \\s matches and syntax RE2 reads differently)
+    """
+    col = pd.Series(pattern_kernel_values, dtype=pd.StringDtype())
+    regex = pv._compile_regex(pattern)
+    assert regex.engine == expected_engine
+    assert pv._compile_regex(pattern) is regex
+
+    expected = ~col.str.match(re.compile(pattern))
+    assert pv._pattern_kernel(col, regex).equals(expected)
 
 
 @pytest.mark.parametrize(
@@ -402,3 +456,940 @@ def test_row_limits(
     df, _ = pv._parse_data_to_pandas(full_file_path, table_params, metadata)
 
     assert len(df) == exp_row_limit
+
+
+@pytest.mark.parametrize("n, chunk_sizes", [(10, [7, 300, 1, 692]), (20, [5, 5])])
+def test_reservoir_sample(n, chunk_sizes):
+    samples = []
+    for _ in range(2):
+        sample = pv.ReservoirSample(n, seed=42)
+        start = 0
+        for size in chunk_sizes:
+            rows = range(start, start + size)
+            sample.add(pd.DataFrame({"a": rows}, index=rows))
+            start += size
+        samples.append(sample.df)
+
+    total = sum(chunk_sizes)
+    assert len(samples[0]) == min(n, total)
+    assert samples[0]["a"].is_unique
+    assert samples[0]["a"].between(0, total - 1).all()
+    # rows keep their original index and the same seed gives the same sample
+    assert (samples[0].index == samples[0]["a"]).all()
+    assert samples[0].equals(samples[1])
+
+
+@pytest.mark.parametrize("chunksize", [None, 3])
+def test_row_limit_streams_file(chunksize):
+    test_folder = "tests/data/headers/"
+    table_params = {"row-limit": 4, "row-limit-seed": 1, "chunksize": chunksize}
+
+    dfs = []
+    for _ in range(2):
+        metadata = Metadata.from_json(
+            os.path.join(test_folder, "meta_data/table1.json")
+        )
+        dfs.extend(
+            pv._iter_data_to_pandas(
+                os.path.join(test_folder, "table1.csv"),
+                table_params,
+                metadata,
+                chunksize,
+            )
+        )
+
+    assert len(dfs) == 2
+    assert len(dfs[0]) == 4
+    assert dfs[0].equals(dfs[1])
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 7, "1KB"])
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_chunked_validation_matches_whole_file(tmp_path, chunksize, log_verbosity):
+    """
+    Check that validating a file in chunks gives the same response
+    as validating the whole file at once
+    """
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": [1, 12, 15, 25, 11, 13, 19, 10, None, 30],
+            "animal": ["cat", "dog", "cow", None, "fish", "cat", "dog", "x", "y", None],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {
+                "name": "animal",
+                "type": "string",
+                "enum": ["cat", "dog", "fish"],
+                "nullable": False,
+            },
+        ],
+    }
+
+    whole_file = pv.PandasValidator(
+        full_file_path, {}, metadata, log_verbosity=log_verbosity
+    )
+    whole_file.read_data_and_validate()
+
+    chunked = pv.PandasValidator(
+        full_file_path, {"chunksize": chunksize}, metadata, log_verbosity=log_verbosity
+    )
+    chunked.read_data_and_validate()
+
+    assert whole_file.valid is False
+    assert chunked.get_response_dict() == whole_file.get_response_dict()
+
+
+@pytest.mark.parametrize("chunksize", [None, 4])
+def test_fail_fast(tmp_path, chunksize):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": [1, 12, 15, 25, 11, 13, 19, 10, None, 30],
+            "animal": ["cat", "dog", "cow", None, "fish", "cat", "dog", "x", "y", None],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {
+                "name": "animal",
+                "type": "string",
+                "enum": ["cat", "dog", "fish"],
+                "nullable": False,
+            },
+        ],
+    }
+
+    validator = pv.PandasValidator(
+        full_file_path, {"fail-fast": True, "chunksize": chunksize}, metadata
+    )
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert validator.valid is False
+    assert response["my_int"]["min_max_test"]["valid"] is False
+    assert "animal" not in response
+    assert response["skipped_tests"] == {"animal": ["enum_test", "nullable_test"]}
+
+
+@pytest.mark.parametrize(
+    "file_format,expect_header,chunksize",
+    [
+        ("csv", True, None),
+        ("csv", True, 4),
+        ("csv", False, None),
+        ("parquet", True, None),
+        ("parquet", True, 4),
+    ],
+)
+@pytest.mark.parametrize("read_cols", [None, ["animal"]])
+def test_columns_projected_at_read(
+    monkeypatch, tmp_path, file_format, expect_header, chunksize, read_cols
+):
+    full_file_path = os.path.join(tmp_path, f"table1.{file_format}")
+    df = pd.DataFrame(
+        {
+            "my_int": ["1", "12", "15"],
+            "extra": ["a", "b", "c"],
+            "animal": ["cat", "dog", "cow"],
+        }
+    )
+    if file_format == "csv":
+        df.to_csv(full_file_path, index=False, header=expect_header)
+    else:
+        df.to_parquet(full_file_path, index=False)
+
+    # without a header the metadata has to describe every column
+    meta_cols = ["my_int", "animal"] if expect_header else list(df.columns)
+    metadata = Metadata.from_dict(
+        {
+            "name": "table1",
+            "file_format": file_format,
+            "columns": [{"name": c, "type": "string"} for c in meta_cols],
+        }
+    )
+    table_params = {"allow-unexpected-data": True, "expect-header": expect_header}
+
+    read_kwargs = []
+    read = pv.reader.read
+
+    def spy_read(*args, **kwargs):
+        read_kwargs.append(kwargs)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(pv.reader, "read", spy_read)
+    df = pd.concat(
+        pv._iter_data_to_pandas(
+            full_file_path, table_params, metadata, chunksize, read_cols
+        )
+    )
+
+    expected_cols = read_cols if read_cols else ["my_int", "animal"]
+    if not expect_header and read_cols is None:
+        expected_cols = ["my_int", "extra", "animal"]
+    assert list(df.columns) == expected_cols
+    assert [c["name"] for c in metadata.columns] == expected_cols
+
+    projected = file_format == "csv" or chunksize is None
+    if projected and expected_cols != ["my_int", "extra", "animal"]:
+        key = "usecols" if file_format == "csv" else "columns"
+        assert key in read_kwargs[-1]
+
+
+def test_only_read_tested_cols(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": [1, 12, 15, 25],
+            "untested": ["a", "b", "c", "d"],
+            "animal": ["cat", "dog", "cow", None],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10},
+            {"name": "untested", "type": "string"},
+            {"name": "animal", "type": "string", "enum": ["cat", "dog"]},
+        ],
+    }
+
+    responses = []
+    for table_params in [{}, {"only-read-tested-cols": True}]:
+        validator = pv.PandasValidator(full_file_path, table_params, metadata)
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0] == responses[1]
+    assert responses[1]["valid"] is False
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_csv_read_with_metadata_types(tmp_path, chunksize):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    with open(full_file_path, "w") as f:
+        f.write("my_int,my_float,code,my_bool,my_date\n")
+        f.write("1,1.5,01,true,2020-01-01\n")
+        f.write("2,,1.50,False,2020-01-02\n")
+        f.write(",3,,,\n")
+    metadata = Metadata.from_dict(
+        {
+            "name": "table1",
+            "file_format": "csv",
+            "columns": [
+                {"name": "my_int", "type": "int64"},
+                {"name": "my_float", "type": "float64"},
+                {"name": "code", "type": "string"},
+                {"name": "my_bool", "type": "bool"},
+                {"name": "my_date", "type": "date64"},
+            ],
+        }
+    )
+    metadata.set_col_type_category_from_types()
+
+    df = pd.concat(pv._iter_data_to_pandas(full_file_path, {}, metadata, chunksize))
+
+    assert df.dtypes.to_dict() == {
+        "my_int": pd.Int64Dtype(),
+        "my_float": np.float64,
+        "code": pd.StringDtype(),
+        "my_bool": pd.BooleanDtype(),
+        "my_date": object,
+    }
+    # strings are kept as they are written rather than inferred as numbers
+    assert df["code"].tolist() == ["01", "1.50", pd.NA]
+    assert df["my_date"].tolist()[:2] == [
+        datetime(2020, 1, 1).date(),
+        datetime(2020, 1, 2).date(),
+    ]
+
+
+def test_csv_read_with_metadata_types_failure(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame({"my_float": ["1.5", "a"]}).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [{"name": "my_float", "type": "float64"}],
+    }
+
+    validator = pv.PandasValidator(full_file_path, {}, metadata)
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert validator.valid is False
+    traceback = response["parse_data_to_pandas"]["traceback"]
+    assert "PandasCastError" in traceback
+    assert "['my_float']" in traceback
+
+
+def test_invalid_pattern(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame({"code": ["ab", "cd"]}).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [{"name": "code", "type": "string", "pattern": "[a-z"}],
+    }
+
+    validator = pv.PandasValidator(full_file_path, {}, metadata)
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert validator.valid is False
+    assert "re.error" in response["compile_validation_plan"]["traceback"]
+
+
+@pytest.mark.parametrize(
+    "filename,table_params,error",
+    [
+        ("table1.csv", {}, "columns present in data but not in metadata"),
+        (
+            "table1.csv",
+            {"expect-header": False},
+            "data has 3 columns but the metadata has 2",
+        ),
+        ("table1.parquet", {}, "columns present in data but not in metadata"),
+        ("table1.parquet", {"chunksize": 2}, "present in data but not in metadata"),
+    ],
+)
+def test_column_error_before_reading_data(
+    monkeypatch, tmp_path, filename, table_params, error
+):
+    full_file_path = os.path.join(tmp_path, filename)
+    df = pd.DataFrame({"my_int": [1, 2], "extra": ["a", "b"], "animal": ["x", "y"]})
+    if filename.endswith("csv"):
+        df.to_csv(full_file_path, index=False)
+    else:
+        df.to_parquet(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": filename.split(".")[1],
+        "columns": [
+            {"name": "my_int", "type": "int64"},
+            {"name": "animal", "type": "string"},
+        ],
+    }
+
+    def read(*args, **kwargs):
+        raise AssertionError("the data should not be read")
+
+    monkeypatch.setattr(pv.reader, "read", read)
+    validator = pv.PandasValidator(full_file_path, table_params, metadata)
+    validator.read_data_and_validate()
+    traceback = validator.get_response_dict()["parse_data_to_pandas"]["traceback"]
+
+    assert validator.valid is False
+    assert "ColumnError" in traceback
+    assert error in traceback
+
+
+def test_read_csv_header_of_long_first_line(monkeypatch, tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    columns = [f"col_{i}" for i in range(100)]
+    pd.DataFrame([range(100)], columns=columns).to_csv(full_file_path, index=False)
+
+    monkeypatch.setattr(pv, "header_probe_bytes", 16)
+    assert pv._read_csv_head(full_file_path).startswith(b"col_0,col_1")
+    assert pv._read_csv_header(full_file_path, 0, {}) == columns
+    assert pv._read_csv_header(full_file_path, 0, {"skiprows": 1}) == [
+        str(i) for i in range(100)
+    ]
+
+
+@pytest.mark.parametrize(
+    "filepath,meta_path,table_params",
+    [
+        (
+            "tests/data/end_to_end1/land/table1.csv",
+            "tests/data/end_to_end1/meta_data/table1.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end1/land/table2.jsonl",
+            "tests/data/end_to_end1/meta_data/table2.json",
+            {"chunksize": 3},
+        ),
+        (
+            "tests/data/end_to_end2/land/table1.parquet",
+            "tests/data/end_to_end2/metadata/table1.json",
+            {},
+        ),
+        (
+            "tests/data/pandas_validator/table1_na_test.csv",
+            "tests/data/pandas_validator/meta_data/table1.json",
+            {"pandas-kwargs": {"keep_default_na": False, "na_values": [""]}},
+        ),
+    ],
+)
+def test_pyarrow_strings(filepath, meta_path, table_params):
+    responses = []
+    for pyarrow_strings in [False, True]:
+        metadata = Metadata.from_json(meta_path)
+        metadata.set_col_type_category_from_types()
+        params = {**table_params, "pyarrow-strings": pyarrow_strings}
+        df = next(pv._iter_data_to_pandas(filepath, params, metadata))
+        string_cols = [
+            c["name"] for c in metadata.columns if c["type_category"] == "string"
+        ]
+        storage = "pyarrow" if pyarrow_strings else "python"
+        assert all(df[c].dtype == pd.StringDtype(storage) for c in string_cols)
+
+        validator = pv.PandasValidator(filepath, params, Metadata.from_json(meta_path))
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0] == responses[1]
+
+
+@pytest.mark.parametrize("pattern", ["^a.c$", "^(?!abd)a.*"])
+def test_pattern_test_pyarrow_strings(pattern):
+    col = pd.Series(["abc", "abd", None, "a\u00e9c", "abc\n"])
+    meta_col = {"name": "col", "pattern": pattern}
+    res_dicts = [
+        pv._pattern_test(col.astype(pd.StringDtype(storage)), meta_col)
+        for storage in ["python", "pyarrow"]
+    ]
+    assert res_dicts[0] == res_dicts[1]
+
+
+@pytest.mark.parametrize("log_verbosity", [0, 2, 10])
+def test_unexpected_samples_match_index(log_verbosity):
+    col = pd.Series(["a", "b", "x", "c", "y", "z"], index=[10, 11, 12, 13, 14, 15])
+    col_oob = pd.Series([False, pd.NA, True, False, True, True], dtype="boolean")
+    col_oob.index = col.index
+
+    res_dict = pv._fill_res_dict(col, col_oob, {}, log_verbosity)
+
+    assert res_dict["valid"] is False
+    assert res_dict["percentage_of_column_is_error"] == 50
+    expected_len = 3 if log_verbosity in [0, 10] else log_verbosity
+    assert len(res_dict["unexpected_index_sample"]) == expected_len
+    for i, v in zip(
+        res_dict["unexpected_index_sample"], res_dict["unexpected_values_sample"]
+    ):
+        assert col[i] == v
+
+
+def test_log_verbosity_per_validator():
+    """
+    Validators sharing a plan keep their own log_verbosity, so they can be
+    run in several threads at once
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    metadata = {
+        "name": "table1",
+        "columns": [{"name": "my_int", "type": "int64", "minimum": 10}],
+    }
+    df = pd.DataFrame({"my_int": pd.Series(range(20), dtype="Int64")})
+    plan = pv.PandasValidator.compile_plan({}, metadata)
+
+    def validate(log_verbosity):
+        validator = pv.PandasValidator(
+            "", {}, metadata, log_verbosity=log_verbosity, plan=plan
+        )
+        validator.validate_df(df)
+        return validator.get_response_dict()["my_int"]["min_max_test"]
+
+    verbosities = [None, 0, 3] * 10
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(validate, verbosities))
+
+    for log_verbosity, res_dict in zip(verbosities, results):
+        samples = res_dict.get("unexpected_values_sample")
+        if log_verbosity is None:
+            assert samples is None
+        else:
+            assert len(samples) == (10 if log_verbosity == 0 else 3)
+
+
+def test_merge_test_results_samples():
+    res_dict = {
+        "valid": False,
+        "percentage_of_column_is_error": 50.0,
+        "unexpected_index_sample": [0, 1],
+        "unexpected_values_sample": ["a", "b"],
+    }
+    new_res_dict = {
+        "valid": False,
+        "percentage_of_column_is_error": 75.0,
+        "unexpected_index_sample": [4, 5, 6],
+        "unexpected_values_sample": ["e", "f", "g"],
+    }
+    merged = pv._merge_test_results(res_dict, 2, new_res_dict, 3, 3)
+    assert len(merged["unexpected_values_sample"]) == 3
+    assert set(merged["unexpected_values_sample"]).issubset(
+        {"a", "b", "e", "f", "g"}
+    )
+
+
+@pytest.mark.parametrize(
+    "datetime_format",
+    [
+        "%Y-%m-%d",
+        "%Y-%m-%d %H:%M:%S",
+        "%d/%m/%Y",
+        "%Y%m%d",
+        "%d/%m/%Y %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d %H:%M:%S.%f",
+    ],
+)
+@pytest.mark.parametrize("check_for_no_time_component", [True, False])
+@pytest.mark.parametrize("dtype", [object, pd.StringDtype()])
+def test_get_invalid_date_or_datetime_col(
+    datetime_format, check_for_no_time_component, dtype
+):
+    """
+    Check the vectorised date format test gives the same result as
+    using strptime on each value
+    """
+    s = pd.Series(
+        [
+            "2020-01-01",
+            "2020-1-1",
+            "3000-12-29",
+            "",
+            None,
+            " 2020-01-01",
+            "2020-02-30",
+            "2020-01-01 00:00:00",
+            "2020-01-01 10:11:12",
+            "3000-01-01 00:00:01",
+            "01/01/2020",
+            "20200101",
+            "abc",
+            "01/01/2020 10:11:12",
+            "01/01/2020 23:59:60",
+            "2020-01-01T10:11:12",
+            "2020-01-01T23:59:61",
+            "2020-01-01 00:00:00.123",
+            "2020-01-01 00:00:00.123456",
+            "2020-01-01 00:00:00.1234567",
+        ],
+        dtype=dtype,
+    )
+    expected = ~s.apply(
+        lambda x: pv._valid_date_or_datetime_conversion(
+            x, datetime_format, check_for_no_time_component
+        )
+    )
+    actual = pv._get_invalid_date_or_datetime_col(
+        s, datetime_format, check_for_no_time_component
+    )
+    assert actual.tolist() == expected.astype(bool).tolist()
+
+
+@pytest.mark.parametrize("datetime_format", ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"])
+@pytest.mark.parametrize("check_for_no_time_component", [True, False])
+@pytest.mark.parametrize("dtype", [object, "string", "string[pyarrow]"])
+def test_iso_date_kernel(
+    monkeypatch, datetime_format, check_for_no_time_component, dtype
+):
+    """
+    Check the fixed width kernel for the default formats gives the same
+    result as using strptime on each value
+    """
+    monkeypatch.setattr(pv, "iso_block_rows", 4)
+    values = [
+        "2020-02-29",
+        "2019-02-29",
+        "1900-02-29",
+        "2000-02-29",
+        "0000-01-01",
+        "0001-01-01",
+        "9999-12-31",
+        "2020-13-01",
+        "2020-00-10",
+        "2020-04-31",
+        "2020-01- 5",
+        "2020/01/01",
+        "２０２０-01-01",
+        "2020-01-0a",
+        "2020-01-01 23:59:59",
+        "2020-01-01 24:00:00",
+        "2020-01-01 23:60:00",
+        "2020-01-01 23:59:60",
+        "2020-01-01 1:2:3",
+        "2020-01-01T00:00:00",
+        "2020-01-01 00:00:00",
+        "",
+        None,
+    ]
+    s = pd.Series(values, index=range(len(values), 0, -1), dtype=dtype)
+    expected = ~s.apply(
+        lambda x: pv._valid_date_or_datetime_conversion(
+            x, datetime_format, check_for_no_time_component
+        )
+    )
+    actual = pv._get_invalid_date_or_datetime_col(
+        s, datetime_format, check_for_no_time_component
+    )
+    assert actual.index.equals(s.index)
+    assert actual.tolist() == expected.astype(bool).tolist()
+
+    # values written out in the format are checked without being parsed
+    is_checked, is_valid = pv._check_iso_values(
+        s, pv.iso_format_widths[datetime_format], check_for_no_time_component
+    )
+    if datetime_format == "%Y-%m-%d":
+        written_out = ["2020-02-29", "1900-02-29", "0000-01-01", "9999-12-31"]
+    else:
+        written_out = ["2020-01-01 23:59:60", "2020-01-01 00:00:00"]
+    assert is_checked[[values.index(v) for v in written_out + ["", None]]].all()
+    assert not is_checked[values.index("2020-01- 5")]
+
+
+@pytest.mark.parametrize(
+    "col,meta_type,expected",
+    [
+        (
+            pd.Series(pd.to_datetime([0, 1500, None], unit="ms")),
+            "timestamp(s)",
+            [False, True, False],
+        ),
+        (
+            pd.Series(pd.to_datetime([0, 1500, None], unit="ms")),
+            "timestamp(ms)",
+            [False, False, False],
+        ),
+        (
+            pd.Series(pd.to_datetime([0, 1000, None], unit="ms")),
+            "date64",
+            [False, True, False],
+        ),
+        (
+            pd.Series(pd.to_datetime(["2020-01-01", None]).tz_localize("UTC")),
+            "timestamp(ns)",
+            [True, False],
+        ),
+        (
+            pd.Series([datetime(2020, 1, 1).date(), None, datetime(2300, 1, 1).date()]),
+            "timestamp(ns)",
+            [False, False, True],
+        ),
+        (
+            pd.Series(
+                [datetime(2020, 1, 1), datetime(2020, 1, 1, 0, 0, 0, 1), None],
+                dtype=object,
+            ),
+            "date32",
+            [False, True, False],
+        ),
+        (
+            pd.Series([0, 1, None, 2**40], dtype="timestamp[s][pyarrow]"),
+            "date32",
+            [False, True, False, True],
+        ),
+    ],
+)
+def test_get_invalid_typed_datetime_col(col, meta_type, expected):
+    assert pv._check_pandas_series_is_datetime(col)
+    actual = pv._get_invalid_typed_datetime_col(col, meta_type)
+    assert actual.tolist() == expected
+
+
+def test_typed_datetime_columns_tested():
+    metadata = Metadata.from_json(
+        "tests/data/pandas_validator/meta_data/table1_typed_datetimes.json"
+    )
+    validator = pv.PandasValidator(
+        "tests/data/pandas_validator/table1_typed_datetimes.parquet",
+        {},
+        metadata,
+        log_verbosity=0,
+    )
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert response["valid"] is False
+    expected = {
+        "my_timestamp": ("datetime_format_test", [1]),
+        "my_tz_timestamp": ("datetime_format_test", [0, 2, 3, 4]),
+        "my_date": ("date_format_test", [2, 4]),
+        "my_future_date": ("datetime_format_test", [1, 4]),
+    }
+    for column, (test_name, index) in expected.items():
+        res_dict = response[column][test_name]
+        assert res_dict["test_inputs"]["type"] == metadata.get_column(column)["type"]
+        assert res_dict["unexpected_index_sample"] == index
+
+
+def test_get_str_columns():
+    df = pd.DataFrame(
+        {
+            "a": pd.Series(["x", None], dtype=pd.StringDtype()),
+            "b": pd.Series(["x", np.nan], dtype=object),
+            "c": pd.Series([datetime(2021, 1, 1), None], dtype=object),
+            "d": pd.Series([1, 2], dtype=pd.Int64Dtype()),
+            "e": pd.Series([None, None], dtype=object),
+        }
+    )
+    assert pv._get_str_columns(df) == {
+        "a": True,
+        "b": True,
+        "c": False,
+        "d": False,
+        "e": True,
+    }
+
+
+def test_validation_plan():
+    metadata = Metadata.from_json("tests/data/pandas_validator/meta_data/table1.json")
+    plan = pv.ValidationPlan.from_metadata(metadata)
+    assert [(s.column, s.test_name) for s in plan.steps] == [
+        ("my_int", "min_max_test"),
+        ("my_int", "nullable_test"),
+        ("animal", "enum_test"),
+        ("animal", "nullable_test"),
+        ("my_datetime", "datetime_format_test"),
+        ("my_date", "date_format_test"),
+    ]
+
+    # plans can be sent to other processes and reused across files
+    plan = pickle.loads(pickle.dumps(plan))
+    file_path = "tests/data/pandas_validator/table1_na_test.csv"
+    table_params = {"pandas-kwargs": {"keep_default_na": False, "na_values": [""]}}
+
+    responses = []
+    for p in [None, plan, plan]:
+        validator = pv.PandasValidator(file_path, table_params, metadata, plan=p)
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0]["valid"]
+    assert all(r == responses[0] for r in responses)
+
+
+def test_validation_plan_headers_ignore_case():
+    metadata = {
+        "name": "t",
+        "columns": [{"name": "My_Col", "type": "string", "nullable": False}],
+    }
+    plan = pv.ValidationPlan.from_metadata(metadata, {"headers-ignore-case": True})
+    assert plan.columns == ["my_col"]
+
+
+def test_unique_values_evaluation():
+    """
+    Check running tests against the unique values of low cardinality
+    columns gives the same response as testing every row
+    """
+    n = 1000
+    df = pd.DataFrame(
+        {
+            "code": pd.Series(
+                (["AB1", "CD2", "XX", "ABCDE", None] * n), dtype=pd.StringDtype()
+            ),
+            "my_date": pd.Series(
+                (["2020-01-01", "2020-13-01", "", None, "2021-02-03"] * n),
+                dtype=pd.StringDtype(),
+            ),
+        }
+    )
+    meta_cols = [
+        {
+            "name": "code",
+            "type": "string",
+            "pattern": "^[A-Z]{2}\\d$",
+            "enum": ["AB1", "CD2"],
+            "minLength": 3,
+            "maxLength": 3,
+        },
+        {"name": "my_date", "type": "date64"},
+    ]
+
+    factorized = pv.FactorizedCol.from_low_cardinality_col(df["code"], 0.2)
+    assert len(factorized) == 4
+    assert pv.FactorizedCol.from_low_cardinality_col(df["code"], 0.0001) is None
+
+    responses = []
+    for threshold in [0, 0.2]:
+        plan = pv.ValidationPlan.from_meta_cols(
+            meta_cols, unique_values_threshold=threshold
+        )
+        response = pv.ValidatorResult()
+        plan.run(df, response)
+        responses.append(response.get_result())
+
+    assert responses[0]["valid"] is False
+    assert responses[0] == responses[1]
+
+
+@pytest.mark.parametrize(
+    "col,meta_col",
+    [
+        (pd.Series([1, 5, None], dtype="Int64"), {"minimum": 1, "maximum": 5}),
+        (pd.Series([1, 6, None], dtype="Int64"), {"minimum": 1, "maximum": 5}),
+        (pd.Series([np.nan, np.nan]), {"minimum": 1}),
+        (pd.Series([0.5, np.nan, 1.5]), {"maximum": 1}),
+        (pd.Series([True, False]), {"maximum": 1}),
+        (pd.Series(["a", "b", "b"], dtype="string"), {"enum": ["a", "b"]}),
+        (pd.Series(["a", None], dtype="string"), {"enum": ["a"]}),
+        (pd.Series(["a", None], dtype="string"), {"enum": ["a"], "nullable": False}),
+        (pd.Series(["a", "c"], dtype="string"), {"enum": ["a", "b"]}),
+        (pd.Series([1, 2, 3]), {"nullable": False}),
+        (pd.Series([1.0, np.nan]), {"nullable": False}),
+        (pd.Series(["a", None], dtype=object), {"nullable": False}),
+    ],
+)
+def test_step_check_matches_kernel(col, meta_col):
+    """
+    Check the cheap check of a step gives the same result as running its
+    kernel against every row
+    """
+    meta_col = {"name": "my_col", "type": "int64", **meta_col}
+    plan = pv.ValidationPlan.from_meta_cols([meta_col], unique_values_threshold=0)
+    for step in plan.steps:
+        assert step.check is not None
+        no_check = replace(step, check=None)
+        res_dict = no_check.run(col, log_verbosity=0)
+        assert step.run(col, log_verbosity=0) == res_dict
+        # and only passes columns without any failing values
+        assert step.check(col, **step.args) == res_dict["valid"]
+
+
+@pytest.mark.parametrize(
+    "col",
+    [
+        pd.Series([1, 5, 7, None, 2, 0], dtype="Int64"),
+        pd.Series([1, 5, 7, 3, 2, 0]),
+        pd.Series([1.0, 5.0, np.nan, 2.5, 2.0, 0.0]),
+        pd.Series([1.0, 5.0, None, 2.5, 2.0, 0.0], dtype="Float64"),
+        pd.Series([1, 2, 3, 4, 5, 1], index=[5, 4, 3, 2, 1, 0]),
+    ],
+)
+@pytest.mark.parametrize(
+    "meta_col",
+    [
+        {"minimum": 1, "maximum": 5, "nullable": False},
+        {"minimum": 1.5, "enum": [1, 2, 5]},
+        {"maximum": 4, "enum": [0, 1, 2.5], "nullable": False},
+        {"enum": [1, 2, 3, 4, 5], "nullable": False},
+        {"minimum": 1, "enum": ["1", 2], "nullable": False},
+        {"enum": [1, 2, None], "nullable": False},
+        {"maximum": 4, "enum": [1, 2, None]},
+    ],
+)
+def test_fused_kernel_matches_steps(monkeypatch, col, meta_col):
+    """
+    Check the fused kernel gives the same results as running each test on
+    its own (run without numba, and compiled with numba if it is installed)
+    """
+    meta_col = {"name": "my_col", "type": "int64", **meta_col}
+    plan = pv.ValidationPlan.from_meta_cols([meta_col], unique_values_threshold=0)
+    df = pd.DataFrame({"my_col": col})
+
+    responses = []
+    kernels = [None, pv._fused_numeric_codes, pv._fused_numeric_kernel]
+    for kernel in kernels:
+        monkeypatch.setattr(pv, "_fused_numeric_kernel", kernel)
+        response = pv.ValidatorResult()
+        plan.run(df, response, log_verbosity=0)
+        responses.append(response.get_result())
+
+    assert responses[0] == responses[1] == responses[2]
+    monkeypatch.setattr(pv, "_fused_numeric_kernel", pv._fused_numeric_codes)
+    fused = pv.FusedCol.from_numeric_col(col, plan.steps)
+    assert fused is not None
+    # enums that are not all numbers are left to the enum test
+    numeric_enum = "enum" in meta_col and meta_col["enum"][0] != "1"
+    assert ("enum_test" in fused) is numeric_enum
+
+
+@pytest.mark.parametrize("dtype", ["int64", "Int64", "float64", "Float64"])
+@pytest.mark.parametrize("n_enum", [3, 100])
+@pytest.mark.parametrize("enum_nullable", [True, False])
+def test_fused_kernel_compiled_matches_python(
+    monkeypatch, dtype, n_enum, enum_nullable
+):
+    """
+    Check the fused kernel compiled with numba gives the same codes and
+    counts as running it in python (enums of more than fused_enum_scan_size
+    values are binary searched)
+    """
+    pytest.importorskip("numba")
+    values = np.random.default_rng(0).integers(-5, 250, 1000)
+    if dtype == "int64":
+        col = pd.Series(values, dtype=dtype)
+    else:
+        col = pd.Series(values, dtype=dtype).mask(values % 7 == 0)
+    meta_col = {
+        "name": "my_col",
+        "type": "int64",
+        "minimum": 0,
+        "maximum": 200,
+        "enum": list(range(0, 2 * n_enum, 2)) + [None],
+        "nullable": enum_nullable,
+    }
+    plan = pv.ValidationPlan.from_meta_cols([meta_col], unique_values_threshold=0)
+
+    fused = []
+    for kernel in [pv._fused_numeric_kernel, pv._fused_numeric_codes]:
+        monkeypatch.setattr(pv, "_fused_numeric_kernel", kernel)
+        fused.append(pv.FusedCol.from_numeric_col(col, plan.steps))
+
+    assert fused[0] is not None
+    assert fused[0].test_names == fused[1].test_names
+    np.testing.assert_array_equal(fused[0].codes, fused[1].codes)
+    np.testing.assert_array_equal(fused[0].counts, fused[1].counts)
+
+
+def test_batched_passes(monkeypatch):
+    """
+    Check running the nullable and min/max tests of a wide table in blocks
+    of columns gives the same response as running them column by column
+    """
+    n_cols = 40
+    df = pd.DataFrame(
+        {
+            f"col{i}": (
+                pd.Series([i, 2, None], dtype="Int64")
+                if i % 3
+                else pd.Series([0.5, np.nan if i % 2 else 1.0, 3.0])
+            )
+            for i in range(n_cols)
+        }
+    )
+    df["my_str"] = pd.Series(["a", None, "b"], dtype="string")
+    meta_cols = [
+        {"name": f"col{i}", "type": "float64", "minimum": 0, "maximum": 20}
+        for i in range(n_cols)
+    ]
+    meta_cols += [
+        {"name": "my_str", "type": "string", "nullable": False},
+        {"name": "col3", "type": "float64", "nullable": False},
+    ]
+    plan = pv.ValidationPlan.from_meta_cols(meta_cols, unique_values_threshold=0)
+    columns = [c for c in plan.columns if c in df.columns]
+
+    # narrow tables are not batched
+    assert plan.get_batched_passes(df, columns) == {}
+    monkeypatch.setattr(pv, "batch_min_columns", n_cols)
+
+    passed = plan.get_batched_passes(df, columns)
+    assert passed["col3"] == {"min_max_test"}
+    assert passed["col4"] == {"min_max_test"}
+    assert "col22" not in passed
+    assert "my_str" not in passed
+
+    responses = []
+    for cells in [0, pv.batch_max_cells]:
+        monkeypatch.setattr(pv, "batch_max_cells", cells)
+        assert bool(plan.get_batched_passes(df, columns)) is bool(cells)
+        response = pv.ValidatorResult()
+        plan.run(df, response, log_verbosity=0)
+        responses.append(response.get_result())
+
+    assert responses[0]["valid"] is False
+    assert responses[0] == responses[1]
@@ -2,12 +2,17 @@ import os
 
 import awswrangler as wr
 import boto3
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from mojap_metadata import Metadata
 from mojap_metadata.converters.arrow_converter import ArrowConverter
 from moto import mock_s3
 
 import data_linter.validators.parquet_validator as pqv
+import data_linter.validators.s3_files as s3_files
+from data_linter.validators import PandasValidator
 from tests.helpers import mock_get_file
 
 bucket = "dummy-bucket"
@@ -45,7 +50,7 @@ def test_parquet_schema_reader(filepath, mock_s3, meta_path, monkeypatch):
     else:
         full_path = filepath
 
-    _ = monkeypatch.setattr(pqv, "S3FileSystem", mock_get_file)
+    _ = monkeypatch.setattr(pqv, "get_s3_filesystem", mock_get_file)
 
     schema = pqv.ParquetValidator._read_schema(full_path)
     ac = ArrowConverter()
@@ -75,3 +80,224 @@ def test_parquet_validator(meta_file, expected_pass):
     pv = pqv.ParquetValidator(filepath=file_path, table_params={}, metadata=meta)
     pv.read_data_and_validate()
     assert pv.response.result["valid"] == expected_pass
+
+
+def _write_row_groups_parquet(filepath):
+    """
+    Writes 10 row groups of 100 rows where only row groups 0 and 7 have
+    ints out of bounds and row groups 0 and 4 have nulls
+    """
+    ints = np.tile(np.arange(10, 20), 100)
+    ints[[5, 777]] = [9, 25]
+    ints_with_nulls = pa.array(ints, mask=np.isin(np.arange(1000), [3, 450]))
+    floats = np.linspace(0, 10, 1000)
+    floats[300] = np.nan
+    table = pa.table(
+        {
+            "my_int": pa.array(ints),
+            "my_int_nulls": ints_with_nulls,
+            "my_float": pa.array(floats),
+            "my_str": pa.array(["a"] * 1000),
+        }
+    )
+    pq.write_table(table, filepath, row_group_size=100)
+
+
+stats_metadata = {
+    "name": "table1",
+    "file_format": "parquet",
+    "columns": [
+        {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+        {
+            "name": "my_int_nulls",
+            "type": "int64",
+            "minimum": 10,
+            "nullable": False,
+        },
+        {"name": "my_float", "type": "float64", "maximum": 10, "nullable": False},
+        {"name": "my_str", "type": "string", "enum": ["a"], "nullable": False},
+    ],
+}
+
+
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_parquet_validator_stats_mode(tmp_path, log_verbosity):
+    """
+    Check the min/max and nullable tests in stats mode give the same result
+    as the pandas validator
+    """
+    filepath = os.path.join(tmp_path, "table1.parquet")
+    _write_row_groups_parquet(filepath)
+
+    pandas_validator = PandasValidator(
+        filepath, {}, stats_metadata, log_verbosity=log_verbosity
+    )
+    pandas_validator.read_data_and_validate()
+    expected = pandas_validator.get_response_dict()
+
+    validator = pqv.ParquetValidator(
+        filepath, {"parquet-mode": "stats"}, stats_metadata, log_verbosity=log_verbosity
+    )
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert response["valid"] is False
+    assert "enum_test" not in response["my_str"]
+    for column in ["my_int", "my_int_nulls", "my_float", "my_str"]:
+        for test_name in pqv.stats_test_names:
+            assert response[column].get(test_name) == expected[column].get(test_name)
+
+
+@pytest.mark.parametrize("mode", ["stats", "data"])
+@pytest.mark.parametrize("schema_conforms", [True, False])
+def test_parquet_validator_fail_fast(tmp_path, mode, schema_conforms):
+    """
+    Check fail-fast skips the tests after the first failed test, and every
+    test of the plan if the schema check (which runs first) fails
+    """
+    filepath = os.path.join(tmp_path, "table1.parquet")
+    _write_row_groups_parquet(filepath)
+    metadata = {
+        "name": "table1",
+        "file_format": "parquet",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {"name": "my_int_nulls", "type": "int64", "minimum": 10},
+            {
+                "name": "my_float",
+                "type": "float64" if schema_conforms else "float32",
+                "maximum": 10,
+            },
+            {"name": "my_str", "type": "string"},
+        ],
+    }
+
+    validator = pqv.ParquetValidator(
+        filepath, {"parquet-mode": mode, "fail-fast": True}, metadata
+    )
+    validator.read_data_and_validate()
+    response = validator.get_response_dict()
+
+    assert response["valid"] is False
+    assert response["check_schema_conforms"]["valid"] is schema_conforms
+    skipped = response["skipped_tests"]
+    if schema_conforms:
+        assert response["my_int"]["min_max_test"]["valid"] is False
+        assert "my_int" not in skipped
+    else:
+        assert "my_int" not in response
+        assert skipped["my_int"] == ["min_max_test"]
+    assert skipped["my_int_nulls"] == ["min_max_test"]
+    assert skipped["my_float"] == ["min_max_test"]
+
+
+def test_unproven_row_groups(tmp_path):
+    filepath = os.path.join(tmp_path, "table1.parquet")
+    _write_row_groups_parquet(filepath)
+    pf = pq.ParquetFile(filepath)
+    plan = pqv.ValidationPlan.from_metadata(stats_metadata)
+
+    unproven = {}
+    for column in plan.columns:
+        arrow_type = pf.schema_arrow.field(column).type
+        for step in plan.get_column_steps(column):
+            if step.test_name in pqv.stats_test_names:
+                unproven[column, step.test_name] = pqv._get_unproven_row_groups(
+                    pf.metadata, column, arrow_type, step
+                )
+
+    assert unproven == {
+        ("my_int", "min_max_test"): [0, 7],
+        ("my_int_nulls", "min_max_test"): [0],
+        ("my_int_nulls", "nullable_test"): [0, 4],
+        # NaNs are not counted in the statistics
+        ("my_float", "min_max_test"): [],
+        ("my_float", "nullable_test"): list(range(10)),
+        ("my_str", "nullable_test"): [],
+    }
+
+
+@pytest.mark.parametrize(
+    "filepath,meta_path",
+    [
+        (
+            "tests/data/end_to_end2/land/table1.parquet",
+            "tests/data/end_to_end2/metadata/table1.json",
+        ),
+        (
+            "tests/data/pandas_validator/table1_typed_datetimes.parquet",
+            "tests/data/pandas_validator/meta_data/table1_typed_datetimes.json",
+        ),
+        ("table1.parquet", None),
+    ],
+)
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_parquet_validator_data_mode(
+    monkeypatch, tmp_path, filepath, meta_path, log_verbosity
+):
+    """
+    Check data mode gives the same column test results as the pandas
+    validator when the file is validated in several batches
+    """
+    monkeypatch.setattr(pqv, "parquet_batch_rows", 7)
+    if meta_path is None:
+        filepath = os.path.join(tmp_path, filepath)
+        _write_row_groups_parquet(filepath)
+        metadata = stats_metadata
+    else:
+        metadata = Metadata.from_json(meta_path)
+
+    responses = []
+    for validator_class, table_params in [
+        (PandasValidator, {}),
+        (pqv.ParquetValidator, {"parquet-mode": "data"}),
+    ]:
+        validator = validator_class(
+            filepath, table_params, metadata, log_verbosity=log_verbosity
+        )
+        validator.read_data_and_validate()
+        response = validator.get_response_dict()
+        # only the parquet validator checks the schema (end_to_end2's does not match)
+        for table_test in ["valid", "check_schema_conforms"]:
+            response.pop(table_test, None)
+        responses.append(response)
+
+    assert responses[0] == responses[1]
+
+
+@mock_s3
+@pytest.mark.parametrize("footer_read_bytes", [65536, 16])
+def test_read_parquet_footers(footer_read_bytes, monkeypatch):
+    filepath = "tests/data/parquet_validator/table1.parquet"
+    s3_client = boto3.client("s3")
+    _ = s3_client.create_bucket(
+        Bucket=bucket,
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-1"},
+    )
+    full_path = f"s3://{bucket}/{filepath}"
+    wr.s3.upload(filepath, full_path)
+
+    # a footer bigger than footer_read_bytes takes a second request
+    monkeypatch.setattr(s3_files, "footer_read_bytes", footer_read_bytes)
+
+    missing_path = f"s3://{bucket}/missing.parquet"
+    footers = s3_files.read_parquet_footers([full_path, filepath, missing_path])
+
+    expected = pq.read_metadata(filepath)
+    assert sorted(footers) == sorted([full_path, filepath])
+    for footer in footers.values():
+        assert footer.equals(expected)
+
+
+def test_prefetch_parquet_footers(tmp_path):
+    filepath = "tests/data/parquet_validator/table1.parquet"
+    other_filepath = str(tmp_path / "table2.parquet")
+    pq.write_table(pq.read_table(filepath), other_filepath)
+
+    with s3_files.prefetch_parquet_footers([filepath, other_filepath]):
+        schema = pqv.ParquetValidator._read_schema(filepath)
+        assert schema.equals(pq.read_schema(filepath).remove_metadata())
+        assert s3_files.pop_prefetched_footer(filepath) is None
+
+    # footers that were not used are dropped on exit
+    assert s3_files.pop_prefetched_footer(other_filepath) is None
@@ -0,0 +1,297 @@
+import os
+
+import pandas as pd
+import pytest
+from mojap_metadata import Metadata
+
+from data_linter.validators import DuckDBValidator, PandasValidator, PolarsValidator
+import data_linter.validators.pandas_validator as pv
+from data_linter.validators.pandas_validator import _compile_regex
+
+pl = pytest.importorskip("polars")
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+def _drop_regex_engine(response):
+    for col in response.values():
+        if isinstance(col, dict) and "pattern_test" in col:
+            col["pattern_test"]["test_inputs"].pop("regex_engine", None)
+    return response
+
+
+@pytest.mark.parametrize(
+    "filepath,meta_path,table_params",
+    [
+        (
+            "tests/data/end_to_end1/land/table1.csv",
+            "tests/data/end_to_end1/meta_data/table1.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end1/land/table2.jsonl",
+            "tests/data/end_to_end1/meta_data/table2.json",
+            {},
+        ),
+        (
+            "tests/data/end_to_end2/land/table1.parquet",
+            "tests/data/end_to_end2/metadata/table1.json",
+            {},
+        ),
+        (
+            "tests/data/pandas_validator/table1_typed_datetimes.parquet",
+            "tests/data/pandas_validator/meta_data/table1_typed_datetimes.json",
+            {},
+        ),
+        (
+            "tests/data/headers/table1_uppercase.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"headers-ignore-case": True},
+        ),
+        (
+            "tests/data/headers/table1_no_header.csv",
+            "tests/data/headers/meta_data/table1.json",
+            {"expect-header": False},
+        ),
+        (
+            "tests/data/pandas_validator/table1_na_test.csv",
+            "tests/data/pandas_validator/meta_data/table1.json",
+            {"pandas-kwargs": {"keep_default_na": False, "na_values": [""]}},
+        ),
+    ],
+)
+@pytest.mark.parametrize("log_verbosity", [None, 0])
+def test_polars_validator_matches_pandas_validator(
+    filepath, meta_path, table_params, log_verbosity
+):
+    """
+    Check the PolarsValidator gives the same response as the PandasValidator
+    (other than the regex engine used by pattern tests)
+    """
+    responses = []
+    for validator_class in [PandasValidator, PolarsValidator]:
+        validator = validator_class(
+            filepath,
+            dict(table_params),
+            Metadata.from_json(meta_path),
+            log_verbosity=log_verbosity,
+        )
+        validator.read_data_and_validate()
+        responses.append(_drop_regex_engine(validator.get_response_dict()))
+
+    assert responses[0] == responses[1]
+
+
+def test_polars_validator_column_tests(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_int": ["1", "12", "15", "25", "11", "", "19", "10", "3.0", "30"],
+            "code": ["ab-1", "ab-2", "ab-3", "ab-4", "x", "", "ab", "a", "b", ""],
+            "is_cat": ["true", "T", "no", "0", "1", "maybe", "", "f", "yes", "1.0"],
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64", "minimum": 10, "maximum": 20},
+            {
+                "name": "code",
+                "type": "string",
+                "pattern": "^ab-(?!4)\\d$",
+                "enum": ["ab-1", "ab-2"],
+                "maxLength": 4,
+            },
+            {"name": "is_cat", "type": "bool", "nullable": False},
+        ],
+    }
+
+    responses = []
+    for validator_class in [PandasValidator, PolarsValidator]:
+        validator = validator_class(full_file_path, {}, metadata, log_verbosity=0)
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[1]["valid"] is False
+    # the rust regex crate does not support lookarounds so falls back to re
+    assert responses[1]["code"]["pattern_test"]["test_inputs"]["regex_engine"] == "re"
+    assert responses[0] == responses[1]
+
+
+def test_polars_validator_microsecond_timestamps(tmp_path):
+    """
+    Check timestamps with a 6 digit fraction are read as microseconds (chrono
+    reads %f as nanoseconds) so the typed checks give the same result as the
+    other engines
+    """
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {
+            "my_ts": [
+                "2020-01-01 00:00:00.000001",
+                "2020-01-01 00:00:00.123000",
+                "2020-01-01 10:11:12.500000",
+                "2020-01-01 00:00:00.123456",
+                "2020-01-01 00:00:00.1",
+                "",
+            ]
+        }
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {
+                "name": "my_ts",
+                "type": "timestamp(ms)",
+                "datetime_format": "%Y-%m-%d %H:%M:%S.%f",
+            },
+        ],
+    }
+
+    validator_classes = [PandasValidator, PolarsValidator]
+    if duckdb is not None:
+        validator_classes.append(DuckDBValidator)
+    responses = []
+    for validator_class in validator_classes:
+        validator = validator_class(full_file_path, {}, metadata, log_verbosity=0)
+        validator.read_data_and_validate()
+        responses.append(validator.get_response_dict())
+
+    assert responses[0]["my_ts"]["datetime_format_test"][
+        "unexpected_values_sample"
+    ] == ["2020-01-01 00:00:00.000001", "2020-01-01 00:00:00.123456"]
+    for response in responses[1:]:
+        assert response == responses[0]
+
+
+def test_polars_validator_failed_casts(tmp_path):
+    full_file_path = os.path.join(tmp_path, "table1.csv")
+    pd.DataFrame(
+        {"my_int": ["1", "a", "b"], "my_date": ["2020-01-01", "2020-02-30", ""]}
+    ).to_csv(full_file_path, index=False)
+    metadata = {
+        "name": "table1",
+        "file_format": "csv",
+        "columns": [
+            {"name": "my_int", "type": "int64"},
+            {"name": "my_date", "type": "date64"},
+        ],
+    }
+    validator = PolarsValidator(full_file_path, {}, metadata)
+    validator.read_data_and_validate()
+
+    response = validator.get_response_dict()
+    assert response["valid"] is False
+    assert response["parse_data_to_polars"]["failed_casts"] == {
+        "my_int": 2,
+        "my_date": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "datetime_format",
+    [
+        "%Y-%m-%d",
+        "%Y-%m-%d %H:%M:%S",
+        "%d/%m/%Y %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d %H:%M:%S.%f",
+    ],
+)
+@pytest.mark.parametrize("check_for_no_time_component", [True, False])
+def test_polars_date_or_datetime_kernel(datetime_format, check_for_no_time_component):
+    """
+    Check the polars date format test gives the same result as using
+    strptime on each value
+    """
+    import data_linter.validators.polars_validator as plv
+
+    values = [
+        "2020-01-01",
+        "2020-1-1",
+        " 2020-01-01",
+        "",
+        None,
+        "2020-02-30",
+        "2020-01-01 00:00:00",
+        "2020-01-01 10:11:12",
+        "01/01/2020 10:11:12",
+        "01/01/2020 23:59:60",
+        "2020-01-01T10:11:12",
+        "2020-01-01T23:59:61",
+        "2020-01-01 00:00:00.123",
+        "2020-01-01 00:00:00.1234567",
+        "2020-01-01 00:00:00.000001",
+        "0000-01-01",
+        "0000-01-01 00:00:00",
+    ]
+    expected = [
+        not plv._valid_date_or_datetime_conversion(
+            v, datetime_format, check_for_no_time_component
+        )
+        for v in values
+    ]
+    kernel = plv._polars_date_or_datetime_kernel(
+        pl.col("c"), pl.String, datetime_format, check_for_no_time_component
+    )
+    actual = pl.DataFrame({"c": values}).select(kernel).to_series().to_list()
+    assert actual == expected
+
+
+pattern_values = [
+    "abc-1234",
+    "\u0661\u0662",
+    "a\n",
+    "12\n",
+    "a b",
+    "a\x0bb",
+    "a\x1cb",
+    "abc",
+    ":",
+    "aa",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern", ["\\d+", "\\d+$", "a$", "a\\sb", "a\\Sb", "[[:alpha:]]+", "a{,3}"]
+)
+def test_polars_pattern_kernel_matches_re(pattern):
+    import data_linter.validators.polars_validator as plv
+
+    regex = _compile_regex(pattern)
+    kernel = plv._polars_pattern_kernel(pl.col("c"), pl.String, regex)
+    actual = pl.DataFrame({"c": pattern_values}).select(kernel).to_series().to_list()
+    expected = [regex.regex.match(v) is None for v in pattern_values]
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "values,dtype,enum",
+    [
+        ([1, 2, 3, None], "Int64", ["1", "3"]),
+        ([1, 2, 3, None], "Int64", [1.0, True, None]),
+        ([1.0, 2.5, None], "float64", [1, 2.5]),
+        (["a", "1", None], "string", [1, "a"]),
+        ([True, False, None], "boolean", [1, 2]),
+    ],
+)
+@pytest.mark.parametrize("nullable", [True, False])
+def test_polars_enum_kernel_matches_isin(values, dtype, enum, nullable):
+    """
+    Check enum values are not converted to the type of the column
+    (e.g. "1" is not in an int column), as with pandas isin
+    """
+    import data_linter.validators.polars_validator as plv
+
+    s = pd.Series(values, dtype=dtype)
+    expected = pv._enum_kernel(s, frozenset(enum), nullable).fillna(True).tolist()
+    df = pl.from_pandas(pd.DataFrame({"c": s}))
+    kernel = plv._polars_enum_kernel(
+        pl.col("c"), df.schema["c"], frozenset(enum), nullable
+    )
+    assert df.select(kernel).to_series().to_list() == expected